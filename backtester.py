@@ -1,6 +1,7 @@
 ### File: X:\AmalTrading\trading_backtesting\backtester.py
 
 # forex_backtester_cli/backtester.py
+import logging
 import pandas as pd
 from datetime import timedelta 
 import numpy as np 
@@ -8,6 +9,9 @@ import numpy as np
 import config
 from strategies import get_strategy_class 
 from plotly_plotting import plot_trade_chart_plotly 
+from compact_frames import compact_frame
+
+logger = logging.getLogger(__name__)
 
 def get_pip_size(symbol: str) -> float:
     for key_part in config.PIP_SIZE:
@@ -46,17 +50,131 @@ def _calculate_and_set_trade_pnl(trade: dict, pip_size_for_calc: float):
             trade['pnl_R'] = round(pnl_pips_val / risk_pips, 2)
         else:
             trade['pnl_R'] = 0.0 
-            print(f"    Warning: Trade ID {trade.get('id')} had zero or tiny initial risk (Entry: {trade.get('entry_price')}, Initial SL: {trade.get('initial_sl_price')}, RiskPips: {risk_pips:.4f}). PnL R set to 0.")
+            logger.warning("Trade ID %s had zero or tiny initial risk (Entry: %s, Initial SL: %s, RiskPips: %.4f). PnL R set to 0.", trade.get('id'), trade.get('entry_price'), trade.get('initial_sl_price'), risk_pips)
     else:
         missing_keys = []
         if trade.get('exit_price') is None: missing_keys.append('exit_price')
         if trade.get('entry_price') is None: missing_keys.append('entry_price')
         if trade.get('initial_sl_price') is None: missing_keys.append('initial_sl_price')
-        print(f"    DEBUG_TRADE_PNL_R: Trade ID {trade.get('id')} missing price data ({', '.join(missing_keys)}) for PnL R calc during closure.")
+        logger.warning("    Trade ID %s missing price data (%s) for PnL R calc during closure.", trade.get('id'), ', '.join(missing_keys))
         trade['pnl_pips'] = 0.0
         trade['pnl_R'] = 0.0
 
 
+def _first_true(mask: np.ndarray) -> int:
+    """Position of the first True in a boolean array, -1 if there is none."""
+    if len(mask) == 0: return -1
+    pos = int(mask.argmax())
+    return pos if mask[pos] else -1
+
+def _breakeven_sl_price(trade: dict, ltf_high: np.ndarray, ltf_low: np.ndarray, trigger_pos: int,
+                        pip_size: float, sl_buffer_price: float) -> float:
+    """
+    New SL once BE_SL_TRIGGER_R is reached on the LTF bar at trigger_pos: the tighter of the
+    recent swing (last BE_SL_LOOKBACK_PERIOD bars before the trigger bar, plus buffer) and
+    BE_SL_FIXED_PIPS from entry, never worse than entry.
+    """
+    entry_price_be = trade['entry_price']
+    is_bullish = trade['direction'] == 'bullish'
+    sl_from_recent_hl = None
+    start_idx_be_lookback = max(0, trigger_pos - config.BE_SL_LOOKBACK_PERIOD)
+    if trigger_pos > start_idx_be_lookback:
+        if is_bullish:
+            sl_from_recent_hl = ltf_low[start_idx_be_lookback:trigger_pos].min() - sl_buffer_price
+        else:
+            sl_from_recent_hl = ltf_high[start_idx_be_lookback:trigger_pos].max() + sl_buffer_price
+
+    sl_from_fixed_pips_dist = config.BE_SL_FIXED_PIPS * pip_size
+    sl_from_fixed_pips_level = entry_price_be - sl_from_fixed_pips_dist if is_bullish else entry_price_be + sl_from_fixed_pips_dist
+
+    chosen_aggressive_sl_level = sl_from_fixed_pips_level
+    if sl_from_recent_hl is not None and abs(entry_price_be - sl_from_recent_hl) < sl_from_fixed_pips_dist:
+        chosen_aggressive_sl_level = sl_from_recent_hl
+
+    return max(entry_price_be, chosen_aggressive_sl_level) if is_bullish else min(entry_price_be, chosen_aggressive_sl_level)
+
+def _manage_open_trade(trade: dict, ltf_index: pd.DatetimeIndex, ltf_high: np.ndarray, ltf_low: np.ndarray,
+                       start_pos: int, end_pos: int, strategy_instance, pip_size: float, sl_buffer_price: float,
+                       log_suffix: str = ""):
+    """
+    Advances an open trade over the LTF bars [start_pos, end_pos) of the original OHLC arrays.
+    Same rules as walking the bars one by one: R-level analysis on every bar, the BE move is
+    applied before that bar's SL check, SL wins over TP on the same bar, management stops at
+    an SL hit, and after a TP hit the rest of the bars still feed the R analysis.
+    Exits are located with first-passage searches over the bar arrays.
+    """
+    if end_pos <= start_pos: return
+    if trade['direction'] not in ('bullish', 'bearish'):
+        trade['last_checked_ltf_time'] = ltf_index[end_pos - 1]
+        return
+
+    is_bullish = trade['direction'] == 'bullish'
+    high = ltf_high[start_pos:end_pos]
+    low = ltf_low[start_pos:end_pos]
+    entry_price = trade['entry_price']
+    risk_in_price = abs(entry_price - trade['initial_sl_price'])
+    favourable_R = None
+    if risk_in_price > 1e-9:
+        favourable_R = (high - entry_price) / risk_in_price if is_bullish else (entry_price - low) / risk_in_price
+
+    bars_processed = end_pos - start_pos
+    exit_pos, exit_status = -1, None
+    if trade['status'] == 'open':
+        sl_price = trade['sl_price']
+        tp_price = trade['tp_price']
+        sl_hit = low <= sl_price if is_bullish else high >= sl_price
+        tp_hit = high >= tp_price if is_bullish else low <= tp_price
+        sl_at, tp_at = _first_true(sl_hit), _first_true(tp_hit)
+        first_exit_at = min((p for p in (sl_at, tp_at) if p >= 0), default=-1)
+
+        be_at = -1
+        if config.ENABLE_BREAKEVEN_SL and not trade.get('sl_moved_to_be', False) and favourable_R is not None:
+            be_at = _first_true(favourable_R >= config.BE_SL_TRIGGER_R)
+        if be_at >= 0 and (first_exit_at < 0 or be_at <= first_exit_at):
+            new_be_sl_price = _breakeven_sl_price(trade, ltf_high, ltf_low, start_pos + be_at, pip_size, sl_buffer_price)
+            trade['sl_price'] = new_be_sl_price
+            trade['sl_moved_to_be'] = True
+            trade['status_info'] = trade.get('status_info', "") + f";BE@{config.BE_SL_TRIGGER_R:.1f}R"
+            logger.debug("    Trade SL to BE%s: ID %s new SL %.5f at %s (%.1fR achieved)", log_suffix, trade['id'], new_be_sl_price, ltf_index[start_pos + be_at], config.BE_SL_TRIGGER_R)
+
+            sl_hit_after_be = low[be_at:] <= new_be_sl_price if is_bullish else high[be_at:] >= new_be_sl_price
+            sl_at = _first_true(sl_hit_after_be)
+            if sl_at >= 0: sl_at += be_at
+            tp_at = _first_true(tp_hit[be_at:])
+            if tp_at >= 0: tp_at += be_at
+
+        if sl_at >= 0 and (tp_at < 0 or sl_at <= tp_at):
+            exit_pos, exit_status = sl_at, 'closed_sl_be' if trade.get('sl_moved_to_be', False) else 'closed_sl'
+            bars_processed = sl_at + 1
+        elif tp_at >= 0:
+            exit_pos, exit_status = tp_at, 'closed_tp'
+
+    # R analysis over every bar the trade was walked through (running max, so order does not matter)
+    if favourable_R is not None:
+        max_favourable_R = favourable_R[:bars_processed].max()
+        trade['max_R_achieved_for_analysis'] = max(trade.get('max_R_achieved_for_analysis', 0.0), min(max_favourable_R, 5.0))
+        for r_target in sorted(set(strategy_instance.get_r_levels_to_track() + [3.5, 4.0, 4.5, 5.0])):
+            if r_target <= 5.0 and max_favourable_R >= r_target:
+                trade[f'{r_target:.1f}R_achieved'] = True
+
+    if exit_status is not None:
+        trade['status'] = exit_status
+        trade['exit_time'] = ltf_index[start_pos + exit_pos]
+        trade['exit_price'] = trade['sl_price'] if exit_status != 'closed_tp' else trade['tp_price']
+        _calculate_and_set_trade_pnl(trade, pip_size)
+        if exit_status == 'closed_tp':
+            # R reached at the TP from the trade's own levels (a reversed trade's TP is not at tp_rr_ratio)
+            tp_R = abs(trade['tp_price'] - entry_price) / risk_in_price if risk_in_price > 1e-9 else strategy_instance.tp_rr_ratio
+            for r_target in strategy_instance.get_r_levels_to_track():
+                if r_target <= tp_R + 1e-9: trade[f'{r_target:.1f}R_achieved'] = True
+            trade['max_R_achieved_for_analysis'] = max(trade.get('max_R_achieved_for_analysis', 0.0), min(tp_R, 5.0))
+            logger.info("    Trade TP%s: ID %s at %s Price: %.5f", log_suffix, trade['id'], trade['exit_time'], trade['tp_price'])
+        else:
+            logger.info("    Trade SL%s: ID %s at %s Price: %.5f (Status: %s)", log_suffix, trade['id'], trade['exit_time'], trade['sl_price'], trade['status'])
+
+    trade['last_checked_ltf_time'] = ltf_index[start_pos + bars_processed - 1]
+
+
 def run_backtest(
     symbol: str,
     htf_data_with_swings: pd.DataFrame, 
@@ -65,9 +183,10 @@ def run_backtest(
     strategy_name: str, 
     strategy_custom_params: dict,
     session_results_path: str,
-    starting_trade_id: int 
+    starting_trade_id: int,
+    plot_trade_fn=None # Called as plot_trade_fn(trade, session_results_path) when a trade opens; default plot_trade_chart_plotly
     ):
-    print(f"\n--- Starting Backtest for {symbol} using Strategy: {strategy_name} (Global Start ID: {starting_trade_id}) ---")
+    logger.info("--- Starting Backtest for %s using Strategy: %s (Global Start ID: %s) ---", symbol, strategy_name, starting_trade_id)
     trades_log = []
     active_trade = None
     pip_size_local = get_pip_size(symbol) 
@@ -76,7 +195,7 @@ def run_backtest(
 
     StrategyClass = get_strategy_class(strategy_name)
     if not StrategyClass:
-        print(f"ERROR: Strategy '{strategy_name}' not found.")
+        logger.error("Strategy '%s' not found.", strategy_name)
         return [], starting_trade_id -1 
     
     common_strategy_params = {
@@ -93,167 +212,84 @@ def run_backtest(
     elif strategy_name in ["ZLSMAWithFilters", "HAAlligatorMACD", "HAAdaptiveMACD"]: 
         ltf_arg_for_prepare = ltf_data_original_ohlc.copy()
     else: 
-        print(f"Warning: LTF data preparation approach not explicitly defined for strategy '{strategy_name}'. Defaulting to original OHLC.")
+        logger.warning("LTF data preparation approach not explicitly defined for strategy '%s'. Defaulting to original OHLC.", strategy_name)
         ltf_arg_for_prepare = ltf_data_original_ohlc.copy()
 
 
     prepared_htf_data, prepared_ltf_data_from_strategy = strategy_instance.prepare_data(
         htf_arg_for_prepare, ltf_arg_for_prepare   
     )
+    if config.COMPACT_PRECISION:
+        compact_tolerance = config.COMPACT_TOLERANCE_PIPS * pip_size_local
+        prepared_htf_data = compact_frame(prepared_htf_data, compact_tolerance)
+        prepared_ltf_data_from_strategy = compact_frame(prepared_ltf_data_from_strategy, compact_tolerance)
     
     min_htf_len_for_swings = (config.ZIGZAG_LEN_HTF if config.SWING_IDENTIFICATION_METHOD == "zigzag" 
                               else config.N_BARS_LEFT_RIGHT_FOR_SWING_HTF) + 10 # Added buffer
     
     if len(prepared_htf_data) < min_htf_len_for_swings:
-        print(f"Warning: Not enough HTF data ({len(prepared_htf_data)} bars) for {symbol} to start backtest with offset {min_htf_len_for_swings}. Skipping symbol.")
+        logger.warning("Not enough HTF data (%d bars) for %s to start backtest with offset %d. Skipping symbol.", len(prepared_htf_data), symbol, min_htf_len_for_swings)
         return [], starting_trade_id -1
         
     start_offset_htf = min_htf_len_for_swings
 
+    # Trade management runs on plain arrays of the original LTF OHLC
+    ltf_index = ltf_data_original_ohlc.index
+    ltf_high = ltf_data_original_ohlc['high'].to_numpy(dtype=np.float64)
+    ltf_low = ltf_data_original_ohlc['low'].to_numpy(dtype=np.float64)
+
+    # HTF bar i -> LTF row offsets, computed once so every window below is an integer slice.
+    # Entry search window: prepared LTF rows with htf_time[i] <= t < htf_time[i+1] (last bar: + HTF_TIMEDELTA).
+    # Management window: original LTF rows with t <= htf_time[i+1] (last bar: through the final LTF row).
+    htf_index = prepared_htf_data.index
+    htf_window_end_times = htf_index[1:].append(htf_index[-1:] + config.HTF_TIMEDELTA)
+    signal_ltf_start = prepared_ltf_data_from_strategy.index.searchsorted(htf_index, side='left')
+    signal_ltf_end = prepared_ltf_data_from_strategy.index.searchsorted(htf_window_end_times, side='left')
+    manage_ltf_end = ltf_index.searchsorted(htf_index[1:].append(ltf_index[-1:]), side='right')
+
+    # HTF bars where a setup can start (e.g. CHoCH candles). While flat, the loop jumps
+    # straight to the next candidate instead of evaluating every HTF bar.
+    htf_signal_candidates = strategy_instance.get_htf_signal_candidates(prepared_htf_data)
+
+    i = start_offset_htf - 1
+    while True:
+        i += 1
+        if not active_trade and htf_signal_candidates is not None:
+            next_candidate = np.searchsorted(htf_signal_candidates, i)
+            if next_candidate == len(htf_signal_candidates): break
+            i = int(htf_signal_candidates[next_candidate])
+        if i >= len(prepared_htf_data): break
 
-    for i in range(start_offset_htf, len(prepared_htf_data)):
         current_htf_candle_time = prepared_htf_data.index[i]
-        manage_trade_until_time = prepared_htf_data.index[i+1] if i + 1 < len(prepared_htf_data) else ltf_data_original_ohlc.index[-1]
 
         if active_trade:
-            ltf_management_slice = ltf_data_original_ohlc[
-                (ltf_data_original_ohlc.index > active_trade['last_checked_ltf_time']) &
-                (ltf_data_original_ohlc.index <= manage_trade_until_time)
-            ]
-            for ltf_idx, ltf_candle in ltf_management_slice.iterrows():
-                active_trade['last_checked_ltf_time'] = ltf_idx
-                current_potential_R = 0.0 
-
-                if active_trade.get('max_R_achieved_for_analysis', 0.0) < 5.0 or active_trade['status'] == 'open':
-                    risk_in_price = abs(active_trade['entry_price'] - active_trade['initial_sl_price'])
-                    if risk_in_price > 1e-9: 
-                        if active_trade['direction'] == 'bullish': current_potential_R = (ltf_candle['high'] - active_trade['entry_price']) / risk_in_price
-                        elif active_trade['direction'] == 'bearish': current_potential_R = (active_trade['entry_price'] - ltf_candle['low']) / risk_in_price
-                        active_trade['max_R_achieved_for_analysis'] = max(active_trade.get('max_R_achieved_for_analysis', 0.0), min(current_potential_R, 5.0))
-                        
-                        r_levels_to_check_for_analysis = strategy_instance.get_r_levels_to_track() + [3.5, 4.0, 4.5, 5.0]
-                        r_levels_to_check_for_analysis = sorted(list(set(r_levels_to_check_for_analysis)))
-                        for r_target in r_levels_to_check_for_analysis:
-                            if r_target > 5.0: continue 
-                            if not active_trade.get(f'{r_target:.1f}R_achieved', False) and current_potential_R >= r_target:
-                                active_trade[f'{r_target:.1f}R_achieved'] = True
-                
-                if config.ENABLE_BREAKEVEN_SL and \
-                   active_trade['status'] == 'open' and \
-                   not active_trade.get('sl_moved_to_be', False) and \
-                   current_potential_R >= config.BE_SL_TRIGGER_R:
-                    
-                    entry_price_be = active_trade['entry_price']
-                    sl_from_recent_hl = None
-                    
-                    try:
-                        current_ltf_iloc = ltf_data_original_ohlc.index.get_loc(ltf_idx)
-                        start_idx_be_lookback = max(0, current_ltf_iloc - config.BE_SL_LOOKBACK_PERIOD)
-                        ltf_slice_for_be_sl = ltf_data_original_ohlc.iloc[start_idx_be_lookback : current_ltf_iloc]
-
-                        if not ltf_slice_for_be_sl.empty:
-                            if active_trade['direction'] == 'bullish':
-                                recent_low = ltf_slice_for_be_sl['low'].min()
-                                sl_from_recent_hl = recent_low - sl_buffer_price 
-                            elif active_trade['direction'] == 'bearish':
-                                recent_high = ltf_slice_for_be_sl['high'].max()
-                                sl_from_recent_hl = recent_high + sl_buffer_price
-                    except Exception as e_be_slice:
-                        print(f"    Warning: Could not get slice for BE SL recent H/L calc for Trade {active_trade['id']}: {e_be_slice}")
-
-                    sl_from_fixed_pips_dist = config.BE_SL_FIXED_PIPS * pip_size_local
-                    if active_trade['direction'] == 'bullish':
-                        sl_from_fixed_pips_level = entry_price_be - sl_from_fixed_pips_dist
-                    else: 
-                        sl_from_fixed_pips_level = entry_price_be + sl_from_fixed_pips_dist
-
-                    risk_from_hl = abs(entry_price_be - sl_from_recent_hl) if sl_from_recent_hl is not None else float('inf')
-                    risk_from_fixed = sl_from_fixed_pips_dist 
-
-                    chosen_aggressive_sl_level = None
-                    if sl_from_recent_hl is not None and risk_from_hl < risk_from_fixed:
-                        chosen_aggressive_sl_level = sl_from_recent_hl
-                    else:
-                        chosen_aggressive_sl_level = sl_from_fixed_pips_level
-                    
-                    new_be_sl_price = None
-                    if active_trade['direction'] == 'bullish':
-                        new_be_sl_price = max(entry_price_be, chosen_aggressive_sl_level)
-                    elif active_trade['direction'] == 'bearish':
-                        new_be_sl_price = min(entry_price_be, chosen_aggressive_sl_level)
-
-                    if new_be_sl_price is not None:
-                        active_trade['sl_price'] = new_be_sl_price
-                        active_trade['sl_moved_to_be'] = True
-                        active_trade['status_info'] = active_trade.get('status_info', "") + f";BE@{config.BE_SL_TRIGGER_R:.1f}R"
-                        print(f"    Trade SL to BE: ID {active_trade['id']} new SL {new_be_sl_price:.5f} at {ltf_idx} ({config.BE_SL_TRIGGER_R:.1f}R achieved)")
-
-                if active_trade['status'] == 'open': 
-                    if active_trade['direction'] == 'bullish':
-                        if ltf_candle['low'] <= active_trade['sl_price']: 
-                            active_trade['status'] = 'closed_sl'
-                            if active_trade.get('sl_moved_to_be', False): 
-                                active_trade['status'] = 'closed_sl_be' 
-                            active_trade['exit_time'] = ltf_idx; active_trade['exit_price'] = active_trade['sl_price']
-                            _calculate_and_set_trade_pnl(active_trade, pip_size_local) 
-                            print(f"    Trade SL: ID {active_trade['id']} at {ltf_idx} Price: {active_trade['sl_price']:.5f} (Status: {active_trade['status']})"); break 
-                        elif ltf_candle['high'] >= active_trade['tp_price']: 
-                            active_trade['status'] = 'closed_tp'; active_trade['exit_time'] = ltf_idx; active_trade['exit_price'] = active_trade['tp_price']
-                            _calculate_and_set_trade_pnl(active_trade, pip_size_local) 
-                            for r_target in strategy_instance.get_r_levels_to_track():
-                                if r_target <= strategy_instance.tp_rr_ratio: active_trade[f'{r_target:.1f}R_achieved'] = True
-                            active_trade['max_R_achieved_for_analysis'] = max(active_trade.get('max_R_achieved_for_analysis', 0.0), min(strategy_instance.tp_rr_ratio, 5.0))
-                            print(f"    Trade TP: ID {active_trade['id']} at {ltf_idx} Price: {active_trade['tp_price']:.5f}")
-                    elif active_trade['direction'] == 'bearish':
-                        if ltf_candle['high'] >= active_trade['sl_price']: 
-                            active_trade['status'] = 'closed_sl'
-                            if active_trade.get('sl_moved_to_be', False): 
-                                active_trade['status'] = 'closed_sl_be' 
-                            active_trade['exit_time'] = ltf_idx; active_trade['exit_price'] = active_trade['sl_price']
-                            _calculate_and_set_trade_pnl(active_trade, pip_size_local) 
-                            print(f"    Trade SL: ID {active_trade['id']} at {ltf_idx} Price: {active_trade['sl_price']:.5f} (Status: {active_trade['status']})"); break
-                        elif ltf_candle['low'] <= active_trade['tp_price']: 
-                            active_trade['status'] = 'closed_tp'; active_trade['exit_time'] = ltf_idx; active_trade['exit_price'] = active_trade['tp_price']
-                            _calculate_and_set_trade_pnl(active_trade, pip_size_local) 
-                            for r_target in strategy_instance.get_r_levels_to_track():
-                                 if r_target <= strategy_instance.tp_rr_ratio: active_trade[f'{r_target:.1f}R_achieved'] = True
-                            active_trade['max_R_achieved_for_analysis'] = max(active_trade.get('max_R_achieved_for_analysis', 0.0), min(strategy_instance.tp_rr_ratio, 5.0))
-                            print(f"    Trade TP: ID {active_trade['id']} at {ltf_idx} Price: {active_trade['tp_price']:.5f}")
-            
+            _manage_open_trade(active_trade, ltf_index, ltf_high, ltf_low,
+                               ltf_index.searchsorted(active_trade['last_checked_ltf_time'], side='right'),
+                               manage_ltf_end[i],
+                               strategy_instance, pip_size_local, sl_buffer_price)
             if active_trade['status'] != 'open': active_trade = None
         
         if not active_trade:
             htf_signal = strategy_instance.check_htf_condition(prepared_htf_data, i)
             
             if htf_signal:
-                level_broken_val = htf_signal.get('level_broken') 
-                level_broken_str = f"{level_broken_val:.5f}" if isinstance(level_broken_val, (int, float)) else str(level_broken_val if level_broken_val is not None else 'N/A')
-                
-                # Conditional printing for HTF signal to reduce noise for certain strategies
-                print_htf_signal = True
-                if strategy_name == "HAAlligatorMACD" and htf_signal.get('type') == "ha_alligator_macd_htf_generic_go":
-                    print_htf_signal = False # Example: Suppress generic pass-through for this strategy
-                if strategy_name == "HAAdaptiveMACD" and "choch_for_ha_adaptive_macd" in htf_signal.get('type',''): # Print if it's the CHoCH signal
-                    print_htf_signal = True 
-                
-                if print_htf_signal:
-                     print(f"\n{current_htf_candle_time}: HTF Signal ({htf_signal.get('type','UnknownType')}) detected for {strategy_name}. Level: {level_broken_str}")
-
-                ltf_search_start_time = current_htf_candle_time 
-                ltf_search_window_end_time = prepared_htf_data.index[i+1] if i + 1 < len(prepared_htf_data) else current_htf_candle_time + config.HTF_TIMEDELTA
-                
-                relevant_ltf_segment_for_signal = prepared_ltf_data_from_strategy[
-                    (prepared_ltf_data_from_strategy.index >= ltf_search_start_time) & 
-                    (prepared_ltf_data_from_strategy.index < ltf_search_window_end_time) 
-                ]
-                if relevant_ltf_segment_for_signal.empty: continue
-
-                for j_ltf_search_idx_val, _ in relevant_ltf_segment_for_signal.iterrows():
-                    try:
-                        original_ltf_iloc = prepared_ltf_data_from_strategy.index.get_loc(j_ltf_search_idx_val)
-                    except KeyError:
-                        continue 
+                if logger.isEnabledFor(logging.DEBUG):
+                    level_broken_val = htf_signal.get('level_broken') 
+                    level_broken_str = f"{level_broken_val:.5f}" if isinstance(level_broken_val, (int, float)) else str(level_broken_val if level_broken_val is not None else 'N/A')
+                    
+                    # Conditional logging for HTF signal to reduce noise for certain strategies
+                    log_htf_signal = True
+                    if strategy_name == "HAAlligatorMACD" and htf_signal.get('type') == "ha_alligator_macd_htf_generic_go":
+                        log_htf_signal = False # Example: Suppress generic pass-through for this strategy
+                    if strategy_name == "HAAdaptiveMACD" and "choch_for_ha_adaptive_macd" in htf_signal.get('type',''): # Log if it's the CHoCH signal
+                        log_htf_signal = True 
+                    
+                    if log_htf_signal:
+                        logger.debug("%s: HTF Signal (%s) detected for %s. Level: %s", current_htf_candle_time, htf_signal.get('type','UnknownType'), strategy_name, level_broken_str)
 
+                ltf_search_window_end_time = htf_window_end_times[i]
+
+                for original_ltf_iloc in range(signal_ltf_start[i], signal_ltf_end[i]):
                     current_ltf_processed_candle_time = prepared_ltf_data_from_strategy.index[original_ltf_iloc]
                     if not is_time_allowed(current_ltf_processed_candle_time): continue
 
@@ -269,8 +305,7 @@ def run_backtest(
                             if entry_time >= ltf_search_window_end_time :
                                 continue
 
-                            if entry_time not in ltf_data_original_ohlc.index: continue 
-                            entry_price = ltf_data_original_ohlc.loc[entry_time]['open']
+                            entry_price = ltf_data_original_ohlc['open'].iat[entry_candle_iloc]
                             
                             sl_price, tp_price = strategy_instance.calculate_sl_tp(
                                 entry_price, entry_time, prepared_ltf_data_from_strategy, 
@@ -280,29 +315,30 @@ def run_backtest(
 
                             # --- NEW: REVERSAL LOGIC ---
                             final_direction = ltf_entry_signal["direction"]
-                            final_sl_price = sl_price_orig
-                            final_tp_price = tp_price_orig
+                            final_sl_price = sl_price
+                            final_tp_price = tp_price
                             trade_comment = ""
                     
                             if config.REVERSE_TRADES:
-                                print(f"    REVERSING TRADE SIGNAL for {symbol} at {entry_time}")
+                                logger.debug("    REVERSING TRADE SIGNAL for %s at %s", symbol, entry_time)
                                 final_direction = "bearish" if ltf_entry_signal["direction"] == "bullish" else "bullish"
-                                final_sl_price = tp_price_orig  # Original TP becomes the new SL
-                                final_tp_price = sl_price_orig  # Original SL becomes the new TP
+                                final_sl_price = tp_price  # Original TP becomes the new SL
+                                final_tp_price = sl_price  # Original SL becomes the new TP
                                 trade_comment = "REVERSED"
                     
                             # --- END OF REVERSAL LOGIC ---
 
                             current_overall_trade_id += 1 
-                            print(f"    {entry_time}: LTF ENTRY SIGNAL ({strategy_name})! Type: {ltf_entry_signal['type']}, Price: {entry_price:.5f}")
+                            logger.debug("    %s: LTF ENTRY SIGNAL (%s)! Type: %s, Price: %.5f", entry_time, strategy_name, ltf_entry_signal['type'], entry_price)
                             active_trade = {
                                 "id": current_overall_trade_id, "symbol_specific_id": len(trades_log) + 1, 
                                 "symbol": symbol, "strategy": strategy_name,
                                 "entry_time": entry_time, "entry_price": entry_price,
-                                "direction": ltf_entry_signal["direction"], 
-                                "sl_price": sl_price, 
-                                "initial_sl_price": sl_price, 
-                                "tp_price": tp_price,
+                                "direction": final_direction, 
+                                "sl_price": final_sl_price, 
+                                "initial_sl_price": final_sl_price, 
+                                "tp_price": final_tp_price,
+                                "comment": trade_comment,
                                 "htf_signal_details": htf_signal, "ltf_signal_details": ltf_entry_signal,
                                 "status": "open", "exit_time": None, "exit_price": None,
                                 "pnl_pips": 0.0, "pnl_R": 0.0, 
@@ -316,107 +352,23 @@ def run_backtest(
                                     active_trade[f'{r_val:.1f}R_achieved'] = False 
                             
                             trades_log.append(active_trade)
-                            print(f"    Trade Opened: ID {active_trade['id']} ({active_trade['symbol_specific_id']}-{symbol}) {active_trade['direction']} at {active_trade['entry_price']:.5f}, SL: {active_trade['sl_price']:.5f}, TP: {active_trade['tp_price']:.5f}")
+                            logger.info("    Trade Opened: ID %s (%s-%s) %s at %.5f, SL: %.5f, TP: %.5f", active_trade['id'], active_trade['symbol_specific_id'], symbol, active_trade['direction'], active_trade['entry_price'], active_trade['sl_price'], active_trade['tp_price'])
                             
                             active_trade['overall_trade_id'] = active_trade['id'] 
-                            plot_trade_chart_plotly(active_trade, session_results_path) 
+                            (plot_trade_fn or plot_trade_chart_plotly)(active_trade, session_results_path) 
                             break 
                     if active_trade: break 
     
     if active_trade and active_trade['status'] == 'open':
-        print(f"    Managing EOD for still open trade ID {active_trade['id']} from {active_trade['last_checked_ltf_time']}")
-        ltf_final_slice = ltf_data_original_ohlc[ltf_data_original_ohlc.index > active_trade['last_checked_ltf_time']]
-        for ltf_idx, ltf_candle in ltf_final_slice.iterrows(): 
-            active_trade['last_checked_ltf_time'] = ltf_idx
-            current_potential_R_eod = 0.0
-            if active_trade.get('max_R_achieved_for_analysis', 0.0) < 5.0 or active_trade['status'] == 'open':
-                risk_in_price = abs(active_trade['entry_price'] - active_trade['initial_sl_price'])
-                if risk_in_price > 1e-9:
-                    if active_trade['direction'] == 'bullish': current_potential_R_eod = (ltf_candle['high'] - active_trade['entry_price']) / risk_in_price
-                    elif active_trade['direction'] == 'bearish': current_potential_R_eod = (active_trade['entry_price'] - ltf_candle['low']) / risk_in_price
-                    active_trade['max_R_achieved_for_analysis'] = max(active_trade.get('max_R_achieved_for_analysis', 0.0), min(current_potential_R_eod, 5.0))
-                    
-                    r_levels_to_check_for_analysis = strategy_instance.get_r_levels_to_track() + [3.5, 4.0, 4.5, 5.0]
-                    for r_target in sorted(list(set(r_levels_to_check_for_analysis))):
-                        if r_target <= 5.0 and not active_trade.get(f'{r_target:.1f}R_achieved', False) and current_potential_R_eod >= r_target:
-                            active_trade[f'{r_target:.1f}R_achieved'] = True
-            
-            if config.ENABLE_BREAKEVEN_SL and \
-               active_trade['status'] == 'open' and \
-               not active_trade.get('sl_moved_to_be', False) and \
-               current_potential_R_eod >= config.BE_SL_TRIGGER_R:
-                
-                entry_price_be = active_trade['entry_price']
-                sl_from_recent_hl = None
-                try:
-                    current_ltf_iloc = ltf_data_original_ohlc.index.get_loc(ltf_idx)
-                    start_idx_be_lookback = max(0, current_ltf_iloc - config.BE_SL_LOOKBACK_PERIOD)
-                    ltf_slice_for_be_sl = ltf_data_original_ohlc.iloc[start_idx_be_lookback : current_ltf_iloc]
-                    if not ltf_slice_for_be_sl.empty:
-                        if active_trade['direction'] == 'bullish':
-                            sl_from_recent_hl = ltf_slice_for_be_sl['low'].min() - sl_buffer_price
-                        elif active_trade['direction'] == 'bearish':
-                            sl_from_recent_hl = ltf_slice_for_be_sl['high'].max() + sl_buffer_price
-                except Exception as e_be_slice_eod:
-                     print(f"    Warning: EOD Could not get slice for BE SL recent H/L calc for Trade {active_trade['id']}: {e_be_slice_eod}")
-
-                sl_from_fixed_pips_dist = config.BE_SL_FIXED_PIPS * pip_size_local
-                if active_trade['direction'] == 'bullish':
-                    sl_from_fixed_pips_level = entry_price_be - sl_from_fixed_pips_dist
-                else: 
-                    sl_from_fixed_pips_level = entry_price_be + sl_from_fixed_pips_dist
-
-                risk_from_hl = abs(entry_price_be - sl_from_recent_hl) if sl_from_recent_hl is not None else float('inf')
-                risk_from_fixed = sl_from_fixed_pips_dist
-
-                chosen_aggressive_sl_level = sl_from_fixed_pips_level
-                if sl_from_recent_hl is not None and risk_from_hl < risk_from_fixed:
-                    chosen_aggressive_sl_level = sl_from_recent_hl
-                
-                new_be_sl_price = None
-                if active_trade['direction'] == 'bullish':
-                    new_be_sl_price = max(entry_price_be, chosen_aggressive_sl_level)
-                elif active_trade['direction'] == 'bearish':
-                    new_be_sl_price = min(entry_price_be, chosen_aggressive_sl_level)
-
-                if new_be_sl_price is not None:
-                    active_trade['sl_price'] = new_be_sl_price
-                    active_trade['sl_moved_to_be'] = True
-                    active_trade['status_info'] = active_trade.get('status_info', "") + f";BE@{config.BE_SL_TRIGGER_R:.1f}R"
-                    print(f"    Trade SL to BE (EOD): ID {active_trade['id']} new SL {new_be_sl_price:.5f} at {ltf_idx} ({config.BE_SL_TRIGGER_R:.1f}R achieved)")
-
-            if active_trade['status'] == 'open': 
-                if active_trade['direction'] == 'bullish': 
-                    if ltf_candle['low'] <= active_trade['sl_price']: 
-                        active_trade['status'] = 'closed_sl'
-                        if active_trade.get('sl_moved_to_be', False): active_trade['status'] = 'closed_sl_be'
-                        active_trade['exit_time'] = ltf_idx; active_trade['exit_price'] = active_trade['sl_price']
-                        _calculate_and_set_trade_pnl(active_trade, pip_size_local)
-                        break 
-                    elif ltf_candle['high'] >= active_trade['tp_price']: 
-                        active_trade['status'] = 'closed_tp'; active_trade['exit_time'] = ltf_idx; active_trade['exit_price'] = active_trade['tp_price']
-                        _calculate_and_set_trade_pnl(active_trade, pip_size_local)
-                        for r_target in strategy_instance.get_r_levels_to_track():
-                            if r_target <= strategy_instance.tp_rr_ratio: active_trade[f'{r_target:.1f}R_achieved'] = True
-                        active_trade['max_R_achieved_for_analysis'] = max(active_trade.get('max_R_achieved_for_analysis', 0.0), min(strategy_instance.tp_rr_ratio, 5.0))
-                elif active_trade['direction'] == 'bearish': 
-                    if ltf_candle['high'] >= active_trade['sl_price']: 
-                        active_trade['status'] = 'closed_sl'
-                        if active_trade.get('sl_moved_to_be', False): active_trade['status'] = 'closed_sl_be'
-                        active_trade['exit_time'] = ltf_idx; active_trade['exit_price'] = active_trade['sl_price']
-                        _calculate_and_set_trade_pnl(active_trade, pip_size_local)
-                        break
-                    elif ltf_candle['low'] <= active_trade['tp_price']: 
-                        active_trade['status'] = 'closed_tp'; active_trade['exit_time'] = ltf_idx; active_trade['exit_price'] = active_trade['tp_price']
-                        _calculate_and_set_trade_pnl(active_trade, pip_size_local)
-                        for r_target in strategy_instance.get_r_levels_to_track():
-                            if r_target <= strategy_instance.tp_rr_ratio: active_trade[f'{r_target:.1f}R_achieved'] = True
-                        active_trade['max_R_achieved_for_analysis'] = max(active_trade.get('max_R_achieved_for_analysis', 0.0), min(strategy_instance.tp_rr_ratio, 5.0))
+        logger.debug("    Managing EOD for still open trade ID %s from %s", active_trade['id'], active_trade['last_checked_ltf_time'])
+        _manage_open_trade(active_trade, ltf_index, ltf_high, ltf_low,
+                           ltf_index.searchsorted(active_trade['last_checked_ltf_time'], side='right'), len(ltf_index),
+                           strategy_instance, pip_size_local, sl_buffer_price, log_suffix=" (EOD)")
         
         if active_trade['status'] == 'open': 
             active_trade['status'] = 'closed_eod'; active_trade['exit_time'] = ltf_data_original_ohlc.index[-1]; active_trade['exit_price'] = ltf_data_original_ohlc.iloc[-1]['close']
             _calculate_and_set_trade_pnl(active_trade, pip_size_local) 
-            print(f"    Trade EOD Close: ID {active_trade['id']} at {active_trade['exit_time']} Price: {active_trade['exit_price']:.5f}")
+            logger.info("    Trade EOD Close: ID %s at %s Price: %.5f", active_trade['id'], active_trade['exit_time'], active_trade['exit_price'])
 
-    print(f"--- Backtest for {symbol} ({strategy_name}) Finished. Total trades: {len(trades_log)} ---")
+    logger.info("--- Backtest for %s (%s) Finished. Total trades: %d ---", symbol, strategy_name, len(trades_log))
     return trades_log, current_overall_trade_id
@@ -0,0 +1,157 @@
+# forex_backtester_cli/bar_archive.py
+
+import bisect
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+import config
+from data_sources import BarDataSource, RATES_DTYPE, _to_epoch_seconds
+from timeframes import Timeframe
+
+logger = logging.getLogger(__name__)
+
+# On-disk layout: {BAR_ARCHIVE_DIR}/{SYMBOL}_{TF}.bars, a headerless sequence of fixed-width
+# RATES_DTYPE records (60 bytes, little endian) sorted by time. Files are only ever appended to,
+# so readers can map them with numpy.memmap and share the OS page cache across processes.
+# Range queries binary-search the mapped time column and return a view into the map;
+# nothing outside the requested rows is read.
+
+class BarArchive:
+    """Append-only, memory-mapped bar files, one per symbol and timeframe."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._maps = {} # path -> (file size when mapped, read-only memmap)
+
+    def path(self, symbol: str, timeframe: int) -> str:
+        return os.path.join(self.root_dir, f"{symbol.upper()}_{Timeframe(int(timeframe)).name}.bars")
+
+    def open(self, symbol: str, timeframe: int) -> np.ndarray | None:
+        """Read-only memmap of all archived bars (re-mapped after appends); None if not archived."""
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path):
+            return None
+        size = os.path.getsize(path)
+        cached = self._maps.get(path)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        if size % RATES_DTYPE.itemsize:
+            raise ValueError(f"{path} is not a whole number of {RATES_DTYPE.itemsize}-byte bar records.")
+        rates = np.memmap(path, dtype=RATES_DTYPE, mode='r') if size else np.zeros(0, dtype=RATES_DTYPE)
+        self._maps[path] = (size, rates)
+        return rates
+
+    def last_time(self, symbol: str, timeframe: int) -> int | None:
+        rates = self.open(symbol, timeframe)
+        return int(rates['time'][-1]) if rates is not None and len(rates) else None
+
+    def append(self, symbol: str, timeframe: int, rates: np.ndarray) -> int:
+        """
+        Appends the bars of `rates` that are newer than the last archived bar (duplicates and
+        older bars are skipped, so re-importing an overlapping range is safe). Returns the count.
+        """
+        rates = np.asarray(rates)
+        new = np.zeros(len(rates), dtype=RATES_DTYPE)
+        for name in RATES_DTYPE.names:
+            if rates.dtype.names and name in rates.dtype.names:
+                new[name] = rates[name]
+        new = new[np.argsort(new['time'], kind='stable')]
+        if len(new):
+            new = new[np.concatenate(([True], np.diff(new['time']) > 0))] # One bar per timestamp
+        last = self.last_time(symbol, timeframe)
+        if last is not None:
+            new = new[new['time'] > last]
+        if len(new) == 0:
+            return 0
+
+        path = self.path(symbol, timeframe)
+        os.makedirs(self.root_dir, exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(new.tobytes())
+        self._maps.pop(path, None)
+        return len(new)
+
+    def slice_range(self, symbol: str, timeframe: int, date_from, date_to) -> np.ndarray | None:
+        """Zero-copy view of the archived bars with date_from <= time <= date_to."""
+        rates = self.open(symbol, timeframe)
+        if rates is None:
+            return None
+        times = rates['time'] # Strided view; bisect touches O(log n) records instead of copying the column
+        lo = bisect.bisect_left(times, _to_epoch_seconds(date_from))
+        hi = bisect.bisect_right(times, _to_epoch_seconds(date_to))
+        return rates[lo:hi]
+
+class ArchiveDataSource(BarDataSource):
+    """Serves bars from a BarArchive (config.BAR_ARCHIVE_DIR). Returned arrays are read-only views."""
+    name = "archive"
+
+    def __init__(self, root_dir: str):
+        self.archive = BarArchive(root_dir)
+        self._last_error = None
+
+    def _open(self, symbol, timeframe):
+        rates = self.archive.open(symbol, timeframe)
+        if rates is None:
+            self._last_error = f"No archive file {self.archive.path(symbol, timeframe)}"
+        return rates
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        if self._open(symbol, timeframe) is None: return None
+        return self.archive.slice_range(symbol, timeframe, date_from, date_to)
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        rates = self._open(symbol, timeframe)
+        if rates is None: return None
+        end = len(rates) - start_pos
+        if end <= 0:
+            return rates[:0]
+        return rates[max(0, end - count):end]
+
+    def last_error(self):
+        return self._last_error
+
+def import_into_archive(archive: BarArchive, source: BarDataSource, symbol: str, timeframe: int, date_from, date_to) -> int | None:
+    """Copies bars in [date_from, date_to] from `source` into the archive. Returns bars appended, None on failure."""
+    last = archive.last_time(symbol, timeframe)
+    if last is not None:
+        resume_from = pd.Timestamp(last + 1, unit='s', tz='UTC')
+        date_from = max(pd.Timestamp(_to_epoch_seconds(date_from), unit='s', tz='UTC'), resume_from).to_pydatetime()
+    rates = source.copy_rates_range(symbol, timeframe, date_from, date_to)
+    if rates is None:
+        logger.error("Bar archive: %s returned no data for %s (%s).", source.name, symbol, source.last_error())
+        return None
+    return archive.append(symbol, timeframe, rates)
+
+
+if __name__ == '__main__':
+    # Fill or extend the archive from the configured DATA_SOURCE, e.g.
+    #   python bar_archive.py --symbols EURUSD USDJPY --timeframes M5 M15 --start 2020-01-01 --end 2025-03-31
+    import argparse
+    from data_sources import get_data_source
+
+    parser = argparse.ArgumentParser(description="Import bars into the memory-mapped bar archive.")
+    parser.add_argument("--symbols", nargs="+", default=config.SYMBOLS)
+    parser.add_argument("--timeframes", nargs="+", default=[config.HTF_TIMEFRAME_STR, config.LTF_TIMEFRAME_STR])
+    parser.add_argument("--start", default=config.START_DATE_STR)
+    parser.add_argument("--end", default=config.END_DATE_STR)
+    parser.add_argument("--archive-dir", default=config.BAR_ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    if config.DATA_SOURCE == "archive":
+        raise SystemExit("Set DATA_SOURCE to 'mt5' or 'file' to import into the archive.")
+    source = get_data_source()
+    if not source.initialize():
+        raise SystemExit(f"Could not initialize the {source.name} data source.")
+    archive = BarArchive(args.archive_dir)
+    try:
+        for symbol in args.symbols:
+            for tf_label in args.timeframes:
+                timeframe = Timeframe.from_string(tf_label)
+                added = import_into_archive(archive, source, symbol, timeframe, args.start, f"{args.end} 23:59:59")
+                total = len(archive.open(symbol, timeframe)) if added is not None else 0
+                print(f"{symbol} {tf_label}: {added} bars appended, {total} in archive.")
+    finally:
+        source.shutdown()
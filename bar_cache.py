@@ -0,0 +1,137 @@
+# forex_backtester_cli/bar_cache.py
+
+import logging
+import os
+import pandas as pd
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# On-disk layout: {BAR_CACHE_DIR}/{SYMBOL}/{TIMEFRAME}/{YYYY-MM}.parquet
+# Only calendar months that have fully closed are written, so a cached partition
+# never needs to be refreshed. The current (still forming) month is always
+# fetched from the source. A closed month is only written once its bars reach both
+# ends of the month (allowing for weekends and holidays). A month with no bars or only
+# part of its bars is used but refetched on the next call: MT5 returns nothing for
+# history it has not synced yet, so an empty answer is never taken as final.
+
+# Largest gap allowed between a month's bounds and its first/last bar, on top of one
+# bar of the timeframe: a weekend plus a market holiday such as 1 January.
+_MAX_MONTH_EDGE_GAP = pd.Timedelta(days=4)
+
+def _timeframe_label(timeframe_mt5) -> str:
+    """Returns the config string label ('M5', 'H1', ...) for an MT5 timeframe value."""
+    for label, value in config.TIMEFRAME_MAP.items():
+        if value == timeframe_mt5:
+            return label
+    return str(timeframe_mt5)
+
+def _partition_path(symbol: str, timeframe_label: str, month_start: pd.Timestamp) -> str:
+    return os.path.join(config.BAR_CACHE_DIR, symbol.upper(), timeframe_label, f"{month_start:%Y-%m}.parquet")
+
+def _month_starts(start_utc: pd.Timestamp, end_utc: pd.Timestamp) -> list:
+    """All month starts (UTC) whose month overlaps [start_utc, end_utc]."""
+    first = pd.Timestamp(year=start_utc.year, month=start_utc.month, day=1, tz='UTC')
+    last = pd.Timestamp(year=end_utc.year, month=end_utc.month, day=1, tz='UTC')
+    return list(pd.date_range(first, last, freq='MS'))
+
+def _covers_month(month_df: pd.DataFrame, month_start: pd.Timestamp, month_end: pd.Timestamp, timeframe_label: str) -> bool:
+    """True if the month's bars reach both of its ends."""
+    if month_df.empty:
+        return False
+    allowed_gap = _MAX_MONTH_EDGE_GAP + config.TIMEDELTA_MAP.get(timeframe_label, pd.Timedelta(days=31))
+    return month_df.index[0] - month_start <= allowed_gap and month_end - month_df.index[-1] <= allowed_gap
+
+def _contiguous_runs(month_starts: list) -> list:
+    """Groups sorted month starts into runs of consecutive months."""
+    runs = []
+    for m in month_starts:
+        if runs and runs[-1][-1] + pd.offsets.MonthBegin(1) == m:
+            runs[-1].append(m)
+        else:
+            runs.append([m])
+    return runs
+
+def fetch_bars_cached(symbol: str, timeframe_mt5: int, start_utc, end_utc, fetch_range_fn) -> pd.DataFrame | None:
+    """
+    Serves bars in [start_utc, end_utc] from the monthly on-disk cache.
+    Missing months are grouped into contiguous ranges and each range is requested once
+    via fetch_range_fn(range_start_utc, range_end_utc), which must return a UTC-indexed
+    OHLCV DataFrame (possibly empty) or None on failure.
+    Returns the same frame shape as data_handler.fetch_historical_data.
+    """
+    start_utc = pd.Timestamp(start_utc)
+    end_utc = pd.Timestamp(end_utc)
+    tf_label = _timeframe_label(timeframe_mt5)
+    now_utc = pd.Timestamp.now(tz='UTC')
+
+    months = _month_starts(start_utc, end_utc)
+    partitions = {}
+    missing_months = []
+    for month_start in months:
+        month_end = month_start + pd.offsets.MonthBegin(1)
+        path = _partition_path(symbol, tf_label, month_start)
+        if month_end <= now_utc and os.path.exists(path):
+            try:
+                partitions[month_start] = pd.read_parquet(path)
+                continue
+            except Exception as e:
+                logger.warning("Bar cache: could not read %s (%s). Refetching.", path, e)
+        missing_months.append(month_start)
+
+    if missing_months:
+        logger.info("Bar cache: %s %s - %d month(s) from disk, %d to fetch.",
+                    symbol, tf_label, len(months) - len(missing_months), len(missing_months))
+    else:
+        logger.info("Bar cache: %s %s - all %d month(s) served from disk.", symbol, tf_label, len(months))
+
+    for run in _contiguous_runs(missing_months):
+        run_start = run[0]
+        run_end = run[-1] + pd.offsets.MonthBegin(1)
+        fetched = fetch_range_fn(run_start, run_end)
+        if fetched is None:
+            return None
+
+        for month_start in run:
+            month_end = month_start + pd.offsets.MonthBegin(1)
+            if fetched.empty:
+                month_df = fetched
+            else:
+                month_df = fetched[(fetched.index >= month_start) & (fetched.index < month_end)]
+            partitions[month_start] = month_df
+
+            if month_end > now_utc:
+                continue
+            if not _covers_month(month_df, month_start, month_end, tf_label):
+                coverage = f"only has bars from {month_df.index[0]} to {month_df.index[-1]}" if not month_df.empty else "has no bars"
+                logger.info("Bar cache: %s %s %s %s; not caching it.", symbol, tf_label, f"{month_start:%Y-%m}", coverage)
+                continue
+            path = _partition_path(symbol, tf_label, month_start)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + ".tmp"
+                month_df.to_parquet(tmp_path)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                logger.warning("Bar cache: could not write %s (%s).", path, e)
+
+    frames = [partitions[m] for m in months if not partitions[m].empty]
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames) if len(frames) > 1 else frames[0]
+    df = df[(df.index >= start_utc) & (df.index <= end_utc)]
+    return df
+
+def clear_bar_cache(symbol: str | None = None, timeframe_mt5: int | None = None):
+    """Removes cached partitions for a symbol (and optionally a single timeframe), or everything."""
+    import shutil
+    target = config.BAR_CACHE_DIR
+    if symbol:
+        target = os.path.join(target, symbol.upper())
+        if timeframe_mt5 is not None:
+            target = os.path.join(target, _timeframe_label(timeframe_mt5))
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+        logger.info("Bar cache: removed %s", target)
@@ -1,6 +1,9 @@
 ### File: X:\AmalTrading\trading_backtesting\broker_interface.py
 
-import MetaTrader5 as mt5
+try:
+    import MetaTrader5 as mt5
+except ImportError: # Live trading needs the terminal; backtests can run without it.
+    mt5 = None
 import time
 from typing import List, Dict, Any, Optional, Tuple 
 import pandas as pd
@@ -17,6 +20,10 @@ class BrokerInterface:
             self._ensure_mt5_connection(attempt_init=True)
 
     def _ensure_mt5_connection(self, attempt_init=False):
+        if mt5 is None:
+            print("BrokerInterface: MetaTrader5 package is not installed.")
+            self.mt5_initialized = False
+            return
         if mt5.terminal_info() is None: 
             self.mt5_initialized = False
             if attempt_init:
@@ -0,0 +1,189 @@
+# forex_backtester_cli/compact_frames.py
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+# Opt-in compact precision (config.COMPACT_PRECISION). A float64 column is stored as float32 only
+# when the round trip loses at most `tolerance` (absolute, in price units; callers pass a
+# fraction of the symbol's pip size), int64 columns become int32 when their range fits, and
+# everything else is left alone. fetch_historical_data compacts the bars and run_backtest the
+# strategy's prepared HTF/LTF frames, indicator columns included. Indicator functions read their
+# inputs with to_numpy(dtype=np.float64), so they still calculate in float64.
+#
+# CompactBars is the at-rest form for holding long histories of many symbols in memory: int32
+# epoch-second times (valid until 2038-01-19), the compacted value columns and boolean columns
+# bit-packed 8 per byte. Sweeps and walk-forward runs keep every symbol's prepared data this way
+# for the whole run (and ship it to their workers so); compact_symbol_data/expand_symbol_data
+# convert, and to_frame() rebuilds a DataFrame equal to compact_frame's only for the backtest.
+
+_INT32_INFO = np.iinfo(np.int32)
+_TICKS_PER_SECOND = {"s": 1, "ms": 1_000, "us": 1_000_000, "ns": 1_000_000_000}
+
+def _fits_float32(values: np.ndarray, tolerance: float) -> bool:
+    with np.errstate(over='ignore', invalid='ignore'):
+        round_trip = values.astype(np.float32).astype(np.float64)
+        error = np.abs(round_trip - values)
+    finite = np.isfinite(values)
+    if not np.array_equal(np.isfinite(round_trip), finite): # Overflowed to inf
+        return False
+    return not finite.any() or float(error[finite].max()) <= tolerance
+
+def _fits_int32(values: np.ndarray) -> bool:
+    return len(values) == 0 or (values.min() >= _INT32_INFO.min and values.max() <= _INT32_INFO.max)
+
+def compact_frame(df: pd.DataFrame, tolerance: float) -> pd.DataFrame:
+    """Copy of df with float64 -> float32 and int64 -> int32 wherever the values allow it."""
+    downcast = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if dtype == np.float64 and _fits_float32(df[col].to_numpy(), tolerance):
+            downcast[col] = np.float32
+        elif dtype == np.int64 and _fits_int32(df[col].to_numpy()):
+            downcast[col] = np.int32
+    compact = df.astype(downcast) if downcast else df.copy()
+    compact.attrs = dict(df.attrs)
+    return compact
+
+def pack_flags(values) -> np.ndarray:
+    """Boolean array -> uint8 array holding 8 flags per byte."""
+    return np.packbits(np.asarray(values, dtype=bool))
+
+def unpack_flags(packed: np.ndarray, length: int) -> np.ndarray:
+    return np.unpackbits(packed, count=length).astype(bool)
+
+
+@dataclass
+class CompactBars:
+    """A bar/indicator frame at rest: int32 epoch seconds, compacted columns, bit-packed flags."""
+    time: np.ndarray                                # int32 seconds since epoch, UTC
+    columns: dict = field(default_factory=dict)     # name -> float32/int32/other array
+    flags: dict = field(default_factory=dict)       # name -> packed uint8 array
+    column_order: list = field(default_factory=list)
+    attrs: dict = field(default_factory=dict)
+    index_unit: str = "ns"                          # Resolution and name of the rebuilt DatetimeIndex
+    index_name: str | None = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, tolerance: float) -> "CompactBars":
+        if not isinstance(df.index, pd.DatetimeIndex) or df.index.tz is None:
+            raise TypeError("CompactBars needs a tz-aware DatetimeIndex.")
+        index = df.index.tz_convert("UTC")
+        ticks_per_second = _TICKS_PER_SECOND[index.unit]
+        if (index.asi8 % ticks_per_second != 0).any():
+            raise ValueError("CompactBars stores whole seconds; the index has sub-second times.")
+        seconds = index.asi8 // ticks_per_second
+        if not _fits_int32(seconds):
+            raise ValueError("Bar times fall outside the int32 epoch-second range (1901-2038).")
+
+        compact = compact_frame(df, tolerance)
+        bars = cls(time=seconds.astype(np.int32), column_order=list(df.columns), attrs=dict(df.attrs),
+                   index_unit=index.unit, index_name=df.index.name)
+        for col in df.columns:
+            values = compact[col].to_numpy()
+            if values.dtype == bool:
+                bars.flags[col] = pack_flags(values)
+            else:
+                bars.columns[col] = values
+        return bars
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @property
+    def nbytes(self) -> int:
+        return self.time.nbytes + sum(a.nbytes for a in self.columns.values()) + sum(a.nbytes for a in self.flags.values())
+
+    def to_frame(self) -> pd.DataFrame:
+        """Rebuilds the DataFrame (UTC DatetimeIndex), equal to compact_frame of the original."""
+        data = {}
+        for col in self.column_order:
+            data[col] = unpack_flags(self.flags[col], len(self.time)) if col in self.flags else self.columns[col]
+        index = pd.DatetimeIndex(pd.to_datetime(self.time.astype(np.int64), unit='s', utc=True), name=self.index_name)
+        df = pd.DataFrame(data, index=index.as_unit(self.index_unit), columns=self.column_order)
+        df.attrs = dict(self.attrs)
+        return df
+
+def compact_symbol_data(symbol_data: tuple, tolerance: float) -> tuple:
+    """prepare_symbol_data output -> one CompactBars per frame."""
+    return tuple(CompactBars.from_frame(df, tolerance) for df in symbol_data)
+
+def expand_symbol_data(symbol_data: tuple) -> tuple:
+    """Frames of compact_symbol_data output; frames that are not CompactBars pass through unchanged."""
+    return tuple(df.to_frame() if isinstance(df, CompactBars) else df for df in symbol_data)
+
+def compact_error_report(reference: pd.DataFrame, compact: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per shared numeric/bool column: the largest absolute difference where both frames have a
+    value (max_abs_error) and the rows where only one has a value or a flag differs (rows_differing).
+    """
+    report = {}
+    for col in reference.columns:
+        if col not in compact.columns or not pd.api.types.is_numeric_dtype(reference[col]):
+            continue
+        if reference[col].dtype == bool:
+            report[col] = (0.0, int((reference[col].to_numpy() != compact[col].to_numpy(dtype=bool)).sum()))
+            continue
+        ref = reference[col].to_numpy(dtype=np.float64)
+        cmp = compact[col].to_numpy(dtype=np.float64)
+        both = ~(np.isnan(ref) | np.isnan(cmp))
+        max_error = float(np.abs(ref[both] - cmp[both]).max()) if both.any() else 0.0
+        report[col] = (max_error, int((np.isnan(ref) != np.isnan(cmp)).sum()))
+    return pd.DataFrame.from_dict(report, orient='index', columns=['max_abs_error', 'rows_differing'])
+
+
+
+if __name__ == '__main__':
+    # Offline tolerance check on synthetic EURUSD-like bars: every strategy's prepared frames from
+    # float64 bars vs the compacted run (compacted bars in, prepared frames compacted and taken
+    # through CompactBars, so flags are bit-packed). A strategy only passes when every value is
+    # within tolerance and no row differs: a moved swing or flipped flag changes CHoCHs and trades.
+    import config
+    from heikin_ashi import calculate_heikin_ashi
+    from strategies import get_strategy_class
+    from utils import identify_swing_points_zigzag
+
+    pip_size = 0.0001
+    tolerance = config.COMPACT_TOLERANCE_PIPS * pip_size
+    rng = np.random.default_rng(19)
+    n = 20000
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0003, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) + rng.uniform(0, 0.0003, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.0003, n)
+    index = pd.date_range("2024-01-01", periods=n, freq="5min", tz="UTC", name="time")
+    ltf = pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close,
+                        'volume': rng.integers(50, 500, n)}, index=index).round(5)
+    htf = ltf.resample("15min").agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    compact_ltf, compact_htf = compact_frame(ltf, tolerance), compact_frame(htf, tolerance)
+    ltf_at_rest = CompactBars.from_frame(ltf, tolerance)
+    pd.testing.assert_frame_equal(ltf_at_rest.to_frame(), compact_ltf, check_freq=False) # The synthetic index has a freq
+    print(f"LTF bars: {ltf.memory_usage(deep=True).sum() / 1e6:.2f} MB float64, {compact_ltf.memory_usage(deep=True).sum() / 1e6:.2f} MB compact frame, "
+          f"{ltf_at_rest.nbytes / 1e6:.2f} MB at rest")
+
+    common = {"symbol": "EURUSD", "pip_size": pip_size, "sl_buffer_price": config.SL_BUFFER_PIPS * pip_size,
+              "htf_timeframe_str": config.HTF_TIMEFRAME_STR, "ltf_timeframe_str": config.LTF_TIMEFRAME_STR}
+    failed = []
+    for name, params in config.STRATEGY_SPECIFIC_PARAMS.items():
+        results = []
+        for htf_bars, ltf_bars in ((htf, ltf), (compact_htf, compact_ltf)):
+            htf_sw = identify_swing_points_zigzag(htf_bars, config.ZIGZAG_LEN_HTF)
+            ha = calculate_heikin_ashi(ltf_bars)
+            ltf_in = identify_swing_points_zigzag(pd.concat([ltf_bars, ha], axis=1), config.ZIGZAG_LEN_LTF, col_high='ha_high', col_low='ha_low') \
+                     if name in ("ChochHa", "ChochHaSma") else ltf_bars
+            results.append(get_strategy_class(name)(params, common).prepare_data(htf_sw, ltf_in.copy())[1]) # ZLSMAWithFilters adds its columns in place
+        prepared64 = results[0]
+        at_rest = CompactBars.from_frame(results[1], tolerance)
+        prepared32 = at_rest.to_frame()
+        report = compact_error_report(prepared64, prepared32)
+        worst = report['max_abs_error'].idxmax()
+        worst_pips = report['max_abs_error'].max() / pip_size
+        differing = report[report['rows_differing'] > 0]['rows_differing']
+        status = "OK" if worst_pips <= config.COMPACT_TOLERANCE_PIPS and differing.empty else "CHECK"
+        if status != "OK": failed.append(name)
+        saved = 1 - at_rest.nbytes / prepared64.memory_usage(deep=True).sum()
+        print(f"{name:<18} {status}  max error {worst_pips:.2e} pips ({worst}), {saved:.0%} smaller at rest", end="")
+        print("; rows differing: " + ", ".join(f"{col} {count}" for col, count in differing.items()) if len(differing) else "")
+    if failed:
+        raise SystemExit(f"Compact precision changes the prepared frames of: {', '.join(failed)}")
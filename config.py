@@ -1,8 +1,8 @@
 ### File: X:\AmalTrading\trading_backtesting\config.py
 
 # forex_backtester_cli/config.py
-import MetaTrader5 as mt5
 import pandas as pd
+from timeframes import Timeframe
 
 # --- MT5 Connection Configuration ---
 MT5_PATH = r"C:\Program Files\MetaTrader 5\terminal64.exe" 
@@ -10,11 +10,22 @@ ACCOUNT_LOGIN = 692727
 ACCOUNT_PASSWORD = "TgAmVz!4"
 ACCOUNT_SERVER = "TenTrade-Server"
 
+# --- Bar Data Source ---
+# "mt5" reads from the MetaTrader 5 terminal, "file" reads {SYMBOL}_{TF}.csv/.parquet dumps
+# from DATA_SOURCE_DIR (no MetaTrader5 package needed), "archive" memory-maps the append-only
+# bar files in BAR_ARCHIVE_DIR (fill them with `python bar_archive.py`).
+DATA_SOURCE = "mt5"
+DATA_SOURCE_DIR = "Bar_Data"
+BAR_ARCHIVE_DIR = "Bar_Archive"
+
 # --- Timezone Configuration ---
 INTERNAL_TIMEZONE = 'UTC'
 
 # --- Live Trading / Backtesting Behavior ---
-REVERSE_TRADES = True # Set to True to reverse all trade signals
+# Reverses every trade signal (direction flipped, SL and TP swapped) in live trading AND in
+# backtests, sweeps and walk-forward runs; the reversed TP sits at 1/RR of the risk. On by
+# default because the live setup trades reversed; set to False to backtest the raw signals.
+REVERSE_TRADES = True
 
 # --- Default Backtest Parameters ---
 SYMBOLS = ["EURUSD", "USDJPY", "USDCHF", "USDCAD"] 
@@ -22,11 +33,7 @@ SYMBOLS = ["EURUSD", "USDJPY", "USDCHF", "USDCAD"]
 HTF_TIMEFRAME_STR = "M15" 
 LTF_TIMEFRAME_STR = "M5" 
 
-TIMEFRAME_MAP = {
-    "M1": mt5.TIMEFRAME_M1, "M5": mt5.TIMEFRAME_M5, "M15": mt5.TIMEFRAME_M15,
-    "M30": mt5.TIMEFRAME_M30, "H1": mt5.TIMEFRAME_H1, "H4": mt5.TIMEFRAME_H4,
-    "D1": mt5.TIMEFRAME_D1, "W1": mt5.TIMEFRAME_W1, "MN1": mt5.TIMEFRAME_MN1,
-}
+TIMEFRAME_MAP = {tf.name: tf for tf in Timeframe} # Values equal the mt5.TIMEFRAME_* constants
 HTF_MT5 = TIMEFRAME_MAP.get(HTF_TIMEFRAME_STR)
 LTF_MT5 = TIMEFRAME_MAP.get(LTF_TIMEFRAME_STR)
 
@@ -44,6 +51,33 @@ if HTF_TIMEDELTA is None:
     elif HTF_TIMEFRAME_STR == "H1": HTF_TIMEDELTA = pd.Timedelta(hours=1)
     else: HTF_TIMEDELTA = pd.Timedelta(days=1) 
 
+# --- Local Bar Cache ---
+# Closed months of fetched bars are stored as Parquet partitions and reused across runs.
+ENABLE_BAR_CACHE = True
+BAR_CACHE_DIR = "Bar_Cache"
+
+# --- Indicator Cache ---
+# Indicator/Heikin Ashi/swing results keyed by data fingerprint and parameters (see indicator_cache.py).
+ENABLE_INDICATOR_CACHE = True
+INDICATOR_CACHE_MAX_MB = 256 # Memory for cached results (least recently used are dropped first)
+INDICATOR_CACHE_DIR = None # e.g. "Indicator_Cache" to also persist results across runs
+
+# --- Compact Precision Mode ---
+# Opt-in: bars and prepared indicator frames are held as float32/int32 where the values allow it
+# (see compact_frames.py); sweeps and walk-forward runs also keep every symbol's prepared data at
+# rest with int32 epoch-second times and bit-packed flags. Saves memory on long multi-symbol
+# histories; results may differ slightly (`python compact_frames.py` shows by how much).
+COMPACT_PRECISION = False
+COMPACT_TOLERANCE_PIPS = 0.01 # Max float32 round-trip error for a column to be downcast
+
+# --- Monte Carlo Trade Resampling ---
+# When > 0, the consolidated report gets a Monte Carlo section for the portfolio trade sequence (see monte_carlo.py).
+MONTE_CARLO_SIMULATIONS = 0 # e.g. 20000
+MONTE_CARLO_METHOD = "bootstrap" # "bootstrap" (draw trades with replacement) or "permute" (reshuffle the same trades)
+MONTE_CARLO_RUIN_R = 50.0 # Loss from the starting balance, in R, counted as ruin (30% of capital at 0.6% risk per trade)
+MONTE_CARLO_CHUNK_SIZE = 10000 # Paths simulated per batch to bound memory; None = all at once
+MONTE_CARLO_SEED = None
+
 START_DATE_STR = "2024-08-01" 
 END_DATE_STR = "2025-03-31"   
 
@@ -67,12 +101,24 @@ BE_SL_TRIGGER_R = 1.0
 BE_SL_LOOKBACK_PERIOD = 5  
 BE_SL_FIXED_PIPS = 15      
 
+# --- Capital Simulation ---
+# Sizes every backtest trade from current equity like the live portfolio manager and adds a
+# currency equity section to the consolidated report (see portfolio_simulator.py). Marks open
+# trades on the LTF closes the backtest already loaded.
+ENABLE_PORTFOLIO_SIMULATION = False
+ACCOUNT_CURRENCY = "USD"
+CONTRACT_SIZE = {"XAUUSD": 100} # Units per lot; symbols not listed use 100000
+MIN_LOT = 0.01
+MAX_LOT = 100.0
+LOT_STEP = 0.01
+
 PIP_SIZE = {
     "EURUSD": 0.0001, "GBPUSD": 0.0001, "AUDUSD": 0.0001, "NZDUSD": 0.0001,
     "USDCAD": 0.0001, "USDCHF": 0.0001, "CADCHF": 0.0001, "EURCHF": 0.0001, "USDJPY": 0.01, # Corrected JPY pip size
     "EURJPY": 0.01, "GBPJPY": 0.01, "AUDJPY": 0.01, "CADJPY": 0.01, "CHFJPY": 0.01, "XAUUSD": 0.1
 }
-LOG_LEVEL = "INFO" 
+LOG_LEVEL = "INFO" # DEBUG shows per-bar structure/CHoCH evaluation and per-event trade management
+LOG_JSON_PATH = None # e.g. "backtest_log.jsonl" to also write every record as a JSON line
 
 ALLIGATOR_JAW_PERIOD = 13
 ALLIGATOR_JAW_SHIFT = 8
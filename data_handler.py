@@ -1,60 +1,34 @@
 # forex_backtester_cli/data_handler.py
 
-import MetaTrader5 as mt5
 import pandas as pd
 from datetime import datetime
 import pytz # For timezone handling if needed, though MT5 gives UTC
 
-# Import MT5 connection details from config
-from config import MT5_PATH, ACCOUNT_LOGIN, ACCOUNT_PASSWORD, ACCOUNT_SERVER, INTERNAL_TIMEZONE
-
-# Global variable to track MT5 initialization
-mt5_initialized = False
-
-def initialize_mt5_connection():
-    """Initializes connection to MetaTrader 5 if not already initialized."""
-    global mt5_initialized
-    if mt5_initialized:
-        return True
-
-    print("Initializing MetaTrader 5 connection for data handler...")
-    init_args = []
-    init_kwargs = {}
-
-    if MT5_PATH:
-        init_args.append(MT5_PATH)
-    if ACCOUNT_LOGIN:
-        init_kwargs['login'] = ACCOUNT_LOGIN
-        if ACCOUNT_PASSWORD:
-            init_kwargs['password'] = ACCOUNT_PASSWORD
-        if ACCOUNT_SERVER:
-            init_kwargs['server'] = ACCOUNT_SERVER
-    
-    if not mt5.initialize(*init_args, **init_kwargs):
-        print(f"MT5 initialize() failed, error code = {mt5.last_error()}")
-        # Consider raising an exception or returning False to halt execution
-        return False
-    
-    print("MT5 connection successful.")
-    mt5_initialized = True
-    return True
-
-def shutdown_mt5_connection():
-    """Shuts down the MetaTrader 5 connection if initialized."""
-    global mt5_initialized
-    if mt5_initialized:
-        print("Shutting down MetaTrader 5 connection.")
-        mt5.shutdown()
-        mt5_initialized = False
+import config
+from config import INTERNAL_TIMEZONE
+from bar_cache import fetch_bars_cached
+from data_sources import get_data_source
+from timeframes import Timeframe
+from compact_frames import compact_frame
+
+def initialize_data_source():
+    """Initializes the configured bar source (MT5 terminal or file dumps, see config.DATA_SOURCE)."""
+    return get_data_source().initialize()
+
+def shutdown_data_source():
+    """Releases the configured bar source (shuts down the MT5 connection if one was opened)."""
+    get_data_source().shutdown()
+
+# Kept for existing callers.
+initialize_mt5_connection = initialize_data_source
+shutdown_mt5_connection = shutdown_data_source
 
 def fetch_historical_data(symbol: str, timeframe_mt5: int, start_date_str: str, end_date_str: str) -> pd.DataFrame | None:
     """
-    Fetches historical OHLCV data from MetaTrader 5.
+    Fetches historical OHLCV data from the configured data source (MetaTrader 5 by default).
     Timestamps in the returned DataFrame are UTC.
+    Fully closed months are served from the local bar cache when ENABLE_BAR_CACHE is set.
     """
-    if not initialize_mt5_connection():
-        return None
-
     try:
         # Convert string dates to datetime objects
         # MT5 expects naive datetime objects, assuming they are UTC for the query
@@ -69,16 +43,42 @@ def fetch_historical_data(symbol: str, timeframe_mt5: int, start_date_str: str,
         print(f"Error parsing date strings: {e}")
         return None
 
+    if config.ENABLE_BAR_CACHE and config.DATA_SOURCE == "mt5": # File dumps are already local
+        df = fetch_bars_cached(symbol, timeframe_mt5, start_datetime_utc, end_datetime_utc,
+                               lambda range_start, range_end: _fetch_rates_range(symbol, timeframe_mt5, range_start, range_end))
+    else:
+        df = _fetch_rates_range(symbol, timeframe_mt5, start_datetime_utc, end_datetime_utc)
+
+    if df is None:
+        return None
+    if df.empty:
+        print(f"No data returned for {symbol} in the specified range and timeframe.")
+        return df
+
+    # Labels for the indicator cache keys (the cache itself fingerprints the data)
+    df.attrs['symbol'] = symbol
+    df.attrs['timeframe'] = Timeframe(timeframe_mt5).name
+    if config.COMPACT_PRECISION:
+        from backtester import get_pip_size # Local import: backtester -> plotly_plotting -> data_handler
+        df = compact_frame(df, config.COMPACT_TOLERANCE_PIPS * get_pip_size(symbol))
+    print(f"Successfully fetched {len(df)} bars for {symbol}.")
+    return df
+
+def _fetch_rates_range(symbol: str, timeframe_mt5: int, start_datetime_utc, end_datetime_utc) -> pd.DataFrame | None:
+    """Requests [start, end] from the data source and returns the normalized OHLCV DataFrame."""
+    source = get_data_source()
+    if not source.initialize():
+        return None
+
     print(f"Fetching data for {symbol} on timeframe {timeframe_mt5} from {start_datetime_utc} to {end_datetime_utc} (UTC)...")
     
-    rates = mt5.copy_rates_range(symbol, timeframe_mt5, start_datetime_utc, end_datetime_utc)
+    rates = source.copy_rates_range(symbol, timeframe_mt5, start_datetime_utc, end_datetime_utc)
 
     if rates is None:
-        print(f"mt5.copy_rates_range() for {symbol} returned None. Error: {mt5.last_error()}")
+        print(f"{source.name}.copy_rates_range() for {symbol} returned None. Error: {source.last_error()}")
         return None
     
     if len(rates) == 0:
-        print(f"No data returned for {symbol} in the specified range and timeframe.")
         return pd.DataFrame() # Return empty DataFrame
 
     df = pd.DataFrame(rates)
@@ -94,8 +94,6 @@ def fetch_historical_data(symbol: str, timeframe_mt5: int, start_date_str: str,
     df = df[[col for col in standard_cols if col in df.columns]]
     df.rename(columns={'tick_volume': 'volume'}, inplace=True, errors='ignore')
 
-
-    print(f"Successfully fetched {len(df)} bars for {symbol}.")
     return df
 
 # Example usage (can be removed or put in a test section later)
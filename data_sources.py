@@ -0,0 +1,196 @@
+# forex_backtester_cli/data_sources.py
+
+import os
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+
+import config
+from timeframes import Timeframe
+
+# Same record layout as the arrays returned by MetaTrader5.copy_rates_*
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+])
+
+def _to_epoch_seconds(value) -> int:
+    """datetime / Timestamp / str (naive values are taken as UTC) -> epoch seconds."""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return int(ts.timestamp())
+
+class BarDataSource(ABC):
+    """
+    Minimal bar-provider interface mirroring the MT5 calls the backtester relies on.
+    Both copy methods return a numpy structured array with RATES_DTYPE (oldest bar first),
+    or None on failure; last_error() then describes the failure.
+    """
+    name = "base"
+
+    def initialize(self) -> bool:
+        return True
+
+    def shutdown(self):
+        pass
+
+    @abstractmethod
+    def copy_rates_range(self, symbol: str, timeframe: int, date_from, date_to) -> np.ndarray | None:
+        """Bars with date_from <= time <= date_to."""
+        pass
+
+    @abstractmethod
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int) -> np.ndarray | None:
+        """`count` bars ending `start_pos` bars before the most recent one (0 = current bar)."""
+        pass
+
+    def last_error(self):
+        return None
+
+class MT5DataSource(BarDataSource):
+    """Pass-through to a running MetaTrader 5 terminal. The package is imported on first use."""
+    name = "mt5"
+
+    def __init__(self):
+        self._mt5 = None
+        self._initialized = False
+
+    def initialize(self) -> bool:
+        if self._initialized:
+            return True
+        try:
+            import MetaTrader5 as mt5
+        except ImportError:
+            print("MT5DataSource: MetaTrader5 package is not installed. Use the 'file' data source instead.")
+            return False
+        self._mt5 = mt5
+
+        print("Initializing MetaTrader 5 connection for data handler...")
+        init_args = []
+        init_kwargs = {}
+        if config.MT5_PATH:
+            init_args.append(config.MT5_PATH)
+        if config.ACCOUNT_LOGIN:
+            init_kwargs['login'] = config.ACCOUNT_LOGIN
+            if config.ACCOUNT_PASSWORD:
+                init_kwargs['password'] = config.ACCOUNT_PASSWORD
+            if config.ACCOUNT_SERVER:
+                init_kwargs['server'] = config.ACCOUNT_SERVER
+
+        if not mt5.initialize(*init_args, **init_kwargs):
+            print(f"MT5 initialize() failed, error code = {mt5.last_error()}")
+            return False
+
+        print("MT5 connection successful.")
+        self._initialized = True
+        return True
+
+    def shutdown(self):
+        if self._initialized:
+            print("Shutting down MetaTrader 5 connection.")
+            self._mt5.shutdown()
+            self._initialized = False
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        if not self.initialize(): return None
+        return self._mt5.copy_rates_range(symbol, int(timeframe), date_from, date_to)
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        if not self.initialize(): return None
+        return self._mt5.copy_rates_from_pos(symbol, int(timeframe), start_pos, count)
+
+    def last_error(self):
+        return self._mt5.last_error() if self._mt5 is not None else None
+
+class FileDataSource(BarDataSource):
+    """
+    Serves bars from dumps in `root_dir` named {SYMBOL}_{TF}.parquet or {SYMBOL}_{TF}.csv
+    (e.g. EURUSD_M5.csv). Expected columns: time (epoch seconds or a UTC date string),
+    open, high, low, close and tick_volume (or volume); spread and real_volume are optional.
+    Each file is loaded once and kept in memory as a time-sorted rates array.
+    """
+    name = "file"
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._rates = {}
+        self._last_error = None
+
+    def _file_path(self, symbol: str, timeframe: int) -> str | None:
+        tf_label = Timeframe(int(timeframe)).name
+        for ext in (".parquet", ".csv"):
+            path = os.path.join(self.root_dir, f"{symbol.upper()}_{tf_label}{ext}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _load(self, symbol: str, timeframe: int) -> np.ndarray | None:
+        key = (symbol.upper(), int(timeframe))
+        if key in self._rates:
+            return self._rates[key]
+
+        path = self._file_path(symbol, timeframe)
+        if path is None:
+            self._last_error = f"No bar file for {symbol} {Timeframe(int(timeframe)).name} in {self.root_dir}"
+            return None
+
+        df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+        df.columns = [str(c).lower() for c in df.columns]
+        if 'time' not in df.columns and df.index.name == 'time':
+            df = df.reset_index()
+        if 'tick_volume' not in df.columns and 'volume' in df.columns:
+            df = df.rename(columns={'volume': 'tick_volume'})
+
+        time_col = df['time']
+        if pd.api.types.is_numeric_dtype(time_col):
+            epoch = time_col.to_numpy(dtype=np.int64)
+        else:
+            epoch = ((pd.to_datetime(time_col, utc=True) - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+
+        rates = np.zeros(len(df), dtype=RATES_DTYPE)
+        rates['time'] = epoch
+        for col in ('open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume'):
+            if col in df.columns:
+                rates[col] = df[col].to_numpy()
+
+        order = np.argsort(rates['time'], kind='stable')
+        rates = rates[order]
+        print(f"FileDataSource: loaded {len(rates)} bars from {path}")
+        self._rates[key] = rates
+        return rates
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        rates = self._load(symbol, timeframe)
+        if rates is None: return None
+        lo = np.searchsorted(rates['time'], _to_epoch_seconds(date_from), side='left')
+        hi = np.searchsorted(rates['time'], _to_epoch_seconds(date_to), side='right')
+        return rates[lo:hi].copy()
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        rates = self._load(symbol, timeframe)
+        if rates is None: return None
+        end = len(rates) - start_pos
+        if end <= 0:
+            return rates[:0].copy()
+        return rates[max(0, end - count):end].copy()
+
+    def last_error(self):
+        return self._last_error
+
+_active_source = None
+
+def get_data_source() -> BarDataSource:
+    """Returns the process-wide source selected by config.DATA_SOURCE ('mt5', 'file' or 'archive')."""
+    global _active_source
+    if _active_source is None or _active_source.name != config.DATA_SOURCE:
+        if config.DATA_SOURCE == "mt5":
+            _active_source = MT5DataSource()
+        elif config.DATA_SOURCE == "file":
+            _active_source = FileDataSource(config.DATA_SOURCE_DIR)
+        elif config.DATA_SOURCE == "archive":
+            from bar_archive import ArchiveDataSource # bar_archive builds on this module
+            _active_source = ArchiveDataSource(config.BAR_ARCHIVE_DIR)
+        else:
+            raise ValueError(f"Unknown DATA_SOURCE: {config.DATA_SOURCE}")
+    return _active_source
@@ -1,6 +1,10 @@
 # forex_backtester_cli/heikin_ashi.py
+import numpy as np
 import pandas as pd
+from recursive_filters import first_order_filter
+from indicator_cache import cached_indicator
 
+@cached_indicator
 def calculate_heikin_ashi(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calculates Heikin Ashi candles from a DataFrame with 'open', 'high', 'low', 'close'.
@@ -9,26 +13,27 @@ def calculate_heikin_ashi(df: pd.DataFrame) -> pd.DataFrame:
     if not all(col in df.columns for col in ['open', 'high', 'low', 'close']):
         raise ValueError("Input DataFrame must contain 'open', 'high', 'low', 'close' columns.")
 
-    ha_df = pd.DataFrame(index=df.index)
-
-    ha_df['ha_close'] = (df['open'] + df['high'] + df['low'] + df['close']) / 4
+    open_ = df['open'].to_numpy(dtype=np.float64)
+    close = df['close'].to_numpy(dtype=np.float64)
+    ha_close = (open_ + df['high'].to_numpy(dtype=np.float64) + df['low'].to_numpy(dtype=np.float64) + close) / 4
 
-    # Calculate initial ha_open (can be same as regular open for the first bar)
-    ha_df['ha_open'] = df['open'] # Default for the first bar
-    for i in range(1, len(df)):
-        ha_df.loc[df.index[i], 'ha_open'] = \
-            (ha_df.loc[df.index[i-1], 'ha_open'] + ha_df.loc[df.index[i-1], 'ha_close']) / 2
-    
-    # For the very first ha_open, if we want to strictly follow the formula,
-    # we can set it to (open + close) / 2 of the first regular bar,
-    # or simply use the regular open as a common practice.
-    # Let's refine the first ha_open to be based on its own bar's open/close if it's the first record.
-    if len(df) > 0:
-         ha_df.loc[df.index[0], 'ha_open'] = (df.loc[df.index[0],'open'] + df.loc[df.index[0],'close']) / 2
+    # ha_open[i] = (ha_open[i-1] + ha_close[i-1]) / 2, seeded with the regular open of the first bar.
+    # This is the first-order filter y[k] = 0.5*y[k-1] + 0.5*x[k] over x = ha_close[:-1];
+    # halving is exact in binary floating point, so the result matches the scalar recursion bit for bit.
+    ha_open = np.empty_like(ha_close)
+    if len(ha_close) > 0:
+        ha_open[0] = open_[0]
+        if len(ha_close) > 1:
+            ha_open[1:] = first_order_filter(ha_close[:-1], 0.5, 0.5, y_init=open_[0])
+        # The first ha_open is then refined to be based on its own bar's open/close.
+        ha_open[0] = (open_[0] + close[0]) / 2
 
-
-    ha_df['ha_high'] = ha_df[['ha_open', 'ha_close']].join(df['high']).max(axis=1)
-    ha_df['ha_low'] = ha_df[['ha_open', 'ha_close']].join(df['low']).min(axis=1)
+    ha_df = pd.DataFrame(index=df.index)
+    ha_df['ha_open'] = ha_open
+    ha_df['ha_close'] = ha_close
+    # fmax/fmin skip NaNs like DataFrame.max(axis=1)/min(axis=1)
+    ha_df['ha_high'] = np.fmax(np.fmax(ha_open, ha_close), df['high'].to_numpy(dtype=np.float64))
+    ha_df['ha_low'] = np.fmin(np.fmin(ha_open, ha_close), df['low'].to_numpy(dtype=np.float64))
     
     return ha_df[['ha_open', 'ha_high', 'ha_low', 'ha_close']]
 
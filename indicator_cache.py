@@ -0,0 +1,215 @@
+# forex_backtester_cli/indicator_cache.py
+
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Results of the decorated indicator/swing functions are keyed by
+# (symbol, timeframe, data fingerprint, function, code version, parameters).
+# symbol/timeframe come from DataFrame.attrs (set by data_handler.fetch_historical_data)
+# and only make keys readable; the fingerprint hashes the actual index and values, so two
+# different frames can never share an entry.
+# The code version hashes the source file of the function's module, so editing an indicator
+# retires its pickled results; CACHE_VERSION covers changes in helpers defined elsewhere
+# (recursive_filters.py, ...) and must be bumped when one changes what a cached function returns.
+# Tier 1 is an in-process LRU bounded by INDICATOR_CACHE_MAX_MB (array and frame bytes, not
+# entries); tier 2 (optional) is one pickle file per key in
+# INDICATOR_CACHE_DIR. A computed result is stored as is and returned to the caller that missed,
+# so that caller must treat it as read-only (assigning it to a new column is fine); every hit gets
+# its own copy, which may be mutated.
+# Arguments named in derived_args are only a shortcut computed from the other arguments (e.g. a
+# structure timeline of the same frame) and are left out of the key.
+
+CACHE_VERSION = 1
+
+_memory_cache = OrderedDict()
+_entry_bytes = {}
+_cache_bytes = 0
+_stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+def _code_version(func) -> str:
+    try:
+        with open(inspect.getsourcefile(func), "rb") as f:
+            source = f.read()
+    except (OSError, TypeError):
+        source = func.__code__.co_code
+    return hashlib.blake2b(source + f":{CACHE_VERSION}".encode(), digest_size=8).hexdigest()
+
+def _result_nbytes(result) -> int:
+    """Memory held by a cached result's arrays (frames, series, arrays, tuples and plain objects of them)."""
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True).sum())
+    if isinstance(result, pd.Series):
+        return int(result.memory_usage(index=True))
+    if isinstance(result, (np.ndarray, pd.Index)):
+        return int(result.nbytes)
+    if isinstance(result, (tuple, list)):
+        return sum(_result_nbytes(r) for r in result)
+    if hasattr(result, "__dict__"):
+        return sum(_result_nbytes(v) for v in vars(result).values())
+    return 0
+
+def _fingerprint(obj) -> str:
+    """Content hash of a Series/DataFrame (index, column names, values)."""
+    h = hashlib.blake2b(digest_size=16)
+    index = obj.index
+    if isinstance(index, pd.DatetimeIndex):
+        h.update(str(index.tz).encode())
+        h.update(np.ascontiguousarray(index.asi8).tobytes())
+    else:
+        h.update(pd.util.hash_pandas_object(index.to_series(), index=False).to_numpy().tobytes())
+    columns = obj.items() if isinstance(obj, pd.DataFrame) else [(obj.name, obj)]
+    for name, col in columns:
+        h.update(repr(name).encode())
+        values = col.to_numpy()
+        if values.dtype.kind in "biuf":
+            h.update(values.dtype.str.encode())
+            h.update(np.ascontiguousarray(values).tobytes())
+        else:
+            h.update(pd.util.hash_pandas_object(col, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _describe_arg(arg):
+    if isinstance(arg, (pd.Series, pd.DataFrame)):
+        return ("data", arg.attrs.get("symbol"), arg.attrs.get("timeframe"), len(arg), _fingerprint(arg))
+    return ("value", repr(arg))
+
+def _make_key(func, args, kwargs, signature: inspect.Signature | None = None, derived_args: tuple = (),
+              code_version: str = "") -> tuple:
+    if derived_args:
+        bound = signature.bind(*args, **kwargs)
+        args, kwargs = (), {k: v for k, v in bound.arguments.items() if k not in derived_args}
+    return (func.__module__, func.__qualname__, code_version,
+            tuple(_describe_arg(a) for a in args),
+            tuple(sorted((k, _describe_arg(v)) for k, v in kwargs.items())))
+
+def _copy_result(result):
+    if isinstance(result, (pd.Series, pd.DataFrame)):
+        return result.copy()
+    if isinstance(result, np.ndarray):
+        return result.copy()
+    if isinstance(result, tuple):
+        return tuple(_copy_result(r) for r in result)
+    return result
+
+def _disk_path(key: tuple) -> str:
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=20).hexdigest()
+    return os.path.join(config.INDICATOR_CACHE_DIR, key[1], f"{digest}.pkl")
+
+def _disk_get(key: tuple):
+    path = _disk_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            stored_key, result = pickle.load(f)
+        return result if stored_key == key else None
+    except Exception as e:
+        logger.warning("Indicator cache: could not read %s (%s).", path, e)
+        return None
+
+def _disk_put(key: tuple, result):
+    path = _disk_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((key, result), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning("Indicator cache: could not write %s (%s).", path, e)
+
+def _forget(key: tuple):
+    global _cache_bytes
+    del _memory_cache[key]
+    _cache_bytes -= _entry_bytes.pop(key)
+
+def _remember(key: tuple, result):
+    global _cache_bytes
+    max_bytes = max(config.INDICATOR_CACHE_MAX_MB, 0) * 1024 * 1024
+    nbytes = _result_nbytes(result)
+    if key in _memory_cache:
+        _forget(key)
+    if nbytes > max_bytes:
+        return # Larger than the whole cache: not kept in memory
+    _memory_cache[key] = result
+    _entry_bytes[key] = nbytes
+    _cache_bytes += nbytes
+    while _cache_bytes > max_bytes:
+        _forget(next(iter(_memory_cache)))
+
+def cached_indicator(func=None, *, derived_args: tuple = ()):
+    """
+    Decorator: serve repeated calls with identical data and parameters from the cache.
+    Use as @cached_indicator or @cached_indicator(derived_args=("name", ...)).
+    """
+    if func is None:
+        return functools.partial(cached_indicator, derived_args=tuple(derived_args))
+    signature = inspect.signature(func) if derived_args else None
+    code_version = _code_version(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not config.ENABLE_INDICATOR_CACHE:
+            return func(*args, **kwargs)
+
+        key = _make_key(func, args, kwargs, signature, derived_args, code_version)
+        if key in _memory_cache:
+            _stats["hits"] += 1
+            _memory_cache.move_to_end(key)
+            return _copy_result(_memory_cache[key])
+
+        if config.INDICATOR_CACHE_DIR:
+            result = _disk_get(key)
+            if result is not None:
+                _stats["disk_hits"] += 1
+                _remember(key, result)
+                return _copy_result(result)
+
+        _stats["misses"] += 1
+        result = func(*args, **kwargs)
+        _remember(key, result)
+        if config.INDICATOR_CACHE_DIR:
+            _disk_put(key, result)
+        return result
+    return wrapper
+
+def indicator_cache_stats() -> dict:
+    """
+    Hit/miss counters since start (or the last clear), including any merged from worker
+    processes, plus this process's current LRU size (entries and bytes).
+    """
+    return dict(_stats, entries=len(_memory_cache), bytes=_cache_bytes)
+
+def indicator_cache_counters_since(start: dict) -> dict:
+    """Counter increase since an earlier indicator_cache_stats() (what a worker task did)."""
+    return {name: _stats[name] - start.get(name, 0) for name in _stats}
+
+def merge_indicator_cache_counters(counters: dict):
+    """Adds a worker's indicator_cache_counters_since() to this process's counters."""
+    for name in _stats:
+        _stats[name] += counters.get(name, 0)
+
+def clear_indicator_cache(disk: bool = False):
+    """Empties the in-memory LRU and resets the counters; disk=True also removes INDICATOR_CACHE_DIR."""
+    global _cache_bytes
+    _memory_cache.clear()
+    _entry_bytes.clear()
+    _cache_bytes = 0
+    for k in _stats:
+        _stats[k] = 0
+    if disk and config.INDICATOR_CACHE_DIR and os.path.isdir(config.INDICATOR_CACHE_DIR):
+        import shutil
+        shutil.rmtree(config.INDICATOR_CACHE_DIR)
+        logger.info("Indicator cache: removed %s", config.INDICATOR_CACHE_DIR)
@@ -3,131 +3,158 @@
 # forex_backtester_cli/indicators.py
 import pandas as pd
 import numpy as np
-from scipy.stats import linregress # For linear regression
+from recursive_filters import wilder_smoothing, second_order_filter
+from indicator_cache import cached_indicator
 
 def calculate_sma(series: pd.Series, length: int) -> pd.Series:
     return series.rolling(window=length).mean()
 
+@cached_indicator
 def calculate_smma(series: pd.Series, length: int) -> pd.Series:
     """Calculates Smoothed Moving Average (SMMA) / Wilder's Smoothing."""
     # SMMA(i) = (SMMA(i-1) * (length - 1) + series(i)) / length
     # First value is a simple moving average.
-    smma = pd.Series(np.nan, index=series.index, dtype=float)
-    if len(series) == 0 or length <= 0:
-        return smma
-    if length > len(series): # Not enough data for even one SMA
-        return smma
-
-    # Calculate initial SMA for the first value
-    # Ensure we only calculate if we have enough data points for the first SMA
-    if len(series) >= length:
-        smma.iloc[length-1] = series.iloc[:length].mean()
-    else: # Should not happen if length > len(series) check is done, but defensive
-        return smma
-
-    # Apply recursive formula for subsequent values
-    for i in range(length, len(series)):
-        if pd.isna(smma.iloc[i-1]): # Should not happen after first SMA if data is continuous
-             # Fallback: recalculate SMA for current window if prev SMMA is NaN
-             # This might happen if series has internal NaNs not handled before this function
-            current_window = series.iloc[i-length+1:i+1]
-            if not current_window.isna().any():
-                smma.iloc[i] = current_window.mean()
-            # else smma.iloc[i] remains NaN
-        else:
-            smma.iloc[i] = (smma.iloc[i-1] * (length - 1) + series.iloc[i]) / length
-    return smma
+    if len(series) == 0 or length <= 0 or length > len(series):
+        return pd.Series(np.nan, index=series.index, dtype=float)
+    # If series has internal NaNs, the SMMA restarts from the window SMA once the window is clean again
+    smma = wilder_smoothing(series.to_numpy(dtype=np.float64), length, series.iloc[:length].mean())
+    return pd.Series(smma, index=series.index)
 
 
+@cached_indicator
 def calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, length: int) -> pd.Series:
     if not (isinstance(high, pd.Series) and isinstance(low, pd.Series) and isinstance(close, pd.Series)):
         raise TypeError("Inputs high, low, close must be pandas Series.")
     if not (len(high) == len(low) == len(close)):
         raise ValueError("Inputs high, low, close must have the same length.")
 
+    tr = _true_range(high, low, close)
+    # Using EWM for ATR (Wilder's smoothing)
+    atr = tr.ewm(alpha=1/length, adjust=False, min_periods=length).mean() 
+    return atr
+
+def _true_range(high: pd.Series, low: pd.Series, close: pd.Series) -> pd.Series:
     prev_close = close.shift(1)
     tr1 = pd.Series(high - low)
     tr2 = pd.Series(abs(high - prev_close))
     tr3 = pd.Series(abs(low - prev_close))
-    
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    # Using EWM for ATR (Wilder's smoothing)
-    atr = tr.ewm(alpha=1/length, adjust=False, min_periods=length).mean() 
-    return atr
+    return pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+
+def _rolling_nan_mask(values: np.ndarray, length: int) -> np.ndarray:
+    """True for every full window (aligned to its last bar, len(values)-length+1 rows) holding a NaN."""
+    nan_count = np.concatenate(([0], np.cumsum(np.isnan(values))))
+    return (nan_count[length:] - nan_count[:-length]) > 0
 
+def _linreg_endpoint_weights(length: int) -> np.ndarray:
+    """
+    The least-squares line through (k, y_k), k = 0..length-1, evaluated at k = length-1 is
+    sum(w_k * y_k) with these fixed weights (intercept + slope * (length-1) expanded).
+    """
+    x = np.arange(length, dtype=np.float64)
+    x_mean = x.mean()
+    sxx = ((x - x_mean) ** 2).sum()
+    return 1.0 / length + (x - x_mean) * (length - 1 - x_mean) / sxx
+
+@cached_indicator
 def calculate_linreg_value(series: pd.Series, length: int) -> pd.Series:
-    """Calculates the endpoint of a linear regression line over a rolling window."""
-    if len(series) < length:
-        return pd.Series(np.nan, index=series.index)
-    
-    linreg_values = pd.Series(np.nan, index=series.index)
-    x = np.arange(length)
-    for i in range(length - 1, len(series)):
-        y_window = series.iloc[i - length + 1 : i + 1].values
-        if np.isnan(y_window).any() or len(y_window) < length: 
+    """
+    Calculates the endpoint of a linear regression line over a rolling window.
+    The endpoint is a fixed weighted sum of the window, so the whole series is one sliding
+    dot product. Windows containing NaN give NaN.
+    """
+    return pd.Series(_linreg_columns(series.to_numpy(dtype=np.float64), [length])[:, 0], index=series.index)
+
+def _linreg_columns(values: np.ndarray, lengths) -> np.ndarray:
+    """Rolling linreg endpoints of `values` for each length, as a (bars x lengths) array."""
+    n = len(values)
+    out = np.full((n, len(lengths)), np.nan)
+    is_nan = np.isnan(values)
+    clean = np.where(is_nan, 0.0, values) # NaN windows are masked below; zeros keep the others exact
+    nan_count = np.concatenate(([0], np.cumsum(is_nan)))
+    for j, length in enumerate(lengths):
+        if n < length or length < 2: # A line needs at least two points
             continue
-        slope, intercept, r_value, p_value, std_err = linregress(x, y_window)
-        linreg_values.iloc[i] = slope * (length - 1) + intercept 
-    return linreg_values
+        endpoints = np.lib.stride_tricks.sliding_window_view(clean, length) @ _linreg_endpoint_weights(length)
+        endpoints[(nan_count[length:] - nan_count[:-length]) > 0] = np.nan
+        out[length - 1:, j] = endpoints
+    return out
 
+@cached_indicator
 def calculate_zlsma(series: pd.Series, length: int) -> pd.Series:
-    lsma = calculate_linreg_value(series, length)
+    return _zlsma_from_lsma(calculate_linreg_value(series, length), length)
+
+def _zlsma_from_lsma(lsma: pd.Series, length: int) -> pd.Series:
     lsma_filled = lsma.copy()
-    if pd.isna(lsma_filled.iloc[length-1]) and length*2-1 < len(lsma_filled) : 
+    if length*2-1 < len(lsma_filled) and pd.isna(lsma_filled.iloc[length-1]): 
         first_valid_lsma_idx = lsma_filled.first_valid_index()
         if first_valid_lsma_idx is not None:
-            lsma_filled.fillna(method='bfill', limit=length*2, inplace=True) 
-            lsma_filled.fillna(method='ffill', inplace=True) 
+            lsma_filled = lsma_filled.bfill(limit=length*2).ffill()
 
-    lsma2 = calculate_linreg_value(lsma_filled, length)
+    lsma2 = pd.Series(_linreg_columns(lsma_filled.to_numpy(dtype=np.float64), [length])[:, 0], index=lsma.index)
     
     eq = lsma - lsma2 
     zlsma = lsma + eq
     return zlsma
 
+@cached_indicator
 def calculate_range_filter_bands(close: pd.Series, length: int, atr_length: int, atr_mult: float, high: pd.Series, low: pd.Series):
     ma = calculate_sma(close, length)
     atr_values = calculate_atr(high, low, close, atr_length) * atr_mult
     
-    is_in_range = pd.Series(False, index=close.index)
-    range_top = pd.Series(np.nan, index=close.index)
-    range_bottom = pd.Series(np.nan, index=close.index)
-
-    for i in range(length -1, len(close)):
-        if pd.isna(ma.iloc[i]) or pd.isna(atr_values.iloc[i]):
-            continue
-            
-        count = 0
-        for k in range(length): 
-            if i-k < 0: break
-            if abs(close.iloc[i-k] - ma.iloc[i]) > atr_values.iloc[i]:
-                count += 1
-        
-        if count == 0: 
-            is_in_range.iloc[i] = True
-            range_top.iloc[i] = ma.iloc[i] + atr_values.iloc[i]
-            range_bottom.iloc[i] = ma.iloc[i] - atr_values.iloc[i]
+    # A bar is "in range" when none of the last `length` closes is further than ATR from the
+    # current MA. The furthest close is either the window max or the window min, so this is
+    # max(rolling_max - ma, ma - rolling_min) <= atr. Bars with NaN MA or ATR stay out of range.
+    window_max = close.rolling(window=length).max()
+    window_min = close.rolling(window=length).min()
+    is_in_range = ((window_max - ma) <= atr_values) & ((ma - window_min) <= atr_values)
+    is_in_range.iloc[:max(length - 1, 0)] = False
+
+    range_top = (ma + atr_values).where(is_in_range)
+    range_bottom = (ma - atr_values).where(is_in_range)
             
     return is_in_range, range_top, range_bottom
 
 
+@cached_indicator
+def calculate_rolling_r_squared(series: pd.Series, period: int) -> pd.Series:
+    """
+    R^2 of each rolling window of `period` values against time (0..period-1), i.e. the squared
+    correlation linregress would report, from the centered window moments. Windows containing
+    NaN (and the first period-1 bars) are NaN; flat windows (zero variance) give 0.0.
+    """
+    values = series.to_numpy(dtype=np.float64)
+    r_squared = np.full(len(values), np.nan)
+    if period < 2 or len(values) < period:
+        return pd.Series(r_squared, index=series.index)
+
+    r_value = _window_correlation_with_time(np.lib.stride_tricks.sliding_window_view(values, period))
+    r_value[_rolling_nan_mask(values, period)] = np.nan
+    r_squared[period - 1:] = r_value * r_value # Not ** 2: the array power can differ from the scalar square in the last bit
+    return pd.Series(r_squared, index=series.index)
+
+def _window_correlation_with_time(windows: np.ndarray) -> np.ndarray:
+    """Pearson r of each row of `windows` against 0..period-1; flat rows give 0.0."""
+    period = windows.shape[1]
+    x_centered = np.arange(period, dtype=np.float64) - (period - 1) / 2.0
+    y_centered = windows - windows.mean(axis=1, keepdims=True)
+    sxy = np.einsum('ij,j->i', y_centered, x_centered) # Row-by-row, so one window alone gives identical bits
+    syy = np.einsum('ij,ij->i', y_centered, y_centered)
+    sxx = x_centered @ x_centered
+
+    flat = windows.max(axis=1) == windows.min(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r_value = np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+    r_value[flat] = 0.0
+    return r_value
+
+@cached_indicator
 def calculate_adaptive_macd(close: pd.Series, r2_period: int, fast_len: int, slow_len: int, signal_len: int):
-    time_idx = pd.Series(np.arange(len(close)), index=close.index)
-    
-    def rolling_corr_with_time(window_series):
-        if len(window_series) < r2_period : return np.nan # Ensure enough points for rolling window
-        if window_series.isna().any(): return np.nan # Skip if NaNs in window
-        if len(window_series) < 2: return np.nan 
-        
-        # Ensure the x-axis for linregress matches the window length
-        window_time_idx = np.arange(len(window_series))
-        try:
-            slope, intercept, r_value, p_value, std_err = linregress(window_time_idx, window_series.values)
-            return r_value**2
-        except ValueError: # Handle cases where linregress might fail (e.g. all y values are same)
-            return 0.0 # Or np.nan, depending on desired behavior
-
-    r_squared_series = close.rolling(window=r2_period).apply(rolling_corr_with_time, raw=False)
+    close_diff = close.diff().fillna(0).to_numpy(dtype=np.float64)
+    return _adaptive_macd_from_r_squared(close.index, close_diff, calculate_rolling_r_squared(close, r2_period),
+                                         fast_len, slow_len, signal_len)
+
+def _adaptive_macd_from_r_squared(index: pd.Index, close_diff: np.ndarray, r_squared_series: pd.Series,
+                                  fast_len: int, slow_len: int, signal_len: int):
     r2_factor = 0.5 * (r_squared_series) + 0.5 
     r2_factor.fillna(0.5, inplace=True) 
 
@@ -141,24 +168,15 @@ def calculate_adaptive_macd(close: pd.Series, r2_period: int, fast_len: int, slo
     
     K_series = r2_factor * term1_k + (1 - r2_factor) * term2_k
     
-    macd_line = pd.Series(np.nan, index=close.index)
-    close_diff = close.diff()
+    macd_line = pd.Series(np.nan, index=index)
     
-    if len(close) > 2:
-        macd_line.iloc[0] = 0.0 
-        cd1 = close_diff.iloc[1] if not pd.isna(close_diff.iloc[1]) else 0
-        m0 = macd_line.iloc[0] if not pd.isna(macd_line.iloc[0]) else 0
-        macd_line.iloc[1] = cd1 * (a1 - a2) + (-a2 - a1 + 2) * m0
-        
+    if len(index) > 2:
+        # macd[i] = cd[i]*(a1 - a2) + (2 - a1 - a2)*macd[i-1] - K[i]*macd[i-2], seeded with macd[0] = 0
         initial_K = K_series.bfill().iloc[0] if not K_series.empty and not K_series.bfill().empty else 0.5 
-
-        for i in range(2, len(close)):
-            cd = close_diff.iloc[i] if not pd.isna(close_diff.iloc[i]) else 0
-            m1 = macd_line.iloc[i-1] if not pd.isna(macd_line.iloc[i-1]) else 0
-            m2 = macd_line.iloc[i-2] if not pd.isna(macd_line.iloc[i-2]) else 0
-            k_val = K_series.iloc[i] if not pd.isna(K_series.iloc[i]) else initial_K
-            
-            macd_line.iloc[i] = cd * (a1 - a2) + (-a2 - a1 + 2) * m1 - k_val * m2
+        k_values = K_series.fillna(initial_K).to_numpy(dtype=np.float64)
+        drive = close_diff * (a1 - a2)
+        macd_1 = drive[1] + (-a2 - a1 + 2) * 0.0
+        macd_line = pd.Series(second_order_filter(drive, -a2 - a1 + 2, -k_values, 0.0, macd_1), index=index)
     
     signal_line = macd_line.ewm(span=signal_len, adjust=False, min_periods=signal_len).mean()
     histogram = macd_line - signal_line
@@ -179,4 +197,51 @@ def calculate_alligator(
     jaw = calculate_smma(source_series, jaw_period)
     teeth = calculate_smma(source_series, teeth_period)
     lips = calculate_smma(source_series, lips_period)
-    return jaw, teeth, lips
\ No newline at end of file
+    return jaw, teeth, lips
+
+
+# --- Batched variants for parameter sweeps ---
+# Each returns one column per parameter value (bars x params) and computes the parameter-
+# independent parts once. Every column is bit-for-bit what the single-parameter function returns.
+
+@cached_indicator
+def calculate_atr_batch(high: pd.Series, low: pd.Series, close: pd.Series, lengths) -> pd.DataFrame:
+    """calculate_atr for every length in `lengths`, sharing one true-range series."""
+    tr = _true_range(high, low, close)
+    return pd.DataFrame({length: tr.ewm(alpha=1/length, adjust=False, min_periods=length).mean() for length in lengths},
+                        index=close.index, columns=pd.Index(list(lengths), name='length'))
+
+@cached_indicator
+def calculate_linreg_value_batch(series: pd.Series, lengths) -> pd.DataFrame:
+    """calculate_linreg_value for every length in `lengths`, sharing the NaN bookkeeping."""
+    return pd.DataFrame(_linreg_columns(series.to_numpy(dtype=np.float64), list(lengths)),
+                        index=series.index, columns=pd.Index(list(lengths), name='length'))
+
+@cached_indicator
+def calculate_zlsma_batch(series: pd.Series, lengths) -> pd.DataFrame:
+    """calculate_zlsma for every length in `lengths`."""
+    lsma = calculate_linreg_value_batch(series, lengths)
+    return pd.DataFrame({length: _zlsma_from_lsma(lsma[length], length) for length in lsma.columns},
+                        index=series.index, columns=lsma.columns)
+
+@cached_indicator
+def calculate_adaptive_macd_batch(close: pd.Series, param_sets) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    calculate_adaptive_macd for every (r2_period, fast_len, slow_len, signal_len) in `param_sets`.
+    Returns (macd, signal, histogram) frames with one column per parameter set; close.diff()
+    is computed once and the rolling R^2 once per distinct r2_period.
+    """
+    param_sets = [tuple(params) for params in param_sets]
+    close_diff = close.diff().fillna(0).to_numpy(dtype=np.float64)
+    r_squared_by_period = {}
+    macd_cols, signal_cols, hist_cols = {}, {}, {}
+    for r2_period, fast_len, slow_len, signal_len in param_sets:
+        if r2_period not in r_squared_by_period:
+            r_squared_by_period[r2_period] = calculate_rolling_r_squared(close, r2_period)
+        key = (r2_period, fast_len, slow_len, signal_len)
+        macd_cols[key], signal_cols[key], hist_cols[key] = _adaptive_macd_from_r_squared(
+            close.index, close_diff, r_squared_by_period[r2_period], fast_len, slow_len, signal_len)
+
+    columns = pd.MultiIndex.from_tuples(param_sets, names=['r2_period', 'fast_len', 'slow_len', 'signal_len'])
+    return tuple(pd.DataFrame(np.column_stack([cols[key].to_numpy() for key in param_sets]), index=close.index, columns=columns)
+                 for cols in (macd_cols, signal_cols, hist_cols))
@@ -1,5 +1,6 @@
 ### File: X:\AmalTrading\trading_backtesting\live_engine.py
 
+import logging
 import time
 from datetime import datetime
 import pandas as pd
@@ -10,7 +11,11 @@ from strategies import get_strategy_class # To load the active strategy
 from live_data_handler import LiveDataHandler # For fetching live market data
 from broker_interface import BrokerInterface # For interacting with MT5 trading functions
 from live_portfolio_manager import LivePortfolioManager # For managing live trades and lot sizing
+from live_feed import LiveSymbolFeed # Streaming indicator state between polls
 from backtester import get_pip_size # Utility for pip size
+from logging_setup import configure_logging
+
+logger = logging.getLogger(__name__)
 
 # --- Live Engine Configuration ---
 LIVE_SYMBOLS = ["GBPJPY", "EURUSD", "USDJPY", "GBPUSD", "AUDUSD", "EURUSD", "CADJPY"] 
@@ -24,30 +29,31 @@ ROLLING_HTF_BARS = 200
 # --- Full Strategy Engine ---
 def run_live_engine():
     active_strategy_name = config.ACTIVE_STRATEGY_NAME
-    print(f"--- Starting Live Trading Engine ({active_strategy_name}) @ {datetime.now()} ---")
-    print(f"--- Trading Symbols: {', '.join(LIVE_SYMBOLS)} ---")
-    print(f"--- Magic Number for Trades: {MAGIC_NUMBER_LIVE} ---")
+    logger.info("--- Starting Live Trading Engine (%s) @ %s ---", active_strategy_name, datetime.now())
+    logger.info("--- Trading Symbols: %s ---", ', '.join(LIVE_SYMBOLS))
+    logger.info("--- Magic Number for Trades: %s ---", MAGIC_NUMBER_LIVE)
     
     live_data = LiveDataHandler()
     if not live_data.mt5_initialized:
-        print("CRITICAL: Failed to initialize LiveDataHandler. Exiting.")
+        logger.critical("CRITICAL: Failed to initialize LiveDataHandler. Exiting.")
         return
 
     broker = BrokerInterface(live_data_handler_instance=live_data)
     if not broker.mt5_initialized:
-        print("CRITICAL: Failed to initialize BrokerInterface. Exiting.")
+        logger.critical("CRITICAL: Failed to initialize BrokerInterface. Exiting.")
         live_data.shutdown()
         return
         
     account_info_val = mt5.account_info()
     if not account_info_val:
-        print("CRITICAL: Could not get account info. Exiting.")
+        logger.critical("CRITICAL: Could not get account info. Exiting.")
         live_data.shutdown()
         return
     portfolio = LivePortfolioManager(broker, account_currency=account_info_val.currency)
     portfolio.load_existing_positions(magic_number_filter=MAGIC_NUMBER_LIVE) 
 
     strategy_instances = {}
+    live_feeds = {} # Symbols whose strategy supports streaming indicators
     last_ltf_candle_times = {symbol: None for symbol in LIVE_SYMBOLS}
     
     # Initialize strategy instances for each symbol
@@ -63,9 +69,12 @@ def run_live_engine():
         try:
             StrategyClass = get_strategy_class(active_strategy_name)
             strategy_instances[symbol] = StrategyClass(strategy_custom_params, common_params)
-            print(f"Initialized strategy {active_strategy_name} for {symbol}")
+            if strategy_instances[symbol].create_streaming_indicators() is not None:
+                live_feeds[symbol] = LiveSymbolFeed(strategy_instances[symbol], ROLLING_LTF_BARS, ROLLING_HTF_BARS)
+            logger.info("Initialized strategy %s for %s (%s indicators)", active_strategy_name, symbol,
+                        "streaming" if symbol in live_feeds else "batch")
         except ValueError as e:
-            print(f"CRITICAL: Could not initialize strategy for {symbol}: {e}. Exiting.")
+            logger.critical("CRITICAL: Could not initialize strategy for %s: %s. Exiting.", symbol, e)
             live_data.shutdown()
             return
 
@@ -91,7 +100,10 @@ def run_live_engine():
 
                 # 2. Prepare Data: Apply indicators, HA, etc. using the strategy's logic
                 # Pass copies to ensure the original rolling data isn't modified by strategy.
-                _prepared_htf_df, prepared_ltf_df_strat = strategy.prepare_data(
+                # With a live feed only the bars closed since the last poll (plus the forming bar)
+                # go through the strategy's streaming indicators.
+                prepare_fn = live_feeds[symbol].prepare if symbol in live_feeds else strategy.prepare_data
+                _prepared_htf_df, prepared_ltf_df_strat = prepare_fn(
                     htf_df_live_rolling.copy() if htf_df_live_rolling is not None else pd.DataFrame(), 
                     ltf_df_live_rolling.copy()
                 )
@@ -112,7 +124,7 @@ def run_live_engine():
                 if last_ltf_candle_times[symbol] == current_ltf_latest_candle_time:
                     continue 
                 
-                print(f"  New LTF Candle Detected for {symbol}: {current_ltf_latest_candle_time.strftime('%Y-%m-%d %H:%M:%S')}")
+                logger.debug("  New LTF Candle Detected for %s: %s", symbol, current_ltf_latest_candle_time)
                 last_ltf_candle_times[symbol] = current_ltf_latest_candle_time
                 
                 # 5. Check for New Entry Signals (only if no open trade by this bot for this symbol)
@@ -133,7 +145,7 @@ def run_live_engine():
                         ltf_signal_live = strategy.check_ltf_entry_signal(prepared_ltf_df_strat, decision_candle_idx, htf_signal_live)
 
                         if ltf_signal_live:
-                            print(f"  >>> LIVE ENTRY SIGNAL: {symbol} - {ltf_signal_live['type']} at {decision_candle_series.name.strftime('%Y-%m-%d %H:%M:%S')}")
+                            logger.info("  >>> LIVE ENTRY SIGNAL: %s - %s at %s", symbol, ltf_signal_live['type'], decision_candle_series.name)
                             
                             entry_ref_price = decision_candle_series.get('close', 0.0) 
                             # For HA strategies, might prefer ha_close if available and appropriate
@@ -141,7 +153,7 @@ def run_live_engine():
                                 entry_ref_price = decision_candle_series['ha_close']
                             
                             if entry_ref_price == 0.0:
-                                print(f"    Warning: Entry reference price is 0 for {symbol}. Skipping trade.")
+                                logger.warning("    Entry reference price is 0 for %s. Skipping trade.", symbol)
                                 continue
 
                             entry_ref_time = decision_candle_series.name
@@ -168,7 +180,7 @@ def run_live_engine():
                                     trade_comment = f"{active_strategy_name}"
                         
                                     if config.REVERSE_TRADES:
-                                        print(f"    >>> REVERSING LIVE TRADE SIGNAL for {symbol} <<<")
+                                        logger.info("    >>> REVERSING LIVE TRADE SIGNAL for %s <<<", symbol)
                                         final_direction_str = "bearish" if ltf_signal_live['direction'] == 'bullish' else 'bullish'
                                         final_sl_price = tp_price_orig
                                         final_tp_price = sl_price_orig
@@ -176,7 +188,7 @@ def run_live_engine():
                                     
                                     order_mt5_type = mt5.ORDER_TYPE_BUY if final_direction_str == 'bullish' else mt5.ORDER_TYPE_SELL
                                     # --- END OF REVERSAL LOGIC ---
-                                    print(f"    Attempting to open {ltf_signal_live['direction']} for {symbol} vol:{volume:.2f} SL:{sl_price:.5f} TP:{tp_price:.5f}")
+                                    logger.info("    Attempting to open %s for %s vol:%.2f SL:%.5f TP:%.5f", ltf_signal_live['direction'], symbol, volume, sl_price, tp_price)
                                     # order_mt5_type = mt5.ORDER_TYPE_BUY if ltf_signal_live['direction'] == 'bullish' else mt5.ORDER_TYPE_SELL
                                     
                                     # --- ACTUAL ORDER PLACEMENT ---
@@ -188,14 +200,14 @@ def run_live_engine():
                                     # Check if deal_info is valid and represents a successful trade entry
                                     if deal_info and hasattr(deal_info, 'position_id') and deal_info.position_id > 0 and deal_info.entry == mt5.DEAL_ENTRY_IN:
                                         portfolio.add_trade_from_deal(deal_info, active_strategy_name, sl_price, tp_price, f"{active_strategy_name}")
-                                        print(f"    SUCCESS: Order placed for {symbol}. Pos.ID: {deal_info.position_id}")
+                                        logger.info("    SUCCESS: Order placed for %s. Pos.ID: %s", symbol, deal_info.position_id)
                                     else:
-                                        print(f"    FAILURE: Could not place order for {symbol} or invalid deal_info received.")
-                                        if deal_info: print(f"      Deal Info Details: {deal_info}")
+                                        logger.error("    FAILURE: Could not place order for %s or invalid deal_info received.", symbol)
+                                        if deal_info: logger.error("      Deal Info Details: %s", deal_info)
                                 else:
-                                    print(f"    Volume calculation resulted in 0 for {symbol}. No order placed.")
+                                    logger.warning("    Volume calculation resulted in 0 for %s. No order placed.", symbol)
                             else:
-                                print(f"    Invalid SL/TP calculated for {symbol} ({sl_price}, {tp_price}). No order placed.")
+                                logger.warning("    Invalid SL/TP calculated for %s (%s, %s). No order placed.", symbol, sl_price, tp_price)
             time.sleep(0.05)
 
             for ticket_id_closed in list(portfolio.open_trades.keys()): # Iterate on copy
@@ -205,18 +217,17 @@ def run_live_engine():
         time.sleep(POLL_INTERVAL_SECONDS)
 
     except KeyboardInterrupt:
-        print("Live engine stopping due to user request (KeyboardInterrupt)...")
+        logger.info("Live engine stopping due to user request (KeyboardInterrupt)...")
     except Exception as e:
-        print(f"CRITICAL ERROR in live engine: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.critical("CRITICAL ERROR in live engine: %s", e, exc_info=True)
     finally:
-        print("Shutting down live engine components...")
+        logger.info("Shutting down live engine components...")
         if 'live_data' in locals() and live_data.mt5_initialized: # Check if live_data was initialized
             live_data.shutdown()
-        print("Live engine shut down complete.")
+        logger.info("Live engine shut down complete.")
 
 if __name__ == '__main__':    
+    configure_logging()
     # --- Run Full Live Engine ---
     print("\n--- LAUNCHING FULL LIVE TRADING ENGINE ---")
     print("--- Ensure MT5 is running, logged into DEMO, and config is set for live testing. ---")
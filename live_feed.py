@@ -0,0 +1,163 @@
+# forex_backtester_cli/live_feed.py
+
+import copy
+import logging
+
+import numpy as np
+import pandas as pd
+
+import config
+from streaming_indicators import ZigZagTracker
+from utils import identify_swing_points_simple
+
+logger = logging.getLogger(__name__)
+
+# Per-symbol indicator state for the live engine. The rolling frames MT5 returns end with the bar
+# that is still forming; every earlier bar is closed and final. Closed LTF bars are fed once, in
+# order, to the strategy's streaming indicators (strategy.create_streaming_indicators, see
+# streaming_indicators.py) and their prepared rows are kept; the forming bar is evaluated on a
+# copy of that state on every poll. A poll therefore costs one indicator update per new bar
+# instead of prepare_data over the whole window, and the values are those of the batch
+# indicators run over every bar since the feed started rather than re-warmed on each window.
+# HTF swings work the same way: closed HTF bars go through a ZigZagTracker and the swing_high/
+# swing_low columns the structure timeline and CHoCH detection read are its confirmed pivots, so
+# the strategy gets the HTF frame with swings the backtester gives it (with
+# SWING_IDENTIFICATION_METHOD = "simple" they are recomputed on the window instead).
+# If the last fed bar has dropped out of the polled window (the engine fell further behind than
+# the window), that timeframe's state is rebuilt from the window.
+
+class LiveSymbolFeed:
+    """Prepared frames for one symbol, from the strategy's streaming indicators and an HTF ZigZagTracker."""
+    def __init__(self, strategy, max_ltf_bars: int, max_htf_bars: int):
+        self.strategy = strategy
+        self.max_ltf_bars = max_ltf_bars
+        self.max_htf_bars = max_htf_bars
+        self._reset()
+        self._reset_htf()
+
+    def _reset(self):
+        self.indicators = self.strategy.create_streaming_indicators()
+        self.ltf_closed = None # Prepared rows of the closed bars fed so far (last max_ltf_bars)
+        self.last_closed_time = None
+
+    def _reset_htf(self):
+        self.htf_tracker = ZigZagTracker(config.ZIGZAG_LEN_HTF, history=self.max_htf_bars) \
+            if config.SWING_IDENTIFICATION_METHOD == "zigzag" else None
+        self.last_htf_closed_time = None
+
+    def _bars_missing(self, closed_bars: pd.DataFrame, last_time) -> bool:
+        if last_time is None or not (closed_bars.empty or closed_bars.index[0] > last_time):
+            return False
+        logger.warning("%s: bars missing since %s; rebuilding the streaming state from the polled window.",
+                       self.strategy.symbol, last_time)
+        return True
+
+    def _prepared_rows(self, indicators: dict, bars: pd.DataFrame) -> pd.DataFrame:
+        rows = [{**bar, **self.strategy.update_streaming_indicators(indicators, bar)} for bar in bars.to_dict('records')]
+        return pd.DataFrame(rows, index=bars.index)
+
+    def _feed_closed(self, closed_bars: pd.DataFrame):
+        if self._bars_missing(closed_bars, self.last_closed_time):
+            self._reset()
+        new_bars = closed_bars if self.last_closed_time is None else closed_bars[closed_bars.index > self.last_closed_time]
+        if new_bars.empty:
+            return
+        new_rows = self._prepared_rows(self.indicators, new_bars)
+        self.ltf_closed = new_rows if self.ltf_closed is None else pd.concat([self.ltf_closed, new_rows]).iloc[-self.max_ltf_bars:]
+        self.last_closed_time = new_bars.index[-1]
+
+    def _htf_with_swings(self, htf_data: pd.DataFrame) -> pd.DataFrame:
+        if htf_data.empty:
+            return htf_data
+        if self.htf_tracker is None:
+            return identify_swing_points_simple(htf_data, config.N_BARS_LEFT_RIGHT_FOR_SWING_HTF, config.N_BARS_LEFT_RIGHT_FOR_SWING_HTF)
+
+        closed_bars = htf_data.iloc[:-1]
+        if self._bars_missing(closed_bars, self.last_htf_closed_time):
+            self._reset_htf()
+        new_bars = closed_bars if self.last_htf_closed_time is None else closed_bars[closed_bars.index > self.last_htf_closed_time]
+        for time, high, low in zip(new_bars.index, new_bars['high'].to_numpy(), new_bars['low'].to_numpy()):
+            self.htf_tracker.update(high, low, time)
+        if not new_bars.empty:
+            self.last_htf_closed_time = new_bars.index[-1]
+
+        tracker = self.htf_tracker
+        forming_time = htf_data.index[-1]
+        if self.last_htf_closed_time is None or forming_time > self.last_htf_closed_time:
+            tracker = copy.deepcopy(tracker) # The forming bar may confirm a pivot that it later takes back
+            tracker.update(htf_data['high'].iloc[-1], htf_data['low'].iloc[-1], forming_time)
+
+        swings = np.full((len(htf_data), 2), np.nan)
+        pivot_rows = htf_data.index.get_indexer([pivot.time for pivot in tracker.pivots])
+        for row, pivot in zip(pivot_rows, tracker.pivots):
+            if row >= 0:
+                swings[row, 0 if pivot.is_high else 1] = pivot.price
+        htf_with_swings = htf_data.copy()
+        htf_with_swings['swing_high'] = swings[:, 0]
+        htf_with_swings['swing_low'] = swings[:, 1]
+        return htf_with_swings
+
+    def prepare(self, htf_data: pd.DataFrame, ltf_data: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Same contract as strategy.prepare_data for the polled rolling frames (raw OHLC)."""
+        htf_data = self._htf_with_swings(htf_data)
+        if ltf_data.empty:
+            return self.strategy.prepare_live_data(htf_data, ltf_data)
+        self._feed_closed(ltf_data.iloc[:-1])
+        forming_bar = ltf_data.iloc[-1:]
+        if self.last_closed_time is not None and forming_bar.index[0] <= self.last_closed_time:
+            prepared_ltf = self.ltf_closed
+        else:
+            forming_row = self._prepared_rows(copy.deepcopy(self.indicators), forming_bar)
+            prepared_ltf = forming_row if self.ltf_closed is None else pd.concat([self.ltf_closed, forming_row])
+        return self.strategy.prepare_live_data(htf_data, prepared_ltf)
+
+
+if __name__ == '__main__':
+    # Offline check: polls a random walk the way the live engine does (rolling windows ending with a
+    # forming bar that is first seen half-built) and compares every poll's LTF frame with
+    # prepare_data, and its HTF swings with identify_swing_points_zigzag, over all bars since the
+    # feed started.
+    from strategies import get_strategy_class
+    from utils import identify_swing_points_zigzag
+
+    rng = np.random.default_rng(11)
+    n, window, htf_window = 1200, 300, 60
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0005, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) + rng.uniform(0, 0.0004, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.0004, n)
+    index = pd.date_range("2024-01-01", periods=n, freq="5min", tz="UTC")
+    ltf = pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': 100.0}, index=index)
+    htf = ltf.resample("15min").agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+
+    common_params = {"symbol": "TEST", "pip_size": 0.0001, "sl_buffer_price": 0.0001,
+                     "htf_timeframe_str": config.HTF_TIMEFRAME_STR, "ltf_timeframe_str": config.LTF_TIMEFRAME_STR}
+    cases = [("HAAdaptiveMACD", {}), ("HAAlligatorMACD", {}), ("ZLSMAWithFilters", {"USE_ADAPTIVE_MACD_FILTER": True})]
+    for strategy_name, overrides in cases:
+        params = {**config.STRATEGY_SPECIFIC_PARAMS.get(strategy_name, {}), **overrides}
+        strategy_class = get_strategy_class(strategy_name)
+        feed = LiveSymbolFeed(strategy_class(params, common_params), max_ltf_bars=window, max_htf_bars=htf_window)
+        batch_strategy = strategy_class(params, common_params)
+        mismatches = swing_mismatches = 0
+        htf_start = None # The tracker starts with the first polled HTF window
+        for end in range(window, n + 1, 7):
+            polled = ltf.iloc[end - window:end]
+            htf_end = htf.index.searchsorted(polled.index[-1], side='right') # HTF bar holding the forming LTF bar
+            htf_polled = htf.iloc[max(htf_end - htf_window, 0):htf_end]
+            htf_start = max(htf_end - htf_window, 0) if htf_start is None else htf_start
+            half_built, htf_half_built = polled.copy(), htf_polled.copy()
+            half_built.iloc[-1, half_built.columns.get_loc('close')] = half_built['open'].iloc[-1]
+            htf_half_built.iloc[-1, htf_half_built.columns.get_loc('high')] = htf_half_built['high'].max() + 0.01
+            feed.prepare(htf_half_built, half_built) # Must not leak into the state
+            streamed_htf, streamed = feed.prepare(htf_polled.copy(), polled.copy())
+            _, batch = batch_strategy.prepare_data(htf.copy(), ltf.iloc[:end].copy())
+            batch = batch.iloc[-len(streamed):]
+            same = list(streamed.columns) == list(batch.columns) and all(
+                np.array_equal(streamed[c].to_numpy(dtype=np.float64), batch[c].to_numpy(dtype=np.float64), equal_nan=True)
+                for c in batch.columns)
+            mismatches += not same
+            batch_swings = identify_swing_points_zigzag(htf.iloc[htf_start:htf_end], config.ZIGZAG_LEN_HTF)[['swing_high', 'swing_low']]
+            swing_mismatches += not np.array_equal(streamed_htf[['swing_high', 'swing_low']].to_numpy(),
+                                                   batch_swings.iloc[-len(streamed_htf):].to_numpy(), equal_nan=True)
+        print(f"{strategy_name:<18} LTF {'OK' if mismatches == 0 else f'{mismatches} MISMATCHED POLLS'}, "
+              f"HTF swings {'OK' if swing_mismatches == 0 else f'{swing_mismatches} MISMATCHED POLLS'}")
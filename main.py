@@ -1,18 +1,26 @@
 # forex_backtester_cli/main.py
 import pandas as pd
 import argparse
+import logging
 import os 
+from concurrent.futures import ProcessPoolExecutor
 
 import config
-from data_handler import fetch_historical_data, shutdown_mt5_connection, initialize_mt5_connection
+from data_handler import fetch_historical_data, shutdown_data_source, initialize_data_source
 from heikin_ashi import calculate_heikin_ashi
 from utils import identify_swing_points_simple, identify_swing_points_zigzag
 from plotting_utils import plot_ohlc_with_swings 
 from backtester import run_backtest, get_pip_size 
 from reporting import calculate_performance_metrics, calculate_portfolio_performance_metrics
+from indicator_cache import indicator_cache_stats, indicator_cache_counters_since, merge_indicator_cache_counters
+from monte_carlo import monte_carlo_report
+from portfolio_simulator import portfolio_simulation_report
 from strategies import get_strategy_class 
 from plotly_plotting import plot_trade_chart_plotly 
 from datetime import datetime as dt
+from logging_setup import configure_logging
+
+logger = logging.getLogger(__name__)
 
 def debug_strategy_on_segment(symbol: str, start_date: str, end_date: str, 
                               strategy_name_to_debug: str, strategy_params_to_debug: dict,
@@ -41,6 +49,166 @@ def debug_strategy_on_segment(symbol: str, start_date: str, end_date: str,
     print("\n--- Strategy Debugging with Plotting Finished (using potentially outdated direct logic) ---")
 
 
+def ltf_fetch_range(start_date: str, end_date: str) -> tuple[str, str]:
+    """LTF fetch dates for an HTF backtest range (10 HTF bars of margin on both sides)."""
+    ltf_fetch_start = (pd.to_datetime(start_date) - config.HTF_TIMEDELTA * 10).strftime("%Y-%m-%d")
+    ltf_fetch_end = (pd.to_datetime(end_date) + config.HTF_TIMEDELTA * 10).strftime("%Y-%m-%d")
+    return ltf_fetch_start, ltf_fetch_end
+
+def identify_swings(htf_data: pd.DataFrame, ltf_ha_data: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """HTF swings on the bars and LTF swings on the Heikin Ashi candles, by SWING_IDENTIFICATION_METHOD."""
+    if config.SWING_IDENTIFICATION_METHOD == "zigzag": htf_data_swings = identify_swing_points_zigzag(htf_data, config.ZIGZAG_LEN_HTF)
+    else: htf_data_swings = identify_swing_points_simple(htf_data, config.N_BARS_LEFT_RIGHT_FOR_SWING_HTF, config.N_BARS_LEFT_RIGHT_FOR_SWING_HTF)
+    if config.SWING_IDENTIFICATION_METHOD == "zigzag": ltf_ha_data_swings = identify_swing_points_zigzag(ltf_ha_data, config.ZIGZAG_LEN_LTF, col_high='ha_high', col_low='ha_low')
+    else: ltf_ha_data_swings = identify_swing_points_simple(ltf_ha_data, config.N_BARS_LEFT_RIGHT_FOR_SWING_LTF, config.N_BARS_LEFT_RIGHT_FOR_SWING_LTF, col_high='ha_high', col_low='ha_low')
+    return htf_data_swings, ltf_ha_data_swings
+
+def prepare_symbol_data(symbol: str, start_date: str, end_date: str) -> tuple | None:
+    """
+    Fetches one symbol's bars and builds the parameter-independent inputs of run_backtest.
+    Returns (htf_data_swings, ltf_ohlc_data, ltf_ha_data_swings), or None when bars are missing.
+    """
+    htf_data = fetch_historical_data(symbol, config.HTF_MT5, start_date, end_date)
+    if htf_data is None or htf_data.empty: return None
+    
+    ltf_fetch_start, ltf_fetch_end = ltf_fetch_range(start_date, end_date)
+    ltf_ohlc_data = fetch_historical_data(symbol, config.LTF_MT5, ltf_fetch_start, ltf_fetch_end)
+    if ltf_ohlc_data is None or ltf_ohlc_data.empty: return None
+    ltf_ha_data = calculate_heikin_ashi(ltf_ohlc_data)
+    htf_data_swings, ltf_ha_data_swings = identify_swings(htf_data, ltf_ha_data)
+    return htf_data_swings, ltf_ohlc_data, ltf_ha_data_swings
+
+def run_symbol_backtest(symbol: str, start_date: str, end_date: str, strategy_name: str, strategy_params: dict,
+                        session_results_path: str, starting_trade_id: int, plot_trade_fn=None,
+                        ltf_closes: dict | None = None) -> tuple[list | None, int]:
+    """
+    prepare_symbol_data -> run_backtest for one symbol.
+    Returns (trades, last overall trade ID used); trades is None when the bars could not be fetched.
+    With ltf_closes, the symbol's LTF closes are stored in it for the capital simulation.
+    """
+    print(f"\n===== Running Backtest for {symbol} with Strategy: {strategy_name} =====")
+    symbol_data = prepare_symbol_data(symbol, start_date, end_date)
+    if symbol_data is None: return None, starting_trade_id - 1
+    htf_data_swings, ltf_ohlc_data, ltf_ha_data_swings = symbol_data
+    if ltf_closes is not None: ltf_closes[symbol] = ltf_ohlc_data[['close']]
+
+    return run_backtest(
+        symbol, htf_data_swings, ltf_ohlc_data, ltf_ha_data_swings,
+        strategy_name, strategy_params,
+        session_results_path, 
+        starting_trade_id=starting_trade_id,
+        plot_trade_fn=plot_trade_fn
+    )
+
+def finish_symbol_report(symbol: str, trades: list | None, strategy_name: str, strategy_params: dict,
+                         session_results_path: str, all_reports_text: list):
+    """Fills pnl_R on every trade and appends the symbol's performance report to all_reports_text."""
+    if trades is None: return # No bars for this symbol
+    if not trades:
+        all_reports_text.append(f"\nNo trades for {symbol} with {strategy_name}.\n")
+        return
+    pip_size_val = get_pip_size(symbol)
+    logger.debug("Calculating PnL R for %d trades for %s", len(trades), symbol)
+    for trade_idx, trade in enumerate(trades): 
+        if trade.get('exit_price') is not None and \
+           trade.get('entry_price') is not None and \
+           trade.get('initial_sl_price') is not None: # Check for initial_sl_price
+            
+            initial_sl = trade['initial_sl_price'] # Use the stored initial SL
+            risk_pips = abs(trade['entry_price'] - initial_sl) / pip_size_val
+            
+            pnl_pips_val = 0
+            if trade['direction'] == 'bullish': 
+                pnl_pips_val = (trade['exit_price'] - trade['entry_price']) / pip_size_val
+            elif trade['direction'] == 'bearish': 
+                pnl_pips_val = (trade['entry_price'] - trade['exit_price']) / pip_size_val
+            
+            if risk_pips > 1e-9: 
+                trade['pnl_R'] = round(pnl_pips_val / risk_pips, 2)
+            else: 
+                trade['pnl_R'] = 0 
+            
+            if trade['status'] == 'closed_tp':
+                logger.debug("Trade PnL R (TP): ID %s, Entry %.5f, Exit %.5f, Initial_SL %.5f, RiskPips %.2f, PnLPips %.2f, PnL_R %.2f, Target_RR %s",
+                             trade['id'], trade['entry_price'], trade['exit_price'], initial_sl, risk_pips, pnl_pips_val, trade['pnl_R'],
+                             strategy_params.get('TP_RR_RATIO', 'N/A'))
+            elif trade['status'] in ('closed_sl_be', 'closed_sl'):
+                logger.debug("Trade PnL R (%s): ID %s, Entry %.5f, Exit %.5f, Initial_SL %.5f, RiskPips %.2f, PnLPips %.2f, PnL_R %.2f",
+                             "SL@BE" if trade['status'] == 'closed_sl_be' else "SL", trade['id'], trade['entry_price'], trade['exit_price'],
+                             initial_sl, risk_pips, pnl_pips_val, trade['pnl_R'])
+
+        else: 
+             trade['pnl_R'] = 0 
+             logger.debug("Trade PnL R: ID %s missing price data for PnL R calc.", trade.get('id', 'N/A'))
+    
+    report_text_single = calculate_performance_metrics(
+        trades, config.INITIAL_CAPITAL, symbol, 
+        pip_size_val, strategy_params, session_results_path
+    ) 
+    if report_text_single: all_reports_text.append(report_text_single)
+
+# --- Parallel symbol execution (--workers N) ---
+# Symbols are independent until the portfolio report, so each one runs in a pool process with
+# trade IDs starting at 1. Trade charts are not drawn in the worker; the trade dict is copied at
+# the moment it opens (what plot_trade_chart_plotly sees in a serial run). The parent then shifts
+# the IDs in symbol order to the values a serial run assigns, draws the charts under those IDs and
+# builds every report itself, so ConsolidatedReport.txt matches a serial run exactly.
+
+def _init_worker(config_overrides: dict, log_level: str, log_json: str | None):
+    # Spawned workers (Windows) re-import config, so the command-line overrides are re-applied
+    for name, value in config_overrides.items():
+        setattr(config, name, value)
+    configure_logging(log_level, log_json)
+
+def _run_symbol_in_worker(symbol: str, start_date: str, end_date: str, strategy_name: str, strategy_params: dict,
+                          session_results_path: str, keep_ltf_closes: bool) -> tuple[list | None, list, pd.DataFrame | None, dict]:
+    chart_snapshots = []
+    ltf_closes = {} if keep_ltf_closes else None
+    cache_stats_before = indicator_cache_stats()
+    trades, _ = run_symbol_backtest(symbol, start_date, end_date, strategy_name, strategy_params, session_results_path,
+                                    starting_trade_id=1, plot_trade_fn=lambda trade, _path: chart_snapshots.append(dict(trade)),
+                                    ltf_closes=ltf_closes)
+    return trades, chart_snapshots, (ltf_closes or {}).get(symbol), indicator_cache_counters_since(cache_stats_before)
+
+def _shift_trade_ids(trades: list, offset: int):
+    for trade in trades:
+        trade['id'] += offset
+        if 'overall_trade_id' in trade: trade['overall_trade_id'] = trade['id']
+
+def run_symbols_parallel(symbols: list, start_date: str, end_date: str, strategy_name: str, strategy_params: dict,
+                         session_results_path: str, workers: int, log_level: str, log_json: str | None,
+                         ltf_closes: dict | None = None) -> list:
+    """
+    run_symbol_backtest for every symbol on a process pool of `workers`.
+    Returns [(symbol, trades)] in `symbols` order with the trade IDs a serial run would assign.
+    With ltf_closes, the workers send back each symbol's LTF closes and they are stored in it.
+    """
+    config_overrides = {"DATA_SOURCE": config.DATA_SOURCE, "DATA_SOURCE_DIR": config.DATA_SOURCE_DIR}
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(config_overrides, log_level, log_json)) as pool:
+        futures = [pool.submit(_run_symbol_in_worker, symbol, start_date, end_date, strategy_name,
+                               strategy_params, session_results_path, ltf_closes is not None)
+                   for symbol in symbols]
+        overall_trade_counter = 0
+        chart_snapshots = []
+        for symbol, future in zip(symbols, futures):
+            trades, snapshots, closes, cache_counters = future.result()
+            merge_indicator_cache_counters(cache_counters) # Reported with the parent's in the final stats line
+            if ltf_closes is not None and closes is not None: ltf_closes[symbol] = closes
+            if trades:
+                _shift_trade_ids(trades, overall_trade_counter)
+                _shift_trade_ids(snapshots, overall_trade_counter)
+                overall_trade_counter += len(trades)
+                chart_snapshots.extend(snapshots)
+            results.append((symbol, trades))
+
+        plot_jobs = [pool.submit(plot_trade_chart_plotly, snapshot, session_results_path) for snapshot in chart_snapshots]
+        for job in plot_jobs:
+            job.result()
+    return results
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Forex Backtester CLI")
     parser.add_argument("--symbols", nargs='+', default=config.SYMBOLS, help="List of symbols")
@@ -48,8 +216,16 @@ if __name__ == "__main__":
     parser.add_argument("--end", type=str, default=config.END_DATE_STR, help="End date (YYYY-MM-DD)")
     parser.add_argument("--mode", type=str, default="backtest", choices=["debug_plot", "backtest"])
     parser.add_argument("--strategy", type=str, default=config.ACTIVE_STRATEGY_NAME, help="Name of the strategy to run")
+    parser.add_argument("--data-source", type=str, default=config.DATA_SOURCE, choices=["mt5", "file", "archive"], help="Where bars are read from")
+    parser.add_argument("--data-dir", type=str, default=config.DATA_SOURCE_DIR, help="Directory of {SYMBOL}_{TF}.csv/.parquet dumps for --data-source file")
+    parser.add_argument("--log-level", type=str, default=config.LOG_LEVEL, choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Console/JSON log level (DEBUG shows per-bar strategy evaluation)")
+    parser.add_argument("--log-json", type=str, default=config.LOG_JSON_PATH, help="Also write log records as JSON lines to this file")
+    parser.add_argument("--workers", type=int, default=1, help="Backtest symbols in this many parallel processes (results match a serial run)")
     
     args = parser.parse_args()
+    config.DATA_SOURCE = args.data_source
+    config.DATA_SOURCE_DIR = args.data_dir
+    configure_logging(args.log_level, args.log_json)
 
     active_strategy_name = args.strategy
     strategy_custom_params = config.STRATEGY_SPECIFIC_PARAMS.get(active_strategy_name)
@@ -67,11 +243,15 @@ if __name__ == "__main__":
 
     report_file_path = os.path.join(session_results_path, "ConsolidatedReport.txt")
     all_reports_text = [] 
+    if config.REVERSE_TRADES:
+        print("REVERSE_TRADES is on: every trade is opened opposite to its signal, with SL and TP swapped.")
+        all_reports_text.append("NOTE: REVERSE_TRADES was on - all trades are reversed signals (SL and TP swapped).")
 
-    if not initialize_mt5_connection(): exit()
+    if not initialize_data_source(): exit()
     
     all_symbols_trades_dict = {} 
     overall_trade_counter = 0 
+    ltf_closes_for_marks = {} if config.ENABLE_PORTFOLIO_SIMULATION else None # Reused by the capital simulation
 
     try:
         if args.mode == "debug_plot":
@@ -86,73 +266,25 @@ if __name__ == "__main__":
                                       session_results_path) # Pass session_results_path
 
         elif args.mode == "backtest":
-            for symbol_to_run in args.symbols:
-                print(f"\n===== Running Backtest for {symbol_to_run} with Strategy: {active_strategy_name} =====")
-                htf_data = fetch_historical_data(symbol_to_run, config.HTF_MT5, args.start, args.end)
-                if htf_data is None or htf_data.empty: all_symbols_trades_dict[symbol_to_run] = []; continue
-                if config.SWING_IDENTIFICATION_METHOD == "zigzag": htf_data_swings = identify_swing_points_zigzag(htf_data, config.ZIGZAG_LEN_HTF)
-                else: htf_data_swings = identify_swing_points_simple(htf_data, config.N_BARS_LEFT_RIGHT_FOR_SWING_HTF, config.N_BARS_LEFT_RIGHT_FOR_SWING_HTF)
-                
-                ltf_fetch_start = (pd.to_datetime(args.start) - config.HTF_TIMEDELTA * 10).strftime("%Y-%m-%d")
-                ltf_fetch_end = (pd.to_datetime(args.end) + config.HTF_TIMEDELTA * 10).strftime("%Y-%m-%d")
-                ltf_ohlc_data = fetch_historical_data(symbol_to_run, config.LTF_MT5, ltf_fetch_start, ltf_fetch_end)
-                if ltf_ohlc_data is None or ltf_ohlc_data.empty: all_symbols_trades_dict[symbol_to_run] = []; continue
-                ltf_ha_data = calculate_heikin_ashi(ltf_ohlc_data)
-                if config.SWING_IDENTIFICATION_METHOD == "zigzag": ltf_ha_data_swings = identify_swing_points_zigzag(ltf_ha_data, config.ZIGZAG_LEN_LTF, col_high='ha_high', col_low='ha_low')
-                else: ltf_ha_data_swings = identify_swing_points_simple(ltf_ha_data, config.N_BARS_LEFT_RIGHT_FOR_SWING_LTF, config.N_BARS_LEFT_RIGHT_FOR_SWING_LTF, col_high='ha_high', col_low='ha_low')
-
-                logged_trades_for_symbol, updated_overall_trade_counter = run_backtest(
-                    symbol_to_run, htf_data_swings, ltf_ohlc_data, ltf_ha_data_swings,
-                    active_strategy_name, strategy_custom_params,
-                    session_results_path, 
-                    starting_trade_id=overall_trade_counter + 1 
-                )
-                overall_trade_counter = updated_overall_trade_counter 
-                
-                all_symbols_trades_dict[symbol_to_run] = logged_trades_for_symbol
-
-                if logged_trades_for_symbol:
-                    pip_size_val = get_pip_size(symbol_to_run)
-                    print(f"  DEBUG: Calculating PnL R for {len(logged_trades_for_symbol)} trades for {symbol_to_run}") # Moved print
-                    for trade_idx, trade in enumerate(logged_trades_for_symbol): 
-                        if trade.get('exit_price') is not None and \
-                           trade.get('entry_price') is not None and \
-                           trade.get('initial_sl_price') is not None: # Check for initial_sl_price
-                            
-                            initial_sl = trade['initial_sl_price'] # Use the stored initial SL
-                            risk_pips = abs(trade['entry_price'] - initial_sl) / pip_size_val
-                            
-                            pnl_pips_val = 0
-                            if trade['direction'] == 'bullish': 
-                                pnl_pips_val = (trade['exit_price'] - trade['entry_price']) / pip_size_val
-                            elif trade['direction'] == 'bearish': 
-                                pnl_pips_val = (trade['entry_price'] - trade['exit_price']) / pip_size_val
-                            
-                            if risk_pips > 1e-9: 
-                                trade['pnl_R'] = round(pnl_pips_val / risk_pips, 2)
-                            else: 
-                                trade['pnl_R'] = 0 
-                            
-                            # <<< DEBUG PRINT FOR TP TRADES >>>
-                            if trade['status'] == 'closed_tp':
-                                print(f"    DEBUG_TRADE_PNL_R (TP): ID {trade['id']}, Entry {trade['entry_price']:.5f}, Exit {trade['exit_price']:.5f}, Initial_SL {initial_sl:.5f}, RiskPips {risk_pips:.2f}, PnLPips {pnl_pips_val:.2f}, PnL_R {trade['pnl_R']:.2f}, Target_RR {strategy_custom_params.get('TP_RR_RATIO', 'N/A')}")
-                            elif trade['status'] == 'closed_sl_be':
-                                print(f"    DEBUG_TRADE_PNL_R (SL@BE): ID {trade['id']}, Entry {trade['entry_price']:.5f}, Exit {trade['exit_price']:.5f}, Initial_SL {initial_sl:.5f}, RiskPips {risk_pips:.2f}, PnLPips {pnl_pips_val:.2f}, PnL_R {trade['pnl_R']:.2f}")
-                            elif trade['status'] == 'closed_sl':
-                                print(f"    DEBUG_TRADE_PNL_R (SL): ID {trade['id']}, Entry {trade['entry_price']:.5f}, Exit {trade['exit_price']:.5f}, Initial_SL {initial_sl:.5f}, RiskPips {risk_pips:.2f}, PnLPips {pnl_pips_val:.2f}, PnL_R {trade['pnl_R']:.2f}")
-
-
-                        else: 
-                             trade['pnl_R'] = 0 
-                             print(f"    DEBUG_TRADE_PNL_R: ID {trade.get('id','N/A')} missing price data for PnL R calc.")
-                    
-                    report_text_single = calculate_performance_metrics(
-                        logged_trades_for_symbol, config.INITIAL_CAPITAL, symbol_to_run, 
-                        pip_size_val, strategy_custom_params, session_results_path
-                    ) 
-                    if report_text_single: all_reports_text.append(report_text_single)
-                else:
-                    all_reports_text.append(f"\nNo trades for {symbol_to_run} with {active_strategy_name}.\n")
+            if args.workers > 1 and len(args.symbols) > 1:
+                print(f"Running {len(args.symbols)} symbols on {min(args.workers, len(args.symbols))} worker processes.")
+                symbol_results = run_symbols_parallel(args.symbols, args.start, args.end, active_strategy_name, strategy_custom_params,
+                                                      session_results_path, min(args.workers, len(args.symbols)), args.log_level, args.log_json,
+                                                      ltf_closes=ltf_closes_for_marks)
+                for symbol_to_run, logged_trades_for_symbol in symbol_results:
+                    all_symbols_trades_dict[symbol_to_run] = logged_trades_for_symbol or []
+                    finish_symbol_report(symbol_to_run, logged_trades_for_symbol, active_strategy_name, strategy_custom_params,
+                                         session_results_path, all_reports_text)
+            else:
+                for symbol_to_run in args.symbols:
+                    logged_trades_for_symbol, overall_trade_counter = run_symbol_backtest(
+                        symbol_to_run, args.start, args.end, active_strategy_name, strategy_custom_params,
+                        session_results_path, starting_trade_id=overall_trade_counter + 1,
+                        ltf_closes=ltf_closes_for_marks
+                    )
+                    all_symbols_trades_dict[symbol_to_run] = logged_trades_for_symbol or []
+                    finish_symbol_report(symbol_to_run, logged_trades_for_symbol, active_strategy_name, strategy_custom_params,
+                                         session_results_path, all_reports_text)
             
             if any(trade_list for trade_list in all_symbols_trades_dict.values()):
                 print(f"\n\n===== Generating Portfolio Performance Report ({active_strategy_name}) =====")
@@ -161,6 +293,16 @@ if __name__ == "__main__":
                     strategy_custom_params, session_results_path
                 )
                 if portfolio_report_text: all_reports_text.append(portfolio_report_text)
+                if config.ENABLE_PORTFOLIO_SIMULATION:
+                    print(f"\n===== Simulating Portfolio Capital ({config.RISK_PER_TRADE_PERCENT}% risk per trade) =====")
+                    all_reports_text.append(portfolio_simulation_report(all_symbols_trades_dict, ltf_closes_for_marks, session_results_path))
+                if config.MONTE_CARLO_SIMULATIONS > 0:
+                    portfolio_trades = sorted((trade for trade_list in all_symbols_trades_dict.values() for trade in trade_list if trade.get('pnl_R') is not None),
+                                              key=lambda t: (pd.Timestamp(t['exit_time'] or t['entry_time']), pd.Timestamp(t['entry_time']), t['id'])) # Same order as the portfolio report
+                    all_reports_text.append(monte_carlo_report(
+                        [trade['pnl_R'] for trade in portfolio_trades], config.MONTE_CARLO_SIMULATIONS, config.MONTE_CARLO_METHOD,
+                        config.MONTE_CARLO_RUIN_R, config.MONTE_CARLO_SEED, config.MONTE_CARLO_CHUNK_SIZE
+                    ))
             else:
                 all_reports_text.append(f"\nNo trades generated across any symbols for portfolio report ({active_strategy_name}).\n")
             
@@ -170,5 +312,8 @@ if __name__ == "__main__":
             print(f"Consolidated report saved to: {report_file_path}")
             
     finally:
-        shutdown_mt5_connection()
+        if config.ENABLE_INDICATOR_CACHE:
+            stats = indicator_cache_stats()
+            print(f"Indicator cache: {stats['hits']} hits, {stats['disk_hits']} disk hits, {stats['misses']} misses across all processes ({stats['entries']} entries, {stats['bytes'] / 2**20:.0f} MB in the main process).")
+        shutdown_data_source()
         print("Application finished.")
\ No newline at end of file
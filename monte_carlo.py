@@ -0,0 +1,120 @@
+# forex_backtester_cli/monte_carlo.py
+
+import numpy as np
+
+from reporting import summarize_r_multiples
+
+# Monte Carlo resampling of a trade sequence's pnl_R. Each simulation is one row of a
+# (simulations x trades) matrix, either a bootstrap (trades drawn with replacement) or a
+# permutation (the same trades in a random order). The whole matrix is turned into equity paths
+# with one cumsum along axis 1, and drawdowns with one maximum.accumulate, so 100k paths of
+# 2,000 trades take a few seconds. chunk_size bounds memory by running the rows in batches
+# (about 2-3 x chunk_size x trades x 8 bytes at a time); batches draw from the same generator
+# in order, so the result does not depend on the chunk size.
+#
+# Per path: final_R, expectancy_R (final_R / trades), max_drawdown_R (peak-to-trough of the
+# cumulative R, the report's definition) and lowest_R (lowest cumulative R, i.e. the deepest
+# loss from the starting balance; ruin means lowest_R <= -ruin_R).
+# A permutation keeps the trade set, so its expectancy band collapses to a single value; the
+# band is only informative for the bootstrap.
+
+MONTE_CARLO_METHODS = ("bootstrap", "permute")
+
+def simulate_trade_sequences(pnl_r, n_simulations: int, method: str = "bootstrap", seed: int | None = None,
+                             chunk_size: int | None = None) -> dict | None:
+    """Per-path final_R, expectancy_R, max_drawdown_R and lowest_R arrays; None without trades."""
+    if method not in MONTE_CARLO_METHODS:
+        raise ValueError(f"Unknown Monte Carlo method: {method} (use one of {', '.join(MONTE_CARLO_METHODS)})")
+    pnl = np.nan_to_num(np.asarray(pnl_r, dtype=np.float64))
+    n_trades = len(pnl)
+    if n_trades == 0 or n_simulations <= 0:
+        return None
+
+    rng = np.random.default_rng(seed)
+    chunk_size = min(chunk_size, n_simulations) if chunk_size else n_simulations
+    results = {name: np.empty(n_simulations) for name in ("final_R", "max_drawdown_R", "lowest_R")}
+    for start in range(0, n_simulations, chunk_size):
+        rows = min(chunk_size, n_simulations - start)
+        if method == "bootstrap":
+            paths = pnl[rng.integers(0, n_trades, size=(rows, n_trades))]
+        else:
+            paths = rng.permuted(np.broadcast_to(pnl, (rows, n_trades)), axis=1)
+        np.cumsum(paths, axis=1, out=paths)
+        batch = slice(start, start + rows)
+        results["final_R"][batch] = paths[:, -1]
+        results["lowest_R"][batch] = paths.min(axis=1)
+        drawdown = np.maximum.accumulate(paths, axis=1)
+        np.subtract(drawdown, paths, out=drawdown)
+        results["max_drawdown_R"][batch] = drawdown.max(axis=1)
+    results["expectancy_R"] = results["final_R"] / n_trades
+    return results
+
+def summarize_simulations(simulations: dict, ruin_r: float, percentiles=(50, 90, 95, 99), confidence: float = 0.95) -> dict:
+    """Drawdown percentiles, ruin probability and the expectancy/net R confidence bands of simulate_trade_sequences output."""
+    tail = (1 - confidence) / 2 * 100
+    return {
+        "simulations": len(simulations["final_R"]),
+        "max_drawdown_R_percentiles": dict(zip(percentiles, np.percentile(simulations["max_drawdown_R"], percentiles))),
+        "lowest_R_percentiles": dict(zip(percentiles, -np.percentile(-simulations["lowest_R"], percentiles))),
+        "ruin_probability": float(np.mean(simulations["lowest_R"] <= -ruin_r)),
+        "expectancy_R_band": tuple(np.percentile(simulations["expectancy_R"], [tail, 50, 100 - tail])),
+        "net_R_band": tuple(np.percentile(simulations["final_R"], [tail, 50, 100 - tail])),
+    }
+
+def monte_carlo_report(pnl_r, n_simulations: int, method: str = "bootstrap", ruin_r: float = 50.0,
+                       seed: int | None = None, chunk_size: int | None = None, confidence: float = 0.95) -> str:
+    """Report section comparing the actual trade order's figures with the simulated distribution."""
+    simulations = simulate_trade_sequences(pnl_r, n_simulations, method, seed, chunk_size)
+    if simulations is None:
+        return "No trades for Monte Carlo resampling.\n"
+    summary = summarize_simulations(simulations, ruin_r, confidence=confidence)
+    actual = summarize_r_multiples(pnl_r)
+    actual_rank = float(np.mean(simulations["max_drawdown_R"] <= actual["max_drawdown_R"])) * 100
+    band_label = f"{confidence * 100:.0f}%"
+    low, median, high = summary["expectancy_R_band"]
+    net_low, net_median, net_high = summary["net_R_band"]
+
+    report_lines = [
+        f"\n--- Monte Carlo Trade Resampling ({summary['simulations']} {method} paths of {actual['trades']} trades) ---",
+        f"Expectancy (R) {band_label} band:    {low:.2f} to {high:.2f} R per trade (median {median:.2f})",
+        f"Net Profit (R) {band_label} band:    {net_low:.2f} to {net_high:.2f} R (median {net_median:.2f})",
+        "Max Drawdown (R) percentiles:",
+    ]
+    for pct, value in summary["max_drawdown_R_percentiles"].items():
+        report_lines.append(f"    {pct}th:                      {value:.2f} R")
+    report_lines.extend([
+        f"Actual Max Drawdown (R):   {actual['max_drawdown_R']:.2f} R ({actual_rank:.1f}th percentile of simulated)",
+        "Deepest Loss from Start (R) percentiles:",
+    ])
+    for pct, value in summary["lowest_R_percentiles"].items():
+        report_lines.append(f"    {pct}th:                      {value:.2f} R")
+    report_lines.extend([
+        f"Probability of Ruin:       {summary['ruin_probability'] * 100:.2f}% (loss of {ruin_r:.1f} R from start)",
+        "------------------------------------",
+    ])
+    report_text = "\n".join(report_lines)
+    print(report_text)
+    return report_text
+
+
+if __name__ == '__main__':
+    # Resample a saved trade list, e.g. walk_forward.py's oos_trades.csv:
+    #   python monte_carlo.py Walk_Forward_Results/<run>/oos_trades.csv --simulations 100000 --method permute
+    import argparse
+    import time
+    import pandas as pd
+    import config
+
+    parser = argparse.ArgumentParser(description="Monte Carlo resampling of a trade list's pnl_R")
+    parser.add_argument("trades_csv", help="CSV with a pnl_R column, in trade order")
+    parser.add_argument("--simulations", type=int, default=config.MONTE_CARLO_SIMULATIONS or 10000)
+    parser.add_argument("--method", type=str, default=config.MONTE_CARLO_METHOD, choices=MONTE_CARLO_METHODS)
+    parser.add_argument("--ruin-r", type=float, default=config.MONTE_CARLO_RUIN_R)
+    parser.add_argument("--chunk-size", type=int, default=config.MONTE_CARLO_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=config.MONTE_CARLO_SEED)
+    args = parser.parse_args()
+
+    pnl_r = pd.to_numeric(pd.read_csv(args.trades_csv)['pnl_R'], errors='coerce').fillna(0).to_numpy()
+    started = time.perf_counter()
+    monte_carlo_report(pnl_r, args.simulations, args.method, args.ruin_r, args.seed, args.chunk_size)
+    print(f"{args.simulations} paths in {time.perf_counter() - started:.2f} s")
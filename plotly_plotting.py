@@ -3,19 +3,15 @@ import plotly.graph_objects as go
 import plotly.offline as offline # For saving HTML
 import pandas as pd
 import os
-import MetaTrader5 as mt5 
+from timeframes import Timeframe
 from data_handler import fetch_historical_data 
 
 def tf_mt5_to_minutes(tf_mt5_val: int) -> int:
-    if tf_mt5_val == mt5.TIMEFRAME_M1: return 1
-    if tf_mt5_val == mt5.TIMEFRAME_M5: return 5
-    if tf_mt5_val == mt5.TIMEFRAME_M15: return 15
-    if tf_mt5_val == mt5.TIMEFRAME_M30: return 30
-    if tf_mt5_val == mt5.TIMEFRAME_H1: return 60
-    if tf_mt5_val == mt5.TIMEFRAME_H4: return 240
-    if tf_mt5_val == mt5.TIMEFRAME_D1: return 1440
-    print(f"Warning: Unknown MT5 timeframe constant {tf_mt5_val} in tf_mt5_to_minutes. Defaulting to 60.")
-    return 60 
+    try:
+        return Timeframe(tf_mt5_val).minutes
+    except ValueError:
+        print(f"Warning: Unknown MT5 timeframe constant {tf_mt5_val} in tf_mt5_to_minutes. Defaulting to 60.")
+        return 60 
 
 def plot_trade_chart_plotly(trade_info: dict, 
                             session_results_path: str,
@@ -42,11 +38,11 @@ def plot_trade_chart_plotly(trade_info: dict,
     os.makedirs(trade_plot_dir, exist_ok=True)
 
     plot_timeframes = {
-        "H4": (mt5.TIMEFRAME_H4, htf_plot_candles_lookback, "HTF_Context"), 
-        "H1": (mt5.TIMEFRAME_H1, 100, "H1_Context"),
-        "M30": (mt5.TIMEFRAME_M30, 150, "M30_Context"),
-        "M15": (mt5.TIMEFRAME_M15, ltf_plot_candles_lookback, "M15_Context"),
-        "M5": (mt5.TIMEFRAME_M5, ltf_plot_candles_lookback, "M5_EntryDetail") 
+        "H4": (Timeframe.H4, htf_plot_candles_lookback, "HTF_Context"), 
+        "H1": (Timeframe.H1, 100, "H1_Context"),
+        "M30": (Timeframe.M30, 150, "M30_Context"),
+        "M15": (Timeframe.M15, ltf_plot_candles_lookback, "M15_Context"),
+        "M5": (Timeframe.M5, ltf_plot_candles_lookback, "M5_EntryDetail") 
     }
 
     for tf_str, (tf_mt5, lookback_cfg, suffix) in plot_timeframes.items():
@@ -0,0 +1,227 @@
+# forex_backtester_cli/portfolio_simulator.py
+
+import heapq
+import logging
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import config
+from backtester import get_pip_size
+
+logger = logging.getLogger(__name__)
+
+# Capital simulation of backtest trades. All symbols' events go onto one clock:
+#   - mark:  an LTF bar closed (time = bar time + LTF timedelta); re-values the symbol's open trade
+#   - exit:  a trade closed at its exit price
+#   - entry: a trade opened; it is sized from current equity (balance + open trades marked at their
+#            last close) the way LivePortfolioManager.calculate_lot_size sizes live orders
+# Each symbol contributes three time-ordered streams: bars, entries (trades_log is in entry order)
+# and exits (sorted once; a symbol's trades can overlap). heapq.merge interleaves all of them in a
+# single pass, so nothing is re-sorted while the clock advances.
+# At equal times marks come first (the bar that closed at that instant), then exits, then entries;
+# a trade that opens and closes on the same bar exits after its own entry.
+#
+# Fills are slipped SLIPPAGE_POINTS (1 point = pip / 10) against the trade on entry and on exit,
+# and COMMISSION_PER_TRADE (account currency) is charged when a trade opens.
+# Profit in the quote currency is converted to ACCOUNT_CURRENCY at the current price when the
+# account currency is the base or quote, or through another simulated pair's last close for
+# crosses; without one, the live fallback of 10 account currency per pip per lot is used.
+
+_MARK, _EXIT, _ENTRY, _SAME_BAR_EXIT = 0, 1, 2, 3
+
+def _contract_size(symbol: str) -> float:
+    return config.CONTRACT_SIZE.get(symbol.upper(), 100000)
+
+def _quote_to_account_rate(symbol: str, price: float, last_prices: dict) -> float | None:
+    """Account currency per unit of the symbol's quote currency, None when it cannot be derived."""
+    base, quote, account = symbol[:3].upper(), symbol[3:6].upper(), config.ACCOUNT_CURRENCY
+    if quote == account: return 1.0
+    if base == account: return 1.0 / price
+    if account + quote in last_prices: return 1.0 / last_prices[account + quote]
+    if quote + account in last_prices: return last_prices[quote + account]
+    return None
+
+def _lot_size(risk_amount: float, sl_distance_pips: float, value_per_pip_per_lot: float) -> float:
+    """Same clamping and rounding as LivePortfolioManager.calculate_lot_size with config's lot limits."""
+    volume = risk_amount / (sl_distance_pips * value_per_pip_per_lot)
+    volume = max(config.MIN_LOT, volume)
+    volume = min(config.MAX_LOT, volume)
+    volume = round(round(volume / config.LOT_STEP) * config.LOT_STEP, 2)
+    return volume if volume >= config.MIN_LOT else 0.0
+
+def _trade_event_streams(symbol_index: int, trades: list) -> tuple[list, list]:
+    """(entry events, exit events) of one symbol's trades, each in time order."""
+    entries, exits = [], []
+    for seq, trade in enumerate(trades):
+        if trade.get('entry_time') is None or trade.get('entry_price') is None or trade.get('initial_sl_price') is None:
+            continue
+        entry_ns = pd.Timestamp(trade['entry_time']).value
+        entries.append((entry_ns, _ENTRY, symbol_index, seq, trade))
+        if trade.get('exit_time') is not None and trade.get('exit_price') is not None:
+            exit_ns = pd.Timestamp(trade['exit_time']).value
+            exits.append((exit_ns, (_SAME_BAR_EXIT if exit_ns == entry_ns else _EXIT), symbol_index, seq, trade))
+    entries.sort(key=lambda event: event[:4]) # No-op for run_backtest output
+    exits.sort(key=lambda event: event[:4])
+    return entries, exits
+
+def _mark_events(symbol_index: int, bars: pd.DataFrame):
+    close_times = (bars.index + config.TIMEDELTA_MAP[config.LTF_TIMEFRAME_STR]).as_unit('ns').asi8
+    for seq, (close_ns, close) in enumerate(zip(close_times.tolist(), bars['close'].to_numpy(dtype=np.float64).tolist())):
+        yield close_ns, _MARK, symbol_index, seq, close
+
+def simulate_portfolio(all_symbols_trades: dict, ltf_bars: dict | None = None,
+                       initial_capital: float | None = None, risk_per_trade_percent: float | None = None,
+                       commission_per_trade: float | None = None, slippage_points: float | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    all_symbols_trades: {symbol: run_backtest trades}; ltf_bars: {symbol: LTF OHLC} for per-bar
+    mark-to-market (without bars, equity only changes at trade events).
+    Returns (equity curve indexed by time with balance/equity/open_trades, per-trade fills and P&L).
+    Arguments left as None come from config.
+    """
+    initial_capital = config.INITIAL_CAPITAL if initial_capital is None else initial_capital
+    risk_per_trade_percent = config.RISK_PER_TRADE_PERCENT if risk_per_trade_percent is None else risk_per_trade_percent
+    commission_per_trade = config.COMMISSION_PER_TRADE if commission_per_trade is None else commission_per_trade
+    slippage_points = config.SLIPPAGE_POINTS if slippage_points is None else slippage_points
+
+    symbols = list(all_symbols_trades)
+    streams = [stream for k, symbol in enumerate(symbols) for stream in _trade_event_streams(k, all_symbols_trades[symbol] or [])]
+    if ltf_bars:
+        streams += [_mark_events(k, ltf_bars[symbol]) for k, symbol in enumerate(symbols)
+                    if ltf_bars.get(symbol) is not None and not ltf_bars[symbol].empty]
+
+    balance = float(initial_capital)
+    open_positions = {symbol: {} for symbol in symbols} # symbol -> {trade seq: [trade row, unrealized P&L]}
+    open_count = 0
+    unrealized_total = 0.0
+    last_prices = {}
+    warned_symbols = set()
+    trade_rows = []
+    curve_times, curve_balance, curve_equity, curve_open = [], [], [], []
+
+    def value_per_price_unit(symbol, price):
+        rate = _quote_to_account_rate(symbol, price, last_prices)
+        if rate is None:
+            if symbol not in warned_symbols:
+                warned_symbols.add(symbol)
+                logger.warning("No %s conversion for %s; using 10 %s per pip per lot (HIGHLY APPROXIMATE).",
+                               config.ACCOUNT_CURRENCY, symbol, config.ACCOUNT_CURRENCY)
+            return 10.0 / get_pip_size(symbol)
+        return _contract_size(symbol) * rate
+
+    def position_pnl(position, price):
+        row = position[0]
+        move = (price - row['entry_fill']) if row['direction'] == 'bullish' else (row['entry_fill'] - price)
+        return move * row['lots'] * value_per_price_unit(row['symbol'], price)
+
+    for time_ns, kind, symbol_index, seq, payload in heapq.merge(*streams):
+        symbol = symbols[symbol_index]
+        if kind == _MARK:
+            last_prices[symbol.upper()] = payload
+            for position in open_positions[symbol].values():
+                new_pnl = position_pnl(position, payload)
+                unrealized_total += new_pnl - position[1]
+                position[1] = new_pnl
+        elif kind == _ENTRY:
+            trade = payload
+            pip_size = get_pip_size(symbol)
+            slip = slippage_points * pip_size / 10
+            sign = 1 if trade['direction'] == 'bullish' else -1
+            entry_fill = trade['entry_price'] + sign * slip
+            equity = balance + unrealized_total
+            sl_distance_pips = abs(trade['entry_price'] - trade['initial_sl_price']) / pip_size
+            row = {"id": trade.get('id'), "symbol": symbol, "direction": trade['direction'],
+                   "entry_time": trade['entry_time'], "exit_time": trade.get('exit_time'), "status": trade.get('status'),
+                   "pnl_R": trade.get('pnl_R'), "equity_at_entry": equity, "sl_distance_pips": sl_distance_pips,
+                   "lots": 0.0, "entry_fill": entry_fill, "exit_fill": np.nan, "commission": 0.0, "pnl_currency": 0.0}
+            trade_rows.append(row)
+            if sl_distance_pips < 1:
+                logger.warning("Skipping trade %s on %s: SL distance %.2f pips is too small.", trade.get('id'), symbol, sl_distance_pips)
+                continue
+            value_per_pip_per_lot = value_per_price_unit(symbol, trade['entry_price']) * pip_size
+            row['lots'] = _lot_size(risk_per_trade_percent / 100 * equity, sl_distance_pips, value_per_pip_per_lot)
+            if row['lots'] == 0.0:
+                continue
+            row['commission'] = commission_per_trade
+            balance -= commission_per_trade
+            row['pnl_currency'] = -commission_per_trade
+            position = [row, 0.0]
+            position[1] = position_pnl(position, last_prices.get(symbol.upper(), trade['entry_price']))
+            unrealized_total += position[1]
+            open_positions[symbol][seq] = position
+            open_count += 1
+        else:
+            trade = payload
+            position = open_positions[symbol].pop(seq, None)
+            if position is None:
+                continue # Trade was skipped at entry
+            row = position[0]
+            slip = slippage_points * get_pip_size(symbol) / 10
+            row['exit_fill'] = trade['exit_price'] - (1 if row['direction'] == 'bullish' else -1) * slip
+            realized = position_pnl(position, row['exit_fill'])
+            balance += realized
+            row['pnl_currency'] += realized
+            unrealized_total -= position[1]
+            open_count -= 1
+
+        equity = balance + unrealized_total
+        if curve_times and curve_times[-1] == time_ns:
+            curve_balance[-1], curve_equity[-1], curve_open[-1] = balance, equity, open_count
+        else:
+            curve_times.append(time_ns); curve_balance.append(balance); curve_equity.append(equity); curve_open.append(open_count)
+
+    equity_curve = pd.DataFrame({"balance": curve_balance, "equity": curve_equity, "open_trades": curve_open},
+                                index=pd.DatetimeIndex(pd.to_datetime(curve_times, unit='ns', utc=True), name='time'))
+    return equity_curve, pd.DataFrame(trade_rows)
+
+def portfolio_simulation_report(all_symbols_trades: dict, ltf_bars: dict | None, session_results_path: str | None = None) -> str:
+    """Runs simulate_portfolio with the config settings; saves the equity curve CSV/plot when a path is given."""
+    equity_curve, sim_trades = simulate_portfolio(all_symbols_trades, ltf_bars)
+    if equity_curve.empty:
+        report_text = "No trades for the capital simulation.\n"
+        print(report_text)
+        return report_text
+
+    initial_capital = config.INITIAL_CAPITAL
+    final_equity = equity_curve['equity'].iloc[-1]
+    peak_equity = np.maximum.accumulate(np.concatenate(([initial_capital], equity_curve['equity'].to_numpy())))[1:]
+    drawdown = peak_equity - equity_curve['equity'].to_numpy()
+    worst = int(np.argmax(drawdown / peak_equity))
+    taken = sim_trades[sim_trades['lots'] > 0]
+    currency = config.ACCOUNT_CURRENCY
+
+    report_lines = [
+        f"\n--- Capital Simulation ({config.RISK_PER_TRADE_PERCENT}% of equity risked per trade) ---",
+        f"Initial Capital:           {initial_capital:.2f} {currency}",
+        f"Final Equity:              {final_equity:.2f} {currency}",
+        f"Net Profit:                {final_equity - initial_capital:.2f} {currency} ({(final_equity / initial_capital - 1) * 100:.2f}%)",
+        f"Max Equity Drawdown:       {drawdown.max():.2f} {currency} ({drawdown[worst] / peak_equity[worst] * 100:.2f}% at {equity_curve.index[worst].strftime('%Y-%m-%d %H:%M')})",
+        f"Trades Taken / Skipped:    {len(taken)} / {len(sim_trades) - len(taken)}",
+        f"Average Lot Size:          {taken['lots'].mean() if not taken.empty else 0:.2f}",
+        f"Commission Paid:           {taken['commission'].sum():.2f} {currency}",
+        f"Slippage:                  {config.SLIPPAGE_POINTS} points per fill",
+        "------------------------------------",
+    ]
+    report_text = "\n".join(report_lines)
+    print(report_text)
+
+    if session_results_path:
+        plot_dir = os.path.join(session_results_path, "EquityCurves")
+        os.makedirs(plot_dir, exist_ok=True)
+        equity_curve.to_csv(os.path.join(plot_dir, "portfolio_equity_curve_currency.csv"))
+        sim_trades.to_csv(os.path.join(plot_dir, "portfolio_simulated_trades.csv"), index=False)
+        plt.figure(figsize=(12, 6))
+        plt.plot(equity_curve.index, equity_curve['equity'], label='Equity (marked to market)')
+        plt.plot(equity_curve.index, equity_curve['balance'], label='Balance', alpha=0.6)
+        plt.title(f'Portfolio Equity ({currency}, {config.RISK_PER_TRADE_PERCENT}% risk per trade)')
+        plt.xlabel('Time (UTC)')
+        plt.ylabel(f'Equity ({currency})')
+        plt.legend(); plt.grid(True)
+        try:
+            plt.savefig(os.path.join(plot_dir, "portfolio_equity_curve_currency.png"))
+            print(f"Portfolio currency equity curve saved to {plot_dir}")
+        except Exception as e: print(f"Error saving portfolio currency equity curve plot: {e}")
+        plt.close()
+    return report_text
@@ -257,3 +257,26 @@ def calculate_portfolio_performance_metrics(all_symbols_trades_logs: dict,
         plt.close()
         
     return report_text # Now report_text is always defined before return
+
+def summarize_r_multiples(pnl_r) -> dict:
+    """
+    Headline R statistics of a chronological sequence of trade results, using the same
+    win/loss/breakeven split (|R| <= 0.01 is breakeven) and drawdown definition as the reports.
+    """
+    pnl_r = np.nan_to_num(np.asarray(pnl_r, dtype=np.float64))
+    total_trades = len(pnl_r)
+    if total_trades == 0:
+        return {"trades": 0, "win_rate": 0.0, "expectancy_R": 0.0, "profit_factor": 1.0, "net_R": 0.0, "max_drawdown_R": 0.0}
+    wins = pnl_r[pnl_r > 0.01]
+    losses = pnl_r[pnl_r < -0.01]
+    total_r_won = wins.sum()
+    total_r_lost = abs(losses.sum())
+    cumulative_r = np.cumsum(pnl_r)
+    return {
+        "trades": total_trades,
+        "win_rate": len(wins) / total_trades * 100,
+        "expectancy_R": (total_r_won - total_r_lost) / total_trades, # = win_rate * avg_win + loss_rate * avg_loss
+        "profit_factor": total_r_won / total_r_lost if total_r_lost > 0 else np.inf if total_r_won > 0 else 1.0,
+        "net_R": cumulative_r[-1],
+        "max_drawdown_R": (np.maximum.accumulate(cumulative_r) - cumulative_r).max(),
+    }
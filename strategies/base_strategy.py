@@ -1,7 +1,10 @@
 # forex_backtester_cli/strategies/base_strategy.py
 from abc import ABC, abstractmethod
+import numpy as np
 import pandas as pd
 
+from strategy_logic import build_market_structure_timeline
+
 class BaseStrategy(ABC):
     """
     Abstract base class for all trading strategies.
@@ -21,6 +24,11 @@ class BaseStrategy(ABC):
         # R-levels to track, can be overridden by strategy_params
         self.r_levels_to_track = strategy_params.get("r_levels_to_track", [1.0, 1.5, 2.0, 2.5, 3.0])
 
+        # Per-bar market structure of the prepared frames (strategy_logic.MarketStructureTimeline),
+        # built in prepare_data so CHoCH/BOS detection doesn't rescan the swings for every bar.
+        self.htf_structure_timeline = None
+        self.ltf_structure_timeline = None
+
 
     @abstractmethod
     def prepare_data(self, htf_data: pd.DataFrame, ltf_data: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
@@ -89,6 +97,38 @@ class BaseStrategy(ABC):
         """
         pass
     
+    def get_htf_signal_candidates(self, htf_data_prepared: pd.DataFrame) -> np.ndarray | None:
+        """
+        Sorted HTF row numbers where check_htf_condition can possibly return a signal.
+        The backtester skips straight between these while no trade is open.
+        Returns None (the default) to have every HTF bar evaluated.
+        """
+        return None
+
+    # --- Live streaming (live_feed.LiveSymbolFeed) ---
+    def create_streaming_indicators(self) -> dict | None:
+        """
+        Fresh streaming indicators (streaming_indicators.py) for one symbol's LTF bars.
+        Returns None (the default) to have the live engine call prepare_data on every poll.
+        """
+        return None
+
+    def update_streaming_indicators(self, indicators: dict, bar: dict) -> dict:
+        """
+        Feeds one LTF bar ({'open': ..., 'high': ..., 'low': ..., 'close': ...}) to the objects from
+        create_streaming_indicators and returns the columns prepare_data adds for that bar.
+        """
+        raise NotImplementedError
+
+    def prepare_live_data(self, htf_data: pd.DataFrame, ltf_data_prepared: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        The rest of prepare_data for an LTF frame whose indicator columns came from the streaming
+        indicators (HTF preparation, structure timeline, per-run state). htf_data already has the
+        swing_high/swing_low columns, as in a backtest.
+        """
+        self.htf_structure_timeline = build_market_structure_timeline(htf_data)
+        return htf_data, ltf_data_prepared
+
     def get_r_levels_to_track(self) -> list:
         """Returns the R-levels this strategy wants to track."""
         return self.r_levels_to_track
@@ -1,11 +1,15 @@
 # forex_backtester_cli/strategies/choch_ha_sma_strategy.py
 
 # Need to import global_config at the top of the file
+import logging
 import config as global_config
-from strategy_logic import detect_choch as original_detect_choch
+from strategy_logic import detect_choch as original_detect_choch, build_market_structure_timeline, detect_choch_events
+import numpy as np
 import pandas as pd
 from .base_strategy import BaseStrategy
 
+logger = logging.getLogger(__name__)
+
 ### File: X:\AmalTrading\trading_backtesting\strategies\choch_ha_sma_strategy.py
 # ... (imports and __init__ remain the same) ...
 class ChochHaSmaStrategy(BaseStrategy):
@@ -22,13 +26,19 @@ class ChochHaSmaStrategy(BaseStrategy):
         if 'ha_close' not in ltf_data_ha_with_swings.columns:
             raise ValueError("LTF data must have 'ha_close' for SMA calculation (Heikin Ashi expected).")
         ltf_data_ha_with_swings[f'sma_{self.sma_period}'] = ltf_data_ha_with_swings['ha_close'].rolling(window=self.sma_period).mean()
+        self.htf_structure_timeline = build_market_structure_timeline(htf_data_with_swings)
         return htf_data_with_swings, ltf_data_ha_with_swings
 
+    def get_htf_signal_candidates(self, htf_data_prepared: pd.DataFrame) -> np.ndarray | None:
+        # The HTF condition requires a CHoCH, so only CHoCH candles need to be evaluated
+        return detect_choch_events(htf_data_prepared, self.htf_break_type, self.htf_structure_timeline)['index']
+
     def check_htf_condition(self, htf_data_prepared: pd.DataFrame, current_htf_candle_idx: int) -> dict | None:
         choch_type, choch_price_broken, choch_confirmed_time = original_detect_choch(
             htf_data_prepared, 
             current_htf_candle_idx,
-            self.htf_break_type 
+            self.htf_break_type,
+            structure_timeline=self.htf_structure_timeline
         )
         if choch_type:
             return {
@@ -110,10 +120,10 @@ class ChochHaSmaStrategy(BaseStrategy):
             else: 
                 sl_ha_swing_level = sl_fixed_level 
         except KeyError:
-            print(f"    Warning (ChochHaSma): Signal candle time {signal_candle_time} not found in LTF data for SL calc. Using fixed SL only.")
+            logger.warning("ChochHaSma: Signal candle time %s not found in LTF data for SL calc. Using fixed SL only.", signal_candle_time)
             sl_ha_swing_level = sl_fixed_level 
         except Exception as e:
-             print(f"    Error (ChochHaSma) calculating HA Swing SL: {e}. Using fixed SL.")
+             logger.error("ChochHaSma: Error calculating HA Swing SL: %s. Using fixed SL.", e)
              sl_ha_swing_level = sl_fixed_level
 
 
@@ -134,12 +144,12 @@ class ChochHaSmaStrategy(BaseStrategy):
                 final_sl_price = sl_ha_swing_level
 
         if final_sl_price is None:
-            print(f"    ERROR (ChochHaSma): Could not determine final SL price for trade at {entry_time}. Skipping.")
+            logger.error("ChochHaSma: Could not determine final SL price for trade at %s. Skipping.", entry_time)
             return None, None
 
         risk_amount_price = abs(entry_price - final_sl_price)
         if risk_amount_price < self.pip_size: 
-            print(f"    Warning (ChochHaSma): Risk amount too small ({risk_amount_price:.5f}) for {self.symbol} at {entry_time}. Cannot set valid TP.")
+            logger.warning("ChochHaSma: Risk amount too small (%.5f) for %s at %s. Cannot set valid TP.", risk_amount_price, self.symbol, entry_time)
             return final_sl_price, None 
 
         tp_price = None
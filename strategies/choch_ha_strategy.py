@@ -1,8 +1,12 @@
 # forex_backtester_cli/strategies/choch_ha_strategy.py
+import logging
 import config as global_config
-from strategy_logic import detect_choch as original_detect_choch, detect_ltf_structure_change as original_detect_ltf_change
+from strategy_logic import detect_choch as original_detect_choch, detect_ltf_structure_change as original_detect_ltf_change, build_market_structure_timeline, detect_choch_events
+import numpy as np
 import pandas as pd
 from .base_strategy import BaseStrategy
+
+logger = logging.getLogger(__name__)
 # Import necessary functions from your existing strategy_logic or utils
 # For this example, we'll assume detect_choch and detect_ltf_structure_change
 # are adapted or their core logic is moved into this class's methods.
@@ -22,15 +26,22 @@ class ChochHaStrategy(BaseStrategy):
         self.tp_rr_ratio = self.params.get("TP_RR_RATIO", 1.5)
 
     def prepare_data(self, htf_data: pd.DataFrame, ltf_data: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        self.htf_structure_timeline = build_market_structure_timeline(htf_data)
+        self.ltf_structure_timeline = build_market_structure_timeline(ltf_data)
         return htf_data, ltf_data
 
+    def get_htf_signal_candidates(self, htf_data_prepared: pd.DataFrame) -> np.ndarray | None:
+        # The HTF condition requires a CHoCH, so only CHoCH candles need to be evaluated
+        return detect_choch_events(htf_data_prepared, self.break_type, self.htf_structure_timeline)['index']
+
     def check_htf_condition(self, htf_data_with_swings: pd.DataFrame, current_htf_candle_idx: int) -> dict | None:
         # This strategy uses the global config.BREAK_TYPE for HTF CHoCH if not specified in params
         # or its own self.break_type if it was set from params.
         choch_type, choch_price_broken, choch_confirmed_time = original_detect_choch(
             htf_data_with_swings,
             current_htf_candle_idx,
-            self.break_type 
+            self.break_type,
+            structure_timeline=self.htf_structure_timeline
         )
         if choch_type:
             return {
@@ -48,7 +59,8 @@ class ChochHaStrategy(BaseStrategy):
             ltf_data_ha_with_swings,
             current_ltf_candle_idx,
             required_direction,
-            self.break_type # Assuming LTF break type is same as HTF for this strategy
+            self.break_type, # Assuming LTF break type is same as HTF for this strategy
+            structure_timeline=self.ltf_structure_timeline
         )
         if ltf_signal_type:
             # Ensure the LTF signal's inherent direction matches the required HTF direction
@@ -71,30 +83,34 @@ class ChochHaStrategy(BaseStrategy):
         direction = ltf_signal_details.get("direction", htf_signal_details["required_ltf_direction"])
 
 
-        relevant_swings_for_sl = ltf_data_ha_with_swings[ltf_data_ha_with_swings.index < entry_time]
+        # Last LTF HA swings strictly before the entry candle, read from the structure timeline
+        entry_pos = ltf_data_ha_with_swings.index.searchsorted(entry_time, side='left')
+        timeline = self.ltf_structure_timeline
+        if timeline is None or not timeline.matches(ltf_data_ha_with_swings):
+            timeline = build_market_structure_timeline(ltf_data_ha_with_swings)
+        last_swing_low = timeline.last_sl_price[entry_pos - 1] if timeline is not None and entry_pos > 0 else np.nan
+        last_swing_high = timeline.last_sh_price[entry_pos - 1] if timeline is not None and entry_pos > 0 else np.nan
 
         if direction == "bullish":
-            last_ha_swing_low_for_sl = relevant_swings_for_sl[relevant_swings_for_sl['swing_low'].notna()]
-            if not last_ha_swing_low_for_sl.empty:
-                sl_price = last_ha_swing_low_for_sl['swing_low'].iloc[-1] - self.sl_buffer_price
+            if not np.isnan(last_swing_low):
+                sl_price = last_swing_low - self.sl_buffer_price
             else: 
                 # Fallback SL if no swing found (e.g. 15 pips, should be configurable)
                 sl_price = entry_price - (15 * self.pip_size) 
-                print(f"    Warning (ChochHa): No prior LTF HA swing low for SL ({self.symbol}). Using default pip SL.")
+                logger.warning("ChochHa: No prior LTF HA swing low for SL (%s). Using default pip SL.", self.symbol)
         
         elif direction == "bearish":
-            last_ha_swing_high_for_sl = relevant_swings_for_sl[relevant_swings_for_sl['swing_high'].notna()]
-            if not last_ha_swing_high_for_sl.empty:
-                sl_price = last_ha_swing_high_for_sl['swing_high'].iloc[-1] + self.sl_buffer_price
+            if not np.isnan(last_swing_high):
+                sl_price = last_swing_high + self.sl_buffer_price
             else: 
                 sl_price = entry_price + (15 * self.pip_size) 
-                print(f"    Warning (ChochHa): No prior LTF HA swing high for SL ({self.symbol}). Using default pip SL.")
+                logger.warning("ChochHa: No prior LTF HA swing high for SL (%s). Using default pip SL.", self.symbol)
 
         if sl_price is None: return None, None
 
         risk_amount_price = abs(entry_price - sl_price)
         if risk_amount_price < self.pip_size: 
-            print(f"    Warning (ChochHa): Risk amount too small ({risk_amount_price:.5f}) for {self.symbol}. Cannot set valid SL/TP.")
+            logger.warning("ChochHa: Risk amount too small (%.5f) for %s. Cannot set valid SL/TP.", risk_amount_price, self.symbol)
             return None, None 
 
         tp_price = None
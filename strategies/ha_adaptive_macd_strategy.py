@@ -1,15 +1,19 @@
 ### File: X:\AmalTrading\trading_backtesting\strategies\ha_adaptive_macd_strategy.py
 
+import logging
 import pandas as pd
 import numpy as np
 from .base_strategy import BaseStrategy
 from indicators import calculate_adaptive_macd 
 from heikin_ashi import calculate_heikin_ashi
+from streaming_indicators import StreamingHeikinAshi, StreamingAdaptiveMACD
 import config as global_config 
 
-from strategy_logic import detect_choch as original_detect_choch
+from strategy_logic import detect_choch as original_detect_choch, build_market_structure_timeline, detect_choch_events
 from utils import identify_swing_points_zigzag, identify_swing_points_simple # Ensure both are imported if used
 
+logger = logging.getLogger(__name__)
+
 class HAAdaptiveMACDStrategy(BaseStrategy):
     def __init__(self, strategy_params: dict, common_params: dict):
         super().__init__(strategy_params, common_params)
@@ -29,7 +33,7 @@ class HAAdaptiveMACDStrategy(BaseStrategy):
     def _reset_strategy_state(self):
         pass
 
-    def prepare_data(self, htf_data: pd.DataFrame, ltf_data: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    def _prepare_htf(self, htf_data: pd.DataFrame) -> pd.DataFrame:
         prepared_htf_data = htf_data.copy()
         if not prepared_htf_data.empty:
             if global_config.SWING_IDENTIFICATION_METHOD == "zigzag":
@@ -43,6 +47,10 @@ class HAAdaptiveMACDStrategy(BaseStrategy):
                     n_left=global_config.N_BARS_LEFT_RIGHT_FOR_SWING_HTF,
                     n_right=global_config.N_BARS_LEFT_RIGHT_FOR_SWING_HTF
                 )
+        return prepared_htf_data
+
+    def prepare_data(self, htf_data: pd.DataFrame, ltf_data: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        prepared_htf_data = self._prepare_htf(htf_data)
         
         chart_data_ltf = ltf_data.copy() 
         if not chart_data_ltf.empty:
@@ -55,9 +63,31 @@ class HAAdaptiveMACDStrategy(BaseStrategy):
                 calculate_adaptive_macd(chart_data_ltf['close'], self.macd_r2_period,
                                         self.macd_fast, self.macd_slow, self.macd_signal)
         
+        self.htf_structure_timeline = build_market_structure_timeline(prepared_htf_data)
         self._reset_strategy_state() 
         return prepared_htf_data, chart_data_ltf
 
+    def create_streaming_indicators(self) -> dict:
+        return {"ha": StreamingHeikinAshi(),
+                "macd": StreamingAdaptiveMACD(self.macd_r2_period, self.macd_fast, self.macd_slow, self.macd_signal)}
+
+    def update_streaming_indicators(self, indicators: dict, bar: dict) -> dict:
+        ha_open, ha_high, ha_low, ha_close = indicators["ha"].update(bar['open'], bar['high'], bar['low'], bar['close'])
+        macd_line, macd_signal_line, macd_hist = indicators["macd"].update(bar['close'])
+        return {'ha_open': ha_open, 'ha_high': ha_high, 'ha_low': ha_low, 'ha_close': ha_close,
+                'ha_green': ha_close > ha_open, 'ha_red': ha_close < ha_open,
+                'macd_line': macd_line, 'macd_signal_line': macd_signal_line, 'macd_hist': macd_hist}
+
+    def prepare_live_data(self, htf_data: pd.DataFrame, ltf_data_prepared: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        # The live feed's HTF frame already carries the swings (its ZigZagTracker pivots)
+        self.htf_structure_timeline = build_market_structure_timeline(htf_data)
+        self._reset_strategy_state()
+        return htf_data, ltf_data_prepared
+
+
+    def get_htf_signal_candidates(self, htf_data_prepared: pd.DataFrame) -> np.ndarray | None:
+        # The HTF condition requires a CHoCH, so only CHoCH candles need to be evaluated
+        return detect_choch_events(htf_data_prepared, self.htf_break_type, self.htf_structure_timeline)['index']
 
     def check_htf_condition(self, htf_data_prepared: pd.DataFrame, current_htf_candle_idx: int) -> dict | None:
         if htf_data_prepared.empty or \
@@ -72,7 +102,8 @@ class HAAdaptiveMACDStrategy(BaseStrategy):
         choch_type, choch_price_broken, choch_confirmed_time = original_detect_choch(
             htf_data_prepared, 
             current_htf_candle_idx,
-            self.htf_break_type 
+            self.htf_break_type,
+            structure_timeline=self.htf_structure_timeline
         )
         if choch_type:
             return {
@@ -118,59 +149,61 @@ class HAAdaptiveMACDStrategy(BaseStrategy):
                         chart_data_prepared: pd.DataFrame, ltf_signal_details: dict, 
                         htf_signal_details: dict) -> tuple[float | None, float | None]:
         
-        print(f"    DEBUG SL/TP Calc for {self.symbol} at {entry_time}:")
-        print(f"      Entry Price: {entry_price:.5f}")
-        print(f"      LTF Signal Details: {ltf_signal_details}")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("    DEBUG SL/TP Calc for %s at %s:", self.symbol, entry_time)
+            logger.debug("      Entry Price: %.5f", entry_price)
+            logger.debug("      LTF Signal Details: %s", ltf_signal_details)
 
         direction = ltf_signal_details.get("direction")
         if not direction:
-            print(f"      ERROR: Direction missing in ltf_signal_details.")
+            logger.error("      Direction missing in ltf_signal_details.")
             return None, None
         
-        print(f"      Direction: {direction}")
+        if debug: logger.debug("      Direction: %s", direction)
 
         sl_price = None
         tp_price = None
         sl_buffer_actual = self.sl_buffer_pips_strat * self.pip_size
-        print(f"      SL Buffer Actual: {sl_buffer_actual:.5f} (Pips: {self.sl_buffer_pips_strat}, PipSize: {self.pip_size})")
+        if debug: logger.debug("      SL Buffer Actual: %.5f (Pips: %s, PipSize: %s)", sl_buffer_actual, self.sl_buffer_pips_strat, self.pip_size)
         
         signal_candle_low = ltf_signal_details.get("signal_candle_ha_low")
         signal_candle_high = ltf_signal_details.get("signal_candle_ha_high")
 
         if direction == "bullish":
             if signal_candle_low is None:
-                print(f"      ERROR: Missing signal_candle_ha_low for SL calc.")
+                logger.error("      Missing signal_candle_ha_low for SL calc.")
                 return None, None
-            print(f"      Signal Candle HA Low: {signal_candle_low:.5f}")
+            if debug: logger.debug("      Signal Candle HA Low: %.5f", signal_candle_low)
             sl_price = signal_candle_low - sl_buffer_actual
-            print(f"      Calculated Bullish SL (pre-validation): {sl_price:.5f}")
+            if debug: logger.debug("      Calculated Bullish SL (pre-validation): %.5f", sl_price)
         elif direction == "bearish":
             if signal_candle_high is None:
-                print(f"      ERROR: Missing signal_candle_ha_high for SL calc.")
+                logger.error("      Missing signal_candle_ha_high for SL calc.")
                 return None, None
-            print(f"      Signal Candle HA High: {signal_candle_high:.5f}")
+            if debug: logger.debug("      Signal Candle HA High: %.5f", signal_candle_high)
             sl_price = signal_candle_high + sl_buffer_actual
-            print(f"      Calculated Bearish SL (pre-validation): {sl_price:.5f}")
+            if debug: logger.debug("      Calculated Bearish SL (pre-validation): %.5f", sl_price)
         else: 
-            print(f"      ERROR: Invalid direction '{direction}' for SL/TP calc.")
+            logger.error("      Invalid direction '%s' for SL/TP calc.", direction)
             return None, None
 
         # Validate SL
         min_sl_distance_from_entry = self.pip_size * 1 # Min 1 pip distance
         if direction == "bullish":
             if sl_price >= entry_price - min_sl_distance_from_entry:
-                print(f"      VALIDATION FAIL: Bullish SL {sl_price:.5f} too close or above entry threshold {entry_price - min_sl_distance_from_entry:.5f}.")
+                logger.debug("      VALIDATION FAIL: Bullish SL %.5f too close or above entry threshold %.5f.", sl_price, entry_price - min_sl_distance_from_entry)
                 return None, None 
         elif direction == "bearish":
             if sl_price <= entry_price + min_sl_distance_from_entry:
-                print(f"      VALIDATION FAIL: Bearish SL {sl_price:.5f} too close or below entry threshold {entry_price + min_sl_distance_from_entry:.5f}.")
+                logger.debug("      VALIDATION FAIL: Bearish SL %.5f too close or below entry threshold %.5f.", sl_price, entry_price + min_sl_distance_from_entry)
                 return None, None
 
         risk_amount_price = abs(entry_price - sl_price)
-        print(f"      Risk Amount Price: {risk_amount_price:.5f}")
+        if debug: logger.debug("      Risk Amount Price: %.5f", risk_amount_price)
         min_risk_required = self.pip_size * 2
         if risk_amount_price < min_risk_required: 
-            print(f"      VALIDATION FAIL: Risk amount {risk_amount_price:.5f} too small (min required: {min_risk_required:.5f}).")
+            logger.debug("      VALIDATION FAIL: Risk amount %.5f too small (min required: %.5f).", risk_amount_price, min_risk_required)
             return None, None 
 
         if direction == "bullish":
@@ -178,5 +211,4 @@ class HAAdaptiveMACDStrategy(BaseStrategy):
         elif direction == "bearish":
             tp_price = entry_price - (risk_amount_price * self.tp_rr_ratio)
         
-        #print(f"      Final SL: {sl_price:.5f}, Final TP: {tp_price:.5f if tp_price else 'N/A'}")
         return sl_price, tp_price
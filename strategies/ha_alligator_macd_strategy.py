@@ -5,8 +5,9 @@ import numpy as np
 from .base_strategy import BaseStrategy
 from indicators import calculate_alligator, calculate_adaptive_macd 
 from heikin_ashi import calculate_heikin_ashi
+from streaming_indicators import StreamingHeikinAshi, StreamingSMMA, StreamingAdaptiveMACD
 import config as global_config 
-from strategy_logic import detect_choch as original_detect_choch # For HTF CHoCH
+from strategy_logic import detect_choch as original_detect_choch, build_market_structure_timeline, detect_choch_events # For HTF CHoCH
 
 class HAAlligatorMACDStrategy(BaseStrategy):
     def __init__(self, strategy_params: dict, common_params: dict):
@@ -68,9 +69,31 @@ class HAAlligatorMACDStrategy(BaseStrategy):
             calculate_adaptive_macd(chart_data['close'], self.macd_r2_period,
                                     self.macd_fast, self.macd_slow, self.macd_signal)
         
+        self.htf_structure_timeline = build_market_structure_timeline(htf_data)
         self._reset_strategy_state() 
         return htf_data, chart_data # Return original htf_data and prepared chart_data (LTF)
 
+    def create_streaming_indicators(self) -> dict:
+        return {"ha": StreamingHeikinAshi(),
+                "jaw": StreamingSMMA(self.jaw_period), "teeth": StreamingSMMA(self.teeth_period), "lips": StreamingSMMA(self.lips_period),
+                "macd": StreamingAdaptiveMACD(self.macd_r2_period, self.macd_fast, self.macd_slow, self.macd_signal)}
+
+    def update_streaming_indicators(self, indicators: dict, bar: dict) -> dict:
+        ha_open, ha_high, ha_low, ha_close = indicators["ha"].update(bar['open'], bar['high'], bar['low'], bar['close'])
+        row = {'ha_open': ha_open, 'ha_high': ha_high, 'ha_low': ha_low, 'ha_close': ha_close,
+               'ha_median': (ha_high + ha_low) / 2, 'ha_green': ha_close > ha_open, 'ha_red': ha_close < ha_open}
+        source = row.get(self.alligator_source_col, bar.get(self.alligator_source_col, bar['close']))
+        row['alligator_jaw_raw'] = indicators["jaw"].update(source)
+        row['alligator_teeth_raw'] = indicators["teeth"].update(source)
+        row['alligator_lips_raw'] = indicators["lips"].update(source)
+        row['macd_line'], row['macd_signal_line'], row['macd_hist'] = indicators["macd"].update(bar['close'])
+        return row
+
+    def prepare_live_data(self, htf_data: pd.DataFrame, ltf_data_prepared: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        self.htf_structure_timeline = build_market_structure_timeline(htf_data)
+        self._reset_strategy_state()
+        return htf_data, ltf_data_prepared
+
 
     def _get_alligator_values_at_idx(self, df: pd.DataFrame, idx: int):
         jaw = df['alligator_jaw_raw'].iloc[idx - self.jaw_shift] if idx >= self.jaw_shift and idx - self.jaw_shift < len(df) else np.nan
@@ -141,12 +164,17 @@ class HAAlligatorMACDStrategy(BaseStrategy):
                 self.last_defined_ha_low = temp_low
                 self.last_defined_ha_low_time = temp_low_time
 
+    def get_htf_signal_candidates(self, htf_data_prepared: pd.DataFrame) -> np.ndarray | None:
+        # The HTF condition requires a CHoCH, so only CHoCH candles need to be evaluated
+        return detect_choch_events(htf_data_prepared, self.htf_break_type, self.htf_structure_timeline)['index']
+
     def check_htf_condition(self, htf_data_prepared: pd.DataFrame, current_htf_candle_idx: int) -> dict | None:
         # htf_data_prepared is M15 data with swings
         choch_type, choch_price_broken, choch_confirmed_time = original_detect_choch(
             htf_data_prepared,
             current_htf_candle_idx,
-            self.htf_break_type 
+            self.htf_break_type,
+            structure_timeline=self.htf_structure_timeline
         )
 
         if not choch_type:
@@ -1,5 +1,6 @@
 ### File: X:\AmalTrading\trading_backtesting\strategies\zlsma_with_filters_strategy.py
 
+import logging
 import pandas as pd
 import numpy as np
 from .base_strategy import BaseStrategy
@@ -9,9 +10,12 @@ from indicators import (
     calculate_adaptive_macd,
     calculate_atr 
 )
-from strategy_logic import detect_choch as original_detect_choch # For HTF CHoCH
+from strategy_logic import detect_choch as original_detect_choch, build_market_structure_timeline, detect_choch_events # For HTF CHoCH
+from streaming_indicators import StreamingZLSMA, StreamingAdaptiveMACD, StreamingATR
 import config as global_config # To access global BREAK_TYPE if needed
 
+logger = logging.getLogger(__name__)
+
 class ZLSMAWithFiltersStrategy(BaseStrategy):
     def __init__(self, strategy_params: dict, common_params: dict):
         super().__init__(strategy_params, common_params)
@@ -52,6 +56,24 @@ class ZLSMAWithFiltersStrategy(BaseStrategy):
                                         self.macd_fast, self.macd_slow, self.macd_signal)
         ltf_data['atr_sl'] = calculate_atr(ltf_data['high'], ltf_data['low'], ltf_data['close'], self.sl_atr_period)
         
+        return self.prepare_live_data(htf_data, ltf_data)
+
+    def create_streaming_indicators(self) -> dict:
+        indicators = {"zlsma": StreamingZLSMA(self.zlsma_length), "atr_sl": StreamingATR(self.sl_atr_period)}
+        if self.use_macd_filter:
+            indicators["macd"] = StreamingAdaptiveMACD(self.macd_r2_period, self.macd_fast, self.macd_slow, self.macd_signal)
+        return indicators
+
+    def update_streaming_indicators(self, indicators: dict, bar: dict) -> dict:
+        if self.zlsma_source_col not in bar:
+            raise ValueError(f"Source column '{self.zlsma_source_col}' not in LTF data for ZLSMA.")
+        row = {'zlsma': indicators["zlsma"].update(bar[self.zlsma_source_col])}
+        if self.use_macd_filter:
+            row['macd_line'], row['macd_signal_line'], row['macd_hist'] = indicators["macd"].update(bar['close'])
+        row['atr_sl'] = indicators["atr_sl"].update(bar['high'], bar['low'], bar['close'])
+        return row
+
+    def prepare_live_data(self, htf_data: pd.DataFrame, ltf_data_prepared: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
         # Prepare HTF for range filter if used (indicators only, actual check in HTF condition)
         if self.use_range_filter:
             # Calculate range filter components but don't filter yet
@@ -61,14 +83,20 @@ class ZLSMAWithFiltersStrategy(BaseStrategy):
                                              self.range_atr_len, self.range_mult,
                                              htf_data['high'], htf_data['low'])
                                              
-        return htf_data, ltf_data
+        self.htf_structure_timeline = build_market_structure_timeline(htf_data)
+        return htf_data, ltf_data_prepared
+
+    def get_htf_signal_candidates(self, htf_data_prepared: pd.DataFrame) -> np.ndarray | None:
+        # The HTF condition requires a CHoCH, so only CHoCH candles need to be evaluated
+        return detect_choch_events(htf_data_prepared, self.htf_break_type, self.htf_structure_timeline)['index']
 
     def check_htf_condition(self, htf_data_prepared: pd.DataFrame, current_htf_candle_idx: int) -> dict | None:
         # 1. Detect HTF CHoCH
         choch_type, choch_price_broken, choch_confirmed_time = original_detect_choch(
             htf_data_prepared, # This is htf_data_with_swings, and potentially range indicators
             current_htf_candle_idx,
-            self.htf_break_type 
+            self.htf_break_type,
+            structure_timeline=self.htf_structure_timeline
         )
 
         if not choch_type:
@@ -81,7 +109,7 @@ class ZLSMAWithFiltersStrategy(BaseStrategy):
         if self.use_range_filter:
             current_htf_candle = htf_data_prepared.iloc[current_htf_candle_idx]
             if 'in_range_temp' not in current_htf_candle.index:
-                print(f"  WARNING ({self.symbol} HTF ZLSMA): 'in_range_temp' column missing for range filter check at {current_htf_candle.name}")
+                logger.warning("%s HTF ZLSMA: 'in_range_temp' column missing for range filter check at %s", self.symbol, current_htf_candle.name)
             elif pd.notna(current_htf_candle.get('in_range_temp')) and current_htf_candle.get('in_range_temp'):
                 return None # CHoCH occurred, but HTF is in range, so filter out
 
@@ -149,10 +177,10 @@ class ZLSMAWithFiltersStrategy(BaseStrategy):
                 raise IndexError("ATR not found for signal candle or atr_sl column missing")
 
             if pd.isna(atr_at_entry_candle_prev):
-                print(f"    Warning (ZLSMA): ATR is NaN at {ltf_data_prepared.index[signal_candle_idx]} for SL calc. Using default pip SL.")
+                logger.warning("ZLSMA: ATR is NaN at %s for SL calc. Using default pip SL.", ltf_data_prepared.index[signal_candle_idx])
                 atr_at_entry_candle_prev = self.pip_size * 20 # Default ATR value in pips
         except (IndexError, KeyError) as e:
-             print(f"    Warning (ZLSMA): Error getting ATR for SL/TP at {entry_time} (signal time {ltf_signal_details.get('confirmed_time')}): {e}. Using default pip SL.")
+             logger.warning("ZLSMA: Error getting ATR for SL/TP at %s (signal time %s): %s. Using default pip SL.", entry_time, ltf_signal_details.get('confirmed_time'), e)
              atr_at_entry_candle_prev = self.pip_size * 20 
 
         sl_distance = atr_at_entry_candle_prev * self.sl_atr_multiplier
@@ -166,7 +194,7 @@ class ZLSMAWithFiltersStrategy(BaseStrategy):
             tp_price = entry_price - (sl_distance * self.tp_rr_ratio)
             
         if sl_price is None or tp_price is None or sl_distance < self.pip_size / 2 : 
-            print(f"    Warning (ZLSMA): Invalid SL/TP ({sl_price}, {tp_price}) or too small SL distance ({sl_distance}) for {self.symbol} at {entry_time}.")
+            logger.warning("ZLSMA: Invalid SL/TP (%s, %s) or too small SL distance (%s) for %s at %s.", sl_price, tp_price, sl_distance, self.symbol, entry_time)
             return None, None 
             
         return sl_price, tp_price
\ No newline at end of file
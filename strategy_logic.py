@@ -1,27 +1,37 @@
 # forex_backtester_cli/strategy_logic.py
+import logging
 import pandas as pd
 import numpy as np
+from dataclasses import dataclass
 
-DEBUG_STRATEGY_LOGIC = True 
+from indicator_cache import cached_indicator
+
+# Per-bar structure and CHoCH evaluation is logged at DEBUG (config.LOG_LEVEL = "DEBUG" to see it)
+logger = logging.getLogger(__name__)
+
+# Codes used by MarketStructureTimeline.structure
+STRUCTURE_UNDETERMINED, STRUCTURE_RANGING, STRUCTURE_UPTREND, STRUCTURE_DOWNTREND = 0, 1, 2, 3
+STRUCTURE_LABELS = ("undetermined", "ranging", "uptrend", "downtrend")
 
 def get_market_structure_and_recent_swings(df_with_swings: pd.DataFrame, current_eval_time: pd.Timestamp):
     """
     Analyzes swings confirmed *before or at current_eval_time* to determine market structure.
     """
-    if DEBUG_STRATEGY_LOGIC: print(f"  DEBUG: get_market_structure called for time <= {current_eval_time} with full df shape {df_with_swings.shape}")
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug: logger.debug("  get_market_structure called for time <= %s with full df shape %s", current_eval_time, df_with_swings.shape)
     
     # Filter swings that occurred at or before the current evaluation time
     confirmed_swings = df_with_swings[df_with_swings.index <= current_eval_time]
     swing_highs = confirmed_swings[confirmed_swings['swing_high'].notna()]
     swing_lows = confirmed_swings[confirmed_swings['swing_low'].notna()]
 
-    if DEBUG_STRATEGY_LOGIC:
-        print(f"    Considering swings up to {current_eval_time}: Found {len(swing_highs)} swing highs, {len(swing_lows)} swing lows.")
-        if not swing_highs.empty: print(f"    Latest considered SH: {swing_highs.iloc[-1]['swing_high']:.5f} at {swing_highs.index[-1]}")
-        if not swing_lows.empty: print(f"    Latest considered SL: {swing_lows.iloc[-1]['swing_low']:.5f} at {swing_lows.index[-1]}")
+    if debug:
+        logger.debug("    Considering swings up to %s: Found %d swing highs, %d swing lows.", current_eval_time, len(swing_highs), len(swing_lows))
+        if not swing_highs.empty: logger.debug("    Latest considered SH: %.5f at %s", swing_highs.iloc[-1]['swing_high'], swing_highs.index[-1])
+        if not swing_lows.empty: logger.debug("    Latest considered SL: %.5f at %s", swing_lows.iloc[-1]['swing_low'], swing_lows.index[-1])
 
     if swing_highs.empty or swing_lows.empty or len(swing_highs) < 2 or len(swing_lows) < 2:
-        if DEBUG_STRATEGY_LOGIC: print("    Not enough confirmed swings (need >=2 of each type) up to this point for structure determination.")
+        if debug: logger.debug("    Not enough confirmed swings (need >=2 of each type) up to this point for structure determination.")
         return "undetermined", None, None, None, None
 
     last_sh = swing_highs.iloc[-1]
@@ -40,7 +50,7 @@ def get_market_structure_and_recent_swings(df_with_swings: pd.DataFrame, current
         if last_sl.name > last_sh.name and last_sh.name > second_last_sl.name:
             market_structure = "downtrend"
     
-    if DEBUG_STRATEGY_LOGIC: print(f"    Determined structure based on swings up to {current_eval_time}: {market_structure}")
+    if debug: logger.debug("    Determined structure based on swings up to %s: %s", current_eval_time, market_structure)
     
     # For CHoCH, we need the last structural point of the identified trend.
     # If uptrend, it's the last HL (which would be `last_sl` if structure is correctly identified).
@@ -53,171 +63,283 @@ def get_market_structure_and_recent_swings(df_with_swings: pd.DataFrame, current
            last_sl['swing_low'], last_sl.name
 
 
-def detect_choch(df_ohlc_with_swings: pd.DataFrame, current_candle_index: int, break_type: str = "close"):
-    current_candle = df_ohlc_with_swings.iloc[current_candle_index]
-    current_time = current_candle.name 
+@dataclass
+class MarketStructureTimeline:
+    """
+    Market structure as get_market_structure_and_recent_swings() reports it when evaluated
+    at each bar's time, precomputed for the whole frame. All arrays are aligned with the
+    rows of the source DataFrame. Swing positions are row numbers (-1 if that swing does
+    not exist yet, with a NaN price).
+    """
+    index: pd.Index
+    structure: np.ndarray           # int8 codes into STRUCTURE_LABELS
+    swing_high_count: np.ndarray    # swing highs confirmed at or before each bar
+    swing_low_count: np.ndarray
+    last_sh_price: np.ndarray
+    last_sh_pos: np.ndarray
+    second_last_sh_price: np.ndarray
+    second_last_sh_pos: np.ndarray
+    last_sl_price: np.ndarray
+    last_sl_pos: np.ndarray
+    second_last_sl_price: np.ndarray
+    second_last_sl_pos: np.ndarray
+
+    def matches(self, df: pd.DataFrame) -> bool:
+        """Cheap check that `df` is the frame (same rows) this timeline was built from."""
+        n = len(self.index)
+        return len(df) == n and (n == 0 or (df.index[0] == self.index[0] and df.index[-1] == self.index[-1]))
+
+    def structure_at(self, pos: int):
+        """Same return value as get_market_structure_and_recent_swings(df, df.index[pos])."""
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            eval_time = self.index[pos]
+            logger.debug("  get_market_structure called for time <= %s with full df shape (%d, timeline)", eval_time, len(self.index))
+            logger.debug("    Considering swings up to %s: Found %d swing highs, %d swing lows.", eval_time, self.swing_high_count[pos], self.swing_low_count[pos])
+            if self.last_sh_pos[pos] >= 0: logger.debug("    Latest considered SH: %.5f at %s", self.last_sh_price[pos], self.index[self.last_sh_pos[pos]])
+            if self.last_sl_pos[pos] >= 0: logger.debug("    Latest considered SL: %.5f at %s", self.last_sl_price[pos], self.index[self.last_sl_pos[pos]])
+
+        code = self.structure[pos]
+        if code == STRUCTURE_UNDETERMINED:
+            if debug: logger.debug("    Not enough confirmed swings (need >=2 of each type) up to this point for structure determination.")
+            return "undetermined", None, None, None, None
+
+        if debug: logger.debug("    Determined structure based on swings up to %s: %s", self.index[pos], STRUCTURE_LABELS[code])
+        return STRUCTURE_LABELS[code], \
+               self.last_sh_price[pos], self.index[self.last_sh_pos[pos]], \
+               self.last_sl_price[pos], self.index[self.last_sl_pos[pos]]
+
+
+def _last_two_swings(swing_values: np.ndarray):
+    """For every row: number of swings so far and the positions/prices of the last two."""
+    is_swing = ~np.isnan(swing_values)
+    count = np.cumsum(is_swing)
+    positions = np.flatnonzero(is_swing)
+    if len(positions) == 0:
+        none = np.full(len(swing_values), -1, dtype=np.int64)
+        return count, none, none.copy(), np.full(len(swing_values), np.nan), np.full(len(swing_values), np.nan)
+
+    last_pos = np.where(count >= 1, positions[np.maximum(count - 1, 0)], -1)
+    second_pos = np.where(count >= 2, positions[np.maximum(count - 2, 0)], -1)
+    last_price = np.where(last_pos >= 0, swing_values[last_pos], np.nan)
+    second_price = np.where(second_pos >= 0, swing_values[second_pos], np.nan)
+    return count, last_pos, second_pos, last_price, second_price
+
+
+@cached_indicator
+def build_market_structure_timeline(df_with_swings: pd.DataFrame) -> MarketStructureTimeline | None:
+    """
+    Builds the per-bar structure timeline in one vectorized pass over 'swing_high'/'swing_low'.
+    Returns None if the index is not strictly increasing (callers then fall back to
+    get_market_structure_and_recent_swings). The result is shared through the indicator cache
+    and must not be modified.
+    """
+    if 'swing_high' not in df_with_swings.columns or 'swing_low' not in df_with_swings.columns:
+        return None
+    index = df_with_swings.index
+    if not (index.is_monotonic_increasing and index.is_unique):
+        return None
+
+    sh_count, last_sh_pos, second_sh_pos, last_sh, second_sh = \
+        _last_two_swings(df_with_swings['swing_high'].to_numpy(dtype=np.float64))
+    sl_count, last_sl_pos, second_sl_pos, last_sl, second_sl = \
+        _last_two_swings(df_with_swings['swing_low'].to_numpy(dtype=np.float64))
+
+    enough_swings = (sh_count >= 2) & (sl_count >= 2)
+    higher_highs_and_lows = (last_sh > second_sh) & (last_sl > second_sl)
+    lower_highs_and_lows = ~higher_highs_and_lows & (last_sh < second_sh) & (last_sl < second_sl)
+    # Row order equals time order, so the time sequencing checks can use positions
+    uptrend = higher_highs_and_lows & (last_sh_pos > last_sl_pos) & (last_sl_pos > second_sh_pos)
+    downtrend = lower_highs_and_lows & (last_sl_pos > last_sh_pos) & (last_sh_pos > second_sl_pos)
+
+    structure = np.full(len(index), STRUCTURE_RANGING, dtype=np.int8)
+    structure[uptrend] = STRUCTURE_UPTREND
+    structure[downtrend] = STRUCTURE_DOWNTREND
+    structure[~enough_swings] = STRUCTURE_UNDETERMINED
+
+    return MarketStructureTimeline(
+        index=index, structure=structure,
+        swing_high_count=sh_count, swing_low_count=sl_count,
+        last_sh_price=last_sh, last_sh_pos=last_sh_pos,
+        second_last_sh_price=second_sh, second_last_sh_pos=second_sh_pos,
+        last_sl_price=last_sl, last_sl_pos=last_sl_pos,
+        second_last_sl_price=second_sl, second_last_sl_pos=second_sl_pos,
+    )
+
+
+def _structure_for_previous_bar(df: pd.DataFrame, current_index: int, structure_timeline: MarketStructureTimeline | None):
+    """Structure from swings confirmed up to the bar before `current_index`, via the timeline when it fits."""
+    if structure_timeline is not None and 0 < current_index < len(df) and structure_timeline.matches(df):
+        return structure_timeline.structure_at(current_index - 1)
+    return get_market_structure_and_recent_swings(df, df.index[current_index - 1])
+
+
+def detect_choch(df_ohlc_with_swings: pd.DataFrame, current_candle_index: int, break_type: str = "close",
+                 structure_timeline: MarketStructureTimeline | None = None):
+    """
+    Checks whether the candle at `current_candle_index` breaks the last structural swing.
+    Pass the frame's MarketStructureTimeline to avoid rescanning the swings on every call.
+    """
+    current_time = df_ohlc_with_swings.index[current_candle_index]
+    current_candle = {col: df_ohlc_with_swings[col].iat[current_candle_index] for col in ('close', 'high', 'low')}
     
     # The structure (HL or LH to be broken) must be established *before* the current candle's time.
     # So, we evaluate structure based on swings confirmed up to the *previous* candle's time.
     time_for_structure_eval = df_ohlc_with_swings.index[current_candle_index - 1] if current_candle_index > 0 else df_ohlc_with_swings.index[0]
 
-    if DEBUG_STRATEGY_LOGIC: print(f"\nDEBUG: detect_choch for current candle at {current_time} (index {current_candle_index}). Evaluating structure up to {time_for_structure_eval}.")
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug: logger.debug("detect_choch for current candle at %s (index %d). Evaluating structure up to %s.", current_time, current_candle_index, time_for_structure_eval)
 
     if current_candle_index < 1: return None, None, None # Should be handled by backtester loop start
     
     # Get structure based on swings confirmed up to the *previous* candle's time.
     structure, struct_sh_price, struct_sh_time, struct_sl_price, struct_sl_time = \
-        get_market_structure_and_recent_swings(df_ohlc_with_swings, time_for_structure_eval)
+        _structure_for_previous_bar(df_ohlc_with_swings, current_candle_index, structure_timeline)
 
-    if DEBUG_STRATEGY_LOGIC:
-        print(f"  CHoCH Check: Current Candle Time: {current_time}")
-        print(f"  Evaluated Structure (up to {time_for_structure_eval}): {structure}")
-        if struct_sh_time: print(f"  Relevant Structural SH for break check: {struct_sh_price:.5f} at {struct_sh_time}")
-        if struct_sl_time: print(f"  Relevant Structural SL for break check: {struct_sl_price:.5f} at {struct_sl_time}")
+    if debug:
+        logger.debug("  CHoCH Check: Current Candle Time: %s", current_time)
+        logger.debug("  Evaluated Structure (up to %s): %s", time_for_structure_eval, structure)
+        if struct_sh_time: logger.debug("  Relevant Structural SH for break check: %.5f at %s", struct_sh_price, struct_sh_time)
+        if struct_sl_time: logger.debug("  Relevant Structural SL for break check: %.5f at %s", struct_sl_price, struct_sl_time)
 
     # Bearish CHoCH: Was in uptrend, current candle breaks the last significant Higher Low (struct_sl_price)
     if structure == "uptrend" and struct_sl_price is not None: # struct_sl_time will be <= time_for_structure_eval
         point_to_break = struct_sl_price
-        if DEBUG_STRATEGY_LOGIC: print(f"    Potential Bearish CHoCH: Uptrend context. Watching HL at {point_to_break:.5f} (time {struct_sl_time}). Current close: {current_candle['close']:.5f}, low: {current_candle['low']:.5f}")
+        if debug: logger.debug("    Potential Bearish CHoCH: Uptrend context. Watching HL at %.5f (time %s). Current close: %.5f, low: %.5f", point_to_break, struct_sl_time, current_candle['close'], current_candle['low'])
         if break_type == "close":
             if current_candle['close'] < point_to_break:
-                if DEBUG_STRATEGY_LOGIC: print(f"      >>> BEARISH CHOCH by CLOSE confirmed!")
+                if debug: logger.debug("      >>> BEARISH CHOCH by CLOSE confirmed!")
                 return "bearish_choch", point_to_break, current_time
         elif break_type == "wick":
             if current_candle['low'] < point_to_break:
-                if DEBUG_STRATEGY_LOGIC: print(f"      >>> BEARISH CHOCH by WICK confirmed!")
+                if debug: logger.debug("      >>> BEARISH CHOCH by WICK confirmed!")
                 return "bearish_choch", point_to_break, current_time
 
     # Bullish CHoCH: Was in downtrend, current candle breaks the last significant Lower High (struct_sh_price)
     elif structure == "downtrend" and struct_sh_price is not None:
         point_to_break = struct_sh_price
-        if DEBUG_STRATEGY_LOGIC: print(f"    Potential Bullish CHoCH: Downtrend context. Watching LH at {point_to_break:.5f} (time {struct_sh_time}). Current close: {current_candle['close']:.5f}, high: {current_candle['high']:.5f}")
+        if debug: logger.debug("    Potential Bullish CHoCH: Downtrend context. Watching LH at %.5f (time %s). Current close: %.5f, high: %.5f", point_to_break, struct_sh_time, current_candle['close'], current_candle['high'])
         if break_type == "close":
             if current_candle['close'] > point_to_break:
-                if DEBUG_STRATEGY_LOGIC: print(f"      >>> BULLISH CHOCH by CLOSE confirmed!")
+                if debug: logger.debug("      >>> BULLISH CHOCH by CLOSE confirmed!")
                 return "bullish_choch", point_to_break, current_time
         elif break_type == "wick":
             if current_candle['high'] > point_to_break:
-                if DEBUG_STRATEGY_LOGIC: print(f"      >>> BULLISH CHOCH by WICK confirmed!")
+                if debug: logger.debug("      >>> BULLISH CHOCH by WICK confirmed!")
                 return "bullish_choch", point_to_break, current_time
                 
     return None, None, None
 
-# LTF function also needs to be adjusted similarly if it uses get_market_structure_and_recent_swings
 def detect_ltf_structure_change(df_ltf_ha_with_swings: pd.DataFrame, 
                                 current_ltf_candle_index: int, 
                                 required_direction: str, 
-                                break_type: str = "close"):
-    current_ltf_candle = df_ltf_ha_with_swings.iloc[current_ltf_candle_index]
-    current_ltf_time = current_ltf_candle.name
+                                break_type: str = "close",
+                                structure_timeline: MarketStructureTimeline | None = None):
+    current_ltf_time = df_ltf_ha_with_swings.index[current_ltf_candle_index]
+    current_ltf_candle = {col: df_ltf_ha_with_swings[col].iat[current_ltf_candle_index] for col in ('ha_close', 'ha_high', 'ha_low')}
     
+    # Determine the time up to which structure should be evaluated (previous candle's time)
     time_for_ltf_structure_eval = df_ltf_ha_with_swings.index[current_ltf_candle_index - 1] if current_ltf_candle_index > 0 else df_ltf_ha_with_swings.index[0]
 
-    if DEBUG_STRATEGY_LOGIC: print(f"  DEBUG: detect_ltf_structure_change for HA candle at {current_ltf_time} (index {current_ltf_candle_index}), required: {required_direction}. Evaluating structure up to {time_for_ltf_structure_eval}")
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug: logger.debug("  detect_ltf_structure_change for HA candle at %s (index %d), required: %s. Evaluating structure up to %s", current_ltf_time, current_ltf_candle_index, required_direction, time_for_ltf_structure_eval)
 
     if current_ltf_candle_index < 1: return None, None, None
 
     ltf_structure, last_ltf_sh_price, last_ltf_sh_time, last_ltf_sl_price, last_ltf_sl_time = \
-        get_market_structure_and_recent_swings(df_ltf_ha_with_swings, time_for_ltf_structure_eval) # Pass full df and eval time
+        _structure_for_previous_bar(df_ltf_ha_with_swings, current_ltf_candle_index, structure_timeline)
 
-    # ... (rest of LTF logic remains similar, checking against the returned structural points) ...
-    if DEBUG_STRATEGY_LOGIC:
-        print(f"    LTF Structure (up to {time_for_ltf_structure_eval}): {ltf_structure}")
-        if last_ltf_sh_time: print(f"    LTF Relevant Structural SH: {last_ltf_sh_price:.5f} at {last_ltf_sh_time}")
-        if last_ltf_sl_time: print(f"    LTF Relevant Structural SL: {last_ltf_sl_price:.5f} at {last_ltf_sl_time}")
+    if debug:
+        logger.debug("    LTF Structure (up to %s): %s", time_for_ltf_structure_eval, ltf_structure)
+        if last_ltf_sh_time: logger.debug("    LTF Relevant Structural SH: %.5f at %s", last_ltf_sh_price, last_ltf_sh_time)
+        if last_ltf_sl_time: logger.debug("    LTF Relevant Structural SL: %.5f at %s", last_ltf_sl_price, last_ltf_sl_time)
 
     if required_direction == "bullish":
-        # For bullish confirmation, we could be breaking a previous LH (CHoCH) or a previous SH (BOS)
-        # The `last_ltf_sh_price` from `get_market_structure_and_recent_swings` is the latest SH.
-        # If ltf_structure was 'downtrend', this `last_ltf_sh_price` is the LH to break for a CHoCH.
-        # If ltf_structure was 'uptrend', this `last_ltf_sh_price` is the SH to break for a BOS.
         point_to_break = last_ltf_sh_price 
-        if point_to_break is not None: # last_ltf_sh_time will be <= time_for_ltf_structure_eval
-            if DEBUG_STRATEGY_LOGIC: print(f"      LTF Bullish Check: Watching level {point_to_break:.5f}. Current HA_close: {current_ltf_candle['ha_close']:.5f}, HA_high: {current_ltf_candle['ha_high']:.5f}")
+        if point_to_break is not None: 
+            if debug: logger.debug("      LTF Bullish Check: Watching level %.5f. Current HA_close: %.5f, HA_high: %.5f", point_to_break, current_ltf_candle['ha_close'], current_ltf_candle['ha_high'])
             if break_type == "close" and current_ltf_candle['ha_close'] > point_to_break:
                 signal = "ltf_bullish_confirm_choch" if ltf_structure == "downtrend" or ltf_structure == "ranging" else "ltf_bullish_confirm_bos"
-                if DEBUG_STRATEGY_LOGIC: print(f"        >>> LTF BULLISH CONFIRM by CLOSE ({signal})!")
+                if debug: logger.debug("        >>> LTF BULLISH CONFIRM by CLOSE (%s)!", signal)
                 return signal, point_to_break, current_ltf_time
             elif break_type == "wick" and current_ltf_candle['ha_high'] > point_to_break:
                 signal = "ltf_bullish_confirm_choch" if ltf_structure == "downtrend" or ltf_structure == "ranging" else "ltf_bullish_confirm_bos"
-                if DEBUG_STRATEGY_LOGIC: print(f"        >>> LTF BULLISH CONFIRM by WICK ({signal})!")
+                if debug: logger.debug("        >>> LTF BULLISH CONFIRM by WICK (%s)!", signal)
                 return signal, point_to_break, current_ltf_time
 
     elif required_direction == "bearish":
         point_to_break = last_ltf_sl_price
         if point_to_break is not None:
-            if DEBUG_STRATEGY_LOGIC: print(f"      LTF Bearish Check: Watching level {point_to_break:.5f}. Current HA_close: {current_ltf_candle['ha_close']:.5f}, HA_low: {current_ltf_candle['ha_low']:.5f}")
+            if debug: logger.debug("      LTF Bearish Check: Watching level %.5f. Current HA_close: %.5f, HA_low: %.5f", point_to_break, current_ltf_candle['ha_close'], current_ltf_candle['ha_low'])
             if break_type == "close" and current_ltf_candle['ha_close'] < point_to_break:
                 signal = "ltf_bearish_confirm_choch" if ltf_structure == "uptrend" or ltf_structure == "ranging" else "ltf_bearish_confirm_bos"
-                if DEBUG_STRATEGY_LOGIC: print(f"        >>> LTF BEARISH CONFIRM by CLOSE ({signal})!")
+                if debug: logger.debug("        >>> LTF BEARISH CONFIRM by CLOSE (%s)!", signal)
                 return signal, point_to_break, current_ltf_time
             elif break_type == "wick" and current_ltf_candle['ha_low'] < point_to_break:
                 signal = "ltf_bearish_confirm_choch" if ltf_structure == "uptrend" or ltf_structure == "ranging" else "ltf_bearish_confirm_bos"
-                if DEBUG_STRATEGY_LOGIC: print(f"        >>> LTF BEARISH CONFIRM by WICK ({signal})!")
+                if debug: logger.debug("        >>> LTF BEARISH CONFIRM by WICK (%s)!", signal)
                 return signal, point_to_break, current_ltf_time
                 
     return None, None, None
 
 
-def detect_ltf_structure_change(df_ltf_ha_with_swings: pd.DataFrame, 
-                                current_ltf_candle_index: int, 
-                                required_direction: str, 
-                                break_type: str = "close"):
-    current_ltf_candle = df_ltf_ha_with_swings.iloc[current_ltf_candle_index]
-    current_ltf_time = current_ltf_candle.name
-    
-    # Determine the time up to which structure should be evaluated (previous candle's time)
-    time_for_ltf_structure_eval = df_ltf_ha_with_swings.index[current_ltf_candle_index - 1] if current_ltf_candle_index > 0 else df_ltf_ha_with_swings.index[0]
+# Row layout returned by detect_choch_events
+CHOCH_EVENT_DTYPE = np.dtype([
+    ('index', np.int64),          # Row number of the breaking candle
+    ('time', 'datetime64[ns]'),   # Its timestamp (UTC, tz-naive)
+    ('direction', np.int8),       # +1 bullish CHoCH, -1 bearish CHoCH
+    ('level', np.float64),        # Structural level that was broken
+])
 
-    if DEBUG_STRATEGY_LOGIC: print(f"  DEBUG: detect_ltf_structure_change for HA candle at {current_ltf_time} (index {current_ltf_candle_index}), required: {required_direction}. Evaluating structure up to {time_for_ltf_structure_eval}")
+@cached_indicator(derived_args=("structure_timeline",))
+def detect_choch_events(df_ohlc_with_swings: pd.DataFrame, break_type: str = "close",
+                        structure_timeline: MarketStructureTimeline | None = None) -> np.ndarray:
+    """
+    Vectorized detect_choch() over the whole frame. Returns a CHOCH_EVENT_DTYPE array with one
+    row for every candle index where detect_choch(df, index, break_type) would report a CHoCH,
+    in time order. structure_timeline (built from the same frame) only saves rebuilding it.
+    """
+    if structure_timeline is None or not structure_timeline.matches(df_ohlc_with_swings):
+        structure_timeline = build_market_structure_timeline(df_ohlc_with_swings)
+    n = len(df_ohlc_with_swings)
+    if structure_timeline is None or n < 2 or break_type not in ("close", "wick"):
+        return np.zeros(0, dtype=CHOCH_EVENT_DTYPE)
+
+    # Structure is taken from the previous candle; the current candle must break it
+    prev_structure = structure_timeline.structure[:-1]
+    hl_to_break = structure_timeline.last_sl_price[:-1]
+    lh_to_break = structure_timeline.last_sh_price[:-1]
+    if break_type == "close":
+        bearish_probe = df_ohlc_with_swings['close'].to_numpy(dtype=np.float64)[1:]
+        bullish_probe = bearish_probe
+    else:
+        bearish_probe = df_ohlc_with_swings['low'].to_numpy(dtype=np.float64)[1:]
+        bullish_probe = df_ohlc_with_swings['high'].to_numpy(dtype=np.float64)[1:]
 
-    if current_ltf_candle_index < 1: return None, None, None
+    bearish = (prev_structure == STRUCTURE_UPTREND) & (bearish_probe < hl_to_break)
+    bullish = (prev_structure == STRUCTURE_DOWNTREND) & (bullish_probe > lh_to_break)
 
-    # Call get_market_structure_and_recent_swings with the current_eval_time argument
-    ltf_structure, last_ltf_sh_price, last_ltf_sh_time, last_ltf_sl_price, last_ltf_sl_time = \
-        get_market_structure_and_recent_swings(df_ltf_ha_with_swings, time_for_ltf_structure_eval) # <<< CORRECTED CALL
-
-    if DEBUG_STRATEGY_LOGIC:
-        print(f"    LTF Structure (up to {time_for_ltf_structure_eval}): {ltf_structure}")
-        if last_ltf_sh_time: print(f"    LTF Relevant Structural SH: {last_ltf_sh_price:.5f} at {last_ltf_sh_time}")
-        if last_ltf_sl_time: print(f"    LTF Relevant Structural SL: {last_ltf_sl_price:.5f} at {last_ltf_sl_time}")
-
-    if required_direction == "bullish":
-        point_to_break = last_ltf_sh_price 
-        if point_to_break is not None: 
-            if DEBUG_STRATEGY_LOGIC: print(f"      LTF Bullish Check: Watching level {point_to_break:.5f}. Current HA_close: {current_ltf_candle['ha_close']:.5f}, HA_high: {current_ltf_candle['ha_high']:.5f}")
-            if break_type == "close" and current_ltf_candle['ha_close'] > point_to_break:
-                signal = "ltf_bullish_confirm_choch" if ltf_structure == "downtrend" or ltf_structure == "ranging" else "ltf_bullish_confirm_bos"
-                if DEBUG_STRATEGY_LOGIC: print(f"        >>> LTF BULLISH CONFIRM by CLOSE ({signal})!")
-                return signal, point_to_break, current_ltf_time
-            elif break_type == "wick" and current_ltf_candle['ha_high'] > point_to_break:
-                signal = "ltf_bullish_confirm_choch" if ltf_structure == "downtrend" or ltf_structure == "ranging" else "ltf_bullish_confirm_bos"
-                if DEBUG_STRATEGY_LOGIC: print(f"        >>> LTF BULLISH CONFIRM by WICK ({signal})!")
-                return signal, point_to_break, current_ltf_time
-
-    elif required_direction == "bearish":
-        point_to_break = last_ltf_sl_price
-        if point_to_break is not None:
-            if DEBUG_STRATEGY_LOGIC: print(f"      LTF Bearish Check: Watching level {point_to_break:.5f}. Current HA_close: {current_ltf_candle['ha_close']:.5f}, HA_low: {current_ltf_candle['ha_low']:.5f}")
-            if break_type == "close" and current_ltf_candle['ha_close'] < point_to_break:
-                signal = "ltf_bearish_confirm_choch" if ltf_structure == "uptrend" or ltf_structure == "ranging" else "ltf_bearish_confirm_bos"
-                if DEBUG_STRATEGY_LOGIC: print(f"        >>> LTF BEARISH CONFIRM by CLOSE ({signal})!")
-                return signal, point_to_break, current_ltf_time
-            elif break_type == "wick" and current_ltf_candle['ha_low'] < point_to_break:
-                signal = "ltf_bearish_confirm_choch" if ltf_structure == "uptrend" or ltf_structure == "ranging" else "ltf_bearish_confirm_bos"
-                if DEBUG_STRATEGY_LOGIC: print(f"        >>> LTF BEARISH CONFIRM by WICK ({signal})!")
-                return signal, point_to_break, current_ltf_time
-                
-    return None, None, None
+    event_rows = np.flatnonzero(bearish | bullish)
+    events = np.zeros(len(event_rows), dtype=CHOCH_EVENT_DTYPE)
+    events['index'] = event_rows + 1
+    index = df_ohlc_with_swings.index
+    if isinstance(index, pd.DatetimeIndex) and index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    events['time'] = np.asarray(index, dtype='datetime64[ns]')[event_rows + 1]
+    events['direction'] = np.where(bullish[event_rows], 1, -1)
+    events['level'] = np.where(bullish[event_rows], lh_to_break[event_rows], hl_to_break[event_rows])
+    return events
 
 
 # --- Example Usage / Test Section ---
 if __name__ == '__main__':
+    from logging_setup import configure_logging
+    configure_logging("DEBUG")
     print("Testing strategy_logic.py...")
     # We need sample data with swings to test this properly.
     # Let's use the data fetching from previous steps.
     from data_handler import fetch_historical_data, shutdown_mt5_connection
-    from utils import identify_swing_points
+    from utils import identify_swing_points_zigzag
     from heikin_ashi import calculate_heikin_ashi
     import config # To get timeframe constants and other params
 
@@ -230,13 +352,28 @@ if __name__ == '__main__':
     htf_data = fetch_historical_data(symbol_to_test, config.HTF_MT5, start_date_test, end_date_test)
     
     if htf_data is not None and not htf_data.empty:
-        htf_data_with_swings = identify_swing_points(
-            htf_data, 
-            config.N_BARS_LEFT_RIGHT_FOR_SWING_HTF, 
-            config.N_BARS_LEFT_RIGHT_FOR_SWING_HTF
-        )
+        htf_data_with_swings = identify_swing_points_zigzag(htf_data, config.ZIGZAG_LEN_HTF)
         print(f"HTF data with swings (shape): {htf_data_with_swings.shape}")
 
+        # The precomputed timeline must agree with the per-call scan at every bar
+        htf_timeline = build_market_structure_timeline(htf_data_with_swings)
+        logger.setLevel(logging.INFO) # Silence the per-bar debug output for the bulk comparison
+        timeline_mismatches = sum(
+            1 for k in range(len(htf_data_with_swings))
+            if htf_timeline.structure_at(k) != get_market_structure_and_recent_swings(htf_data_with_swings, htf_data_with_swings.index[k])
+        )
+        logger.setLevel(logging.NOTSET)
+        print(f"Structure timeline vs per-bar scan: {timeline_mismatches} mismatches over {len(htf_data_with_swings)} bars")
+
+        for test_break_type in ("close", "wick"):
+            choch_events = detect_choch_events(htf_data_with_swings, test_break_type, htf_timeline)
+            logger.setLevel(logging.INFO)
+            per_bar_choch_rows = [k for k in range(1, len(htf_data_with_swings))
+                                  if detect_choch(htf_data_with_swings, k, test_break_type, htf_timeline)[0]]
+            logger.setLevel(logging.NOTSET)
+            print(f"CHoCH events ({test_break_type}): {len(choch_events)} batch, {len(per_bar_choch_rows)} per-bar, "
+                  f"same rows: {list(choch_events['index']) == per_bar_choch_rows}")
+
         # Test get_market_structure_and_recent_swings
         # Test on a few points in the data
         if len(htf_data_with_swings) > config.N_BARS_LEFT_RIGHT_FOR_SWING_HTF * 2 + 10: # Ensure enough data
@@ -247,7 +384,7 @@ if __name__ == '__main__':
             for idx_loc in test_indices:
                 print(f"\n--- Testing structure at HTF index (iloc): {idx_loc} (Time: {htf_data_with_swings.index[idx_loc]}) ---")
                 structure, sh_p, sh_t, sl_p, sl_t = get_market_structure_and_recent_swings(
-                    htf_data_with_swings.iloc[:idx_loc+1] # Pass data up to that point
+                    htf_data_with_swings, htf_data_with_swings.index[idx_loc] # Swings up to that point
                 )
                 print(f"Market Structure: {structure}")
                 print(f"Last SH: {sh_p} at {sh_t}, Last SL: {sl_p} at {sl_t}")
@@ -270,10 +407,8 @@ if __name__ == '__main__':
         ltf_data = fetch_historical_data(symbol_to_test, config.LTF_MT5, start_date_test, end_date_test)
         if ltf_data is not None and not ltf_data.empty:
             ltf_ha_data = calculate_heikin_ashi(ltf_data)
-            ltf_ha_with_swings = identify_swing_points(
-                ltf_ha_data,
-                config.N_BARS_LEFT_RIGHT_FOR_SWING_LTF,
-                config.N_BARS_LEFT_RIGHT_FOR_SWING_LTF,
+            ltf_ha_with_swings = identify_swing_points_zigzag(
+                ltf_ha_data, config.ZIGZAG_LEN_LTF,
                 col_high='ha_high', col_low='ha_low'
             )
             print(f"LTF HA data with swings (shape): {ltf_ha_with_swings.shape}")
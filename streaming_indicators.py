@@ -0,0 +1,399 @@
+# forex_backtester_cli/streaming_indicators.py
+
+from collections import deque
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from indicators import _linreg_endpoint_weights, _window_correlation_with_time
+
+# Incremental counterparts of the batch indicators for the live engine, which feeds them through
+# live_feed.LiveSymbolFeed and the strategies' create_streaming_indicators. Each object keeps its
+# own state and is fed one closed bar at a time through update(); the value returned for bar i
+# is bit-for-bit what the batch function returns at row i of the full series (see the check at
+# the bottom of this file). Per-bar cost is O(1) for the recursive indicators and O(length) for
+# the window-based ones. ZigZagTracker does the same for identify_swing_points_zigzag and
+# reports each confirmed pivot as an event.
+#
+# Known differences, both from the batch side looking at the whole series:
+# - calculate_adaptive_macd returns all NaN for series of 2 bars or fewer.
+# - calculate_zlsma back-fills the first regression values when the first full window has a NaN.
+
+def _is_nan(value: float) -> bool:
+    return value != value
+
+def _fmax(a: float, b: float) -> float:
+    """np.fmax for scalars: the non-NaN operand wins."""
+    if _is_nan(a): return b
+    if _is_nan(b): return a
+    return a if a >= b else b
+
+def _fmin(a: float, b: float) -> float:
+    if _is_nan(a): return b
+    if _is_nan(b): return a
+    return a if a <= b else b
+
+
+class StreamingEWM:
+    """
+    Series.ewm(com=..., adjust=False, min_periods=...).mean() one value at a time, following
+    pandas' update rule (including its normalisation step) so results match exactly.
+    Use from_alpha()/from_span() for the other parameterisations.
+    """
+    def __init__(self, com: float, min_periods: int = 0):
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - self.alpha
+        self.min_periods = max(int(min_periods), 1)
+        self.weighted = np.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+        self.count = 0
+        self.value = np.nan
+
+    @classmethod
+    def from_alpha(cls, alpha: float, min_periods: int = 0) -> "StreamingEWM":
+        return cls((1.0 - alpha) / alpha, min_periods)
+
+    @classmethod
+    def from_span(cls, span: float, min_periods: int = 0) -> "StreamingEWM":
+        return cls((span - 1) / 2.0, min_periods)
+
+    def update(self, value: float) -> float:
+        value = float(value)
+        is_observation = not _is_nan(value)
+        self.nobs += is_observation
+        if self.count == 0:
+            self.weighted = value
+        elif not _is_nan(self.weighted):
+            self.old_wt *= self.old_wt_factor # ignore_na=False: missing values still decay the weight
+            if is_observation:
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + self.alpha * value) / (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        elif is_observation:
+            self.weighted = value
+        self.count += 1
+        self.value = self.weighted if self.nobs >= self.min_periods else np.nan
+        return self.value
+
+
+class StreamingSMMA:
+    """calculate_smma (Wilder's smoothing) one value at a time."""
+    def __init__(self, length: int):
+        self.length = length
+        self.window = deque(maxlen=max(length, 1))
+        self.count = 0
+        self.value = np.nan
+
+    def update(self, value: float) -> float:
+        value = float(value)
+        self.window.append(value)
+        self.count += 1
+        length = self.length
+        if length <= 0 or self.count < length:
+            self.value = np.nan
+        elif self.count == length:
+            # Seeded like the batch version: pandas mean (NaN-skipping) of the first window
+            self.value = float(pd.Series(list(self.window), dtype=np.float64).mean())
+        elif _is_nan(self.value):
+            # Restart from the plain average once a NaN has left the window
+            window_sum = 0.0
+            for x in self.window:
+                if _is_nan(x):
+                    window_sum = np.nan
+                    break
+                window_sum += x
+            self.value = window_sum / length
+        else:
+            self.value = (self.value * (length - 1) + value) / length
+        return self.value
+
+
+class StreamingATR:
+    """calculate_atr: true range smoothed with ewm(alpha=1/length, adjust=False, min_periods=length)."""
+    def __init__(self, length: int):
+        self.ewm = StreamingEWM.from_alpha(1 / length, min_periods=length)
+        self.prev_close = np.nan
+        self.value = np.nan
+
+    def update(self, high: float, low: float, close: float) -> float:
+        high, low = float(high), float(low)
+        true_range = _fmax(_fmax(high - low, abs(high - self.prev_close)), abs(low - self.prev_close))
+        self.prev_close = float(close)
+        self.value = self.ewm.update(true_range)
+        return self.value
+
+
+class StreamingLinReg:
+    """calculate_linreg_value: endpoint of the least-squares line over the last `length` values."""
+    def __init__(self, length: int):
+        self.length = length
+        self.window = deque(maxlen=max(length, 1))
+        self.weights = _linreg_endpoint_weights(length).tolist() if length >= 2 else []
+        self.value = np.nan
+
+    def update(self, value: float) -> float:
+        self.window.append(float(value))
+        if self.length < 2 or len(self.window) < self.length:
+            self.value = np.nan
+            return self.value
+        # Same sequential multiply-add order as the batch sliding-window product
+        total = 0.0
+        for x, w in zip(self.window, self.weights):
+            total += x * w
+        self.value = total
+        return self.value
+
+
+class StreamingZLSMA:
+    """calculate_zlsma: linreg of the close plus its distance to the linreg of that linreg."""
+    def __init__(self, length: int):
+        self.lsma = StreamingLinReg(length)
+        self.lsma2 = StreamingLinReg(length)
+        self.value = np.nan
+
+    def update(self, value: float) -> float:
+        lsma = self.lsma.update(value)
+        lsma2 = self.lsma2.update(lsma)
+        self.value = lsma + (lsma - lsma2)
+        return self.value
+
+
+class StreamingAdaptiveMACD:
+    """calculate_adaptive_macd one close at a time; update() returns (macd, signal, histogram)."""
+    def __init__(self, r2_period: int, fast_len: int, slow_len: int, signal_len: int):
+        self.r2_period = r2_period
+        self.closes = deque(maxlen=max(r2_period, 1))
+        self.a1 = 2 / (fast_len + 1)
+        self.a2 = 2 / (slow_len + 1)
+        self.term1_k = (1 - self.a1) * (1 - self.a2)
+        self.term2_k = (1 - self.a1) / (1 - self.a2) if (1 - self.a2) != 0 else 1e9
+        self.signal = StreamingEWM.from_span(signal_len, min_periods=signal_len)
+        self.prev_close = np.nan
+        self.macd_1 = np.nan # macd[i-1]
+        self.macd_2 = np.nan # macd[i-2]
+        self.count = 0
+        self.value = (np.nan, np.nan, np.nan)
+
+    def _r_squared(self) -> float:
+        if self.r2_period < 2 or len(self.closes) < self.r2_period:
+            return np.nan
+        window = np.array(self.closes, dtype=np.float64)
+        if np.isnan(window).any():
+            return np.nan
+        r_value = float(_window_correlation_with_time(window[np.newaxis, :])[0])
+        return r_value * r_value
+
+    def update(self, close: float) -> tuple[float, float, float]:
+        close = float(close)
+        self.closes.append(close)
+        close_diff = 0.0 if self.count == 0 else close - self.prev_close
+        if _is_nan(close_diff):
+            close_diff = 0.0
+        self.prev_close = close
+
+        r2_factor = 0.5 * self._r_squared() + 0.5
+        if _is_nan(r2_factor):
+            r2_factor = 0.5
+        k = r2_factor * self.term1_k + (1 - r2_factor) * self.term2_k
+        drive = close_diff * (self.a1 - self.a2)
+
+        c1 = -self.a2 - self.a1 + 2
+        if self.count == 0:
+            macd = 0.0
+        elif self.count == 1:
+            macd = drive + c1 * 0.0
+        else:
+            m1 = 0.0 if _is_nan(self.macd_1) else self.macd_1 # NaN state is fed back as 0
+            m2 = 0.0 if _is_nan(self.macd_2) else self.macd_2
+            macd = drive + c1 * m1 + -k * m2
+        self.macd_2, self.macd_1 = self.macd_1, macd
+        self.count += 1
+
+        signal = self.signal.update(macd)
+        self.value = (macd, signal, macd - signal)
+        return self.value
+
+
+class StreamingHeikinAshi:
+    """calculate_heikin_ashi one bar at a time; update() returns (ha_open, ha_high, ha_low, ha_close)."""
+    def __init__(self):
+        self.state = np.nan # 0.5 * previous (unrefined) ha_open, as carried by the batch filter
+        self.prev_ha_close = np.nan
+        self.count = 0
+        self.value = (np.nan, np.nan, np.nan, np.nan)
+
+    def update(self, open_: float, high: float, low: float, close: float) -> tuple[float, float, float, float]:
+        open_, high, low, close = float(open_), float(high), float(low), float(close)
+        ha_close = (open_ + high + low + close) / 4
+        if self.count == 0:
+            # The recursion is seeded with the regular open; the first bar itself shows (open+close)/2
+            self.state = 0.5 * open_
+            ha_open = (open_ + close) / 2
+        else:
+            recursive_open = 0.5 * self.prev_ha_close + self.state
+            self.state = 0.0 + 0.5 * recursive_open
+            ha_open = recursive_open
+        self.prev_ha_close = ha_close
+        self.count += 1
+
+        ha_high = _fmax(_fmax(ha_open, ha_close), high)
+        ha_low = _fmin(_fmin(ha_open, ha_close), low)
+        self.value = (ha_open, ha_high, ha_low, ha_close)
+        return self.value
+
+
+@dataclass(frozen=True)
+class ZigZagPivot:
+    """A swing point confirmed by the zigzag. Positions count bars fed to the tracker (0-based)."""
+    is_high: bool
+    price: float
+    position: int               # bar the swing sits on
+    time: object                # time passed with that bar (None if not given)
+    confirmed_position: int     # bar whose reversal confirmed it
+    confirmed_time: object
+    replaces: "ZigZagPivot | None" = None # same-type pivot it superseded (more extreme replacement)
+
+
+class _RollingExtreme:
+    """NaN-skipping rolling max (or min) over the last `length` values, amortised O(1) per value."""
+    def __init__(self, length: int, is_max: bool):
+        self.length = length
+        self.is_max = is_max
+        self.candidates = deque() # (position, value), values monotonic from the front
+
+    def update(self, position: int, value: float) -> float:
+        if not _is_nan(value):
+            while self.candidates and (self.candidates[-1][1] <= value if self.is_max else self.candidates[-1][1] >= value):
+                self.candidates.pop()
+            self.candidates.append((position, value))
+        while self.candidates and self.candidates[0][0] <= position - self.length:
+            self.candidates.popleft()
+        return self.candidates[0][1] if self.candidates else np.nan
+
+
+class ZigZagTracker:
+    """
+    identify_swing_points_zigzag one bar at a time. update() returns the pivot confirmed on that
+    bar (or None) and passes it to every subscribed callback. Feeding a whole frame and marking
+    every kept pivot gives exactly the batch swing_high/swing_low columns.
+    The last `history` kept pivots are held for last_pivots(); last_high/last_low are O(1).
+    """
+    def __init__(self, zigzag_len: int, history: int = 64):
+        if zigzag_len < 2:
+            raise ValueError("zigzag_len must be at least 2.")
+        self.highest = _RollingExtreme(zigzag_len, is_max=True)
+        self.lowest = _RollingExtreme(zigzag_len, is_max=False)
+        self.pivots = deque(maxlen=history)
+        self.last_high = None
+        self.last_low = None
+        self.subscribers = []
+        self.count = 0
+        self.trend = 0 # 1 = up leg, -1 = down leg, 0 = not started
+        # Extreme of the current leg (highest high in an up leg, lowest low in a down leg)
+        self.leg_price = np.nan
+        self.leg_position = -1
+        self.leg_time = None
+
+    def subscribe(self, callback):
+        """callback(pivot) is called for every kept pivot, in confirmation order."""
+        self.subscribers.append(callback)
+
+    def last_pivots(self, n: int) -> list:
+        """The n most recent kept pivots, oldest first."""
+        n = min(n, len(self.pivots))
+        return [self.pivots[k] for k in range(len(self.pivots) - n, len(self.pivots))]
+
+    def _start_leg(self, trend: int, position: int, price: float, time):
+        self.trend = trend
+        self.leg_price, self.leg_position, self.leg_time = price, position, time
+
+    def _extend_leg(self, position: int, price: float, time):
+        # First occurrence of the leg extreme wins; NaN bars are skipped (nanargmax/nanargmin)
+        if _is_nan(price): return
+        if _is_nan(self.leg_price) or (price > self.leg_price if self.trend == 1 else price < self.leg_price):
+            self.leg_price, self.leg_position, self.leg_time = price, position, time
+
+    def update(self, high: float, low: float, time=None) -> ZigZagPivot | None:
+        high, low = float(high), float(low)
+        position = self.count
+        self.count += 1
+        is_up = high == self.highest.update(position, high) # New highest high: trend may flip up
+        is_down = low == self.lowest.update(position, low)
+
+        if self.trend == 0:
+            if is_up: self._start_leg(1, position, high, time)
+            elif is_down: self._start_leg(-1, position, low, time)
+            return None
+
+        if (self.trend == 1 and not is_down) or (self.trend == -1 and not is_up):
+            self._extend_leg(position, high if self.trend == 1 else low, time)
+            return None
+
+        # Reversal: the extreme of the finished leg (this bar excluded) is confirmed
+        pivot = ZigZagPivot(self.trend == 1, self.leg_price, self.leg_position, self.leg_time, position, time)
+        if self.trend == 1: self._start_leg(-1, position, low, time)
+        else: self._start_leg(1, position, high, time)
+        return self._keep(pivot)
+
+    def _keep(self, pivot: ZigZagPivot) -> ZigZagPivot | None:
+        # Alternation: a pivot of the same type as the previous one only survives if it is more
+        # extreme, and then replaces it. (Legs alternate by construction, so this is a safeguard.)
+        previous = self.pivots[-1] if self.pivots else None
+        if previous is not None and previous.is_high == pivot.is_high:
+            if not (pivot.price > previous.price if pivot.is_high else pivot.price < previous.price):
+                return None
+            self.pivots.pop()
+            pivot = replace(pivot, replaces=previous)
+        self.pivots.append(pivot)
+        if pivot.is_high: self.last_high = pivot
+        else: self.last_low = pivot
+        for callback in self.subscribers:
+            callback(pivot)
+        return pivot
+
+
+if __name__ == '__main__':
+    # Bit-for-bit check against the batch functions on a random walk with a few gaps
+    from heikin_ashi import calculate_heikin_ashi
+    from indicators import calculate_smma, calculate_atr, calculate_zlsma, calculate_adaptive_macd
+    from utils import identify_swing_points_zigzag
+
+    rng = np.random.default_rng(7)
+    n = 3000
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0005, n))
+    open_ = np.concatenate(([close[0]], close[:-1])) + rng.normal(0, 0.0001, n)
+    high = np.maximum(open_, close) + rng.uniform(0, 0.0004, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.0004, n)
+    close[[1500, 1501, 2200]] = np.nan
+    index = pd.date_range("2024-01-01", periods=n, freq="5min", tz="UTC")
+    df = pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close}, index=index)
+
+    def check(name, streamed, batch):
+        ok = np.array_equal(np.asarray(streamed, dtype=np.float64), np.asarray(batch, dtype=np.float64), equal_nan=True)
+        print(f"{name:<24} {'OK' if ok else 'MISMATCH'}")
+
+    ha = StreamingHeikinAshi()
+    check("heikin_ashi", [ha.update(*bar) for bar in df[['open', 'high', 'low', 'close']].to_numpy()],
+          calculate_heikin_ashi(df).to_numpy())
+    for length in (5, 13):
+        smma = StreamingSMMA(length)
+        check(f"smma({length})", [smma.update(x) for x in close], calculate_smma(df['close'], length))
+    atr = StreamingATR(14)
+    check("atr(14)", [atr.update(h, l, c) for h, l, c in zip(high, low, close)],
+          calculate_atr(df['high'], df['low'], df['close'], 14))
+    zlsma = StreamingZLSMA(32)
+    check("zlsma(32)", [zlsma.update(x) for x in close], calculate_zlsma(df['close'], 32))
+    for macd_params in ((20, 10, 20, 9), (20, 10, 12, 9)):
+        macd = StreamingAdaptiveMACD(*macd_params)
+        check(f"adaptive_macd{macd_params}", [macd.update(x) for x in close],
+              np.column_stack(calculate_adaptive_macd(df['close'], *macd_params)))
+    for zigzag_len in (5, 9):
+        tracker = ZigZagTracker(zigzag_len, history=n)
+        swings = np.full((n, 2), np.nan)
+        for bar_high, bar_low in zip(high, low):
+            tracker.update(bar_high, bar_low)
+        for pivot in tracker.pivots:
+            swings[pivot.position, 0 if pivot.is_high else 1] = pivot.price
+        check(f"zigzag({zigzag_len})", swings, identify_swing_points_zigzag(df, zigzag_len)[['swing_high', 'swing_low']].to_numpy())
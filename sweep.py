@@ -0,0 +1,255 @@
+# forex_backtester_cli/sweep.py
+
+import argparse
+import csv
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+import config
+from backtester import get_pip_size, run_backtest
+from compact_frames import compact_symbol_data, expand_symbol_data
+from data_handler import initialize_data_source, shutdown_data_source
+from logging_setup import configure_logging
+from main import prepare_symbol_data
+from reporting import summarize_r_multiples
+from strategies import get_strategy_class
+
+logger = logging.getLogger(__name__)
+
+# Parameter sweeps over config.STRATEGY_SPECIFIC_PARAMS. A search space maps parameter names to
+# either a list of values or a (low, high) range (ints: inclusive, floats: continuous; ranges are
+# only for random/LHS sampling). Each sample overrides the strategy's config params.
+#
+# Bars, Heikin Ashi and swings do not depend on strategy parameters, so they are prepared once
+# per symbol in the parent and handed to every worker once (pool initializer), not per task.
+# With COMPACT_PRECISION they are kept at rest as CompactBars and expanded per backtest.
+# Within a process the indicator cache (indicator_cache.py) then serves what each sample's
+# prepare_data recomputes: the strategy's re-run swings, the HTF structure timeline and the CHoCH
+# events (parameter-independent apart from the break type) come from the first sample, and any
+# indicator whose own parameters did not change between samples is reused, e.g. the whole
+# adaptive MACD when only TP_RR_RATIO varies. No trade charts are drawn.
+#
+# Results are streamed to the CSV as samples finish and the file is rewritten ranked at the end:
+# expectancy (R) desc, profit factor desc, max drawdown (R) asc.
+
+SWEEP_RESULTS_DIR = "Sweep_Results"
+METRIC_COLUMNS = ["trades", "win_rate", "expectancy_R", "profit_factor", "net_R", "max_drawdown_R"]
+RANK_COLUMNS = ["expectancy_R", "profit_factor", "max_drawdown_R"]
+_RANK_ASCENDING = [False, False, True]
+
+def grid_samples(space: dict) -> list[dict]:
+    """Every combination of the value lists in `space`."""
+    names = list(space)
+    for name in names:
+        if isinstance(space[name], tuple):
+            raise ValueError(f"Grid search needs a value list for {name}, not a range.")
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+def _values_from_uniform(spec, u: np.ndarray) -> list:
+    """Maps draws in [0, 1) onto a value list (by position) or a (low, high) range."""
+    if isinstance(spec, tuple):
+        low, high = spec
+        if isinstance(low, int) and isinstance(high, int):
+            return [int(v) for v in np.floor(low + u * (high - low + 1))]
+        return [float(v) for v in low + u * (high - low)]
+    positions = np.minimum((u * len(spec)).astype(int), len(spec) - 1)
+    return [spec[p] for p in positions]
+
+def random_samples(space: dict, n_samples: int, seed: int | None = None) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    columns = {name: _values_from_uniform(spec, rng.random(n_samples)) for name, spec in space.items()}
+    return [{name: columns[name][k] for name in space} for k in range(n_samples)]
+
+def latin_hypercube_samples(space: dict, n_samples: int, seed: int | None = None) -> list[dict]:
+    """Each parameter's range is cut into n_samples equal strata and every stratum is drawn exactly once."""
+    rng = np.random.default_rng(seed)
+    columns = {name: _values_from_uniform(spec, (rng.permutation(n_samples) + rng.random(n_samples)) / n_samples)
+               for name, spec in space.items()}
+    return [{name: columns[name][k] for name in space} for k in range(n_samples)]
+
+def _no_trade_chart(trade: dict, session_results_path: str):
+    pass
+
+def evaluate_params(strategy_name: str, strategy_params: dict, symbol_data: dict) -> tuple[dict, list]:
+    """
+    Backtests one parameter set on every prepared symbol ({symbol: prepare_symbol_data(...)},
+    or its compact_symbol_data form). Returns (summarize_r_multiples of all trades ordered by
+    exit time, trades).
+    """
+    all_trades = []
+    for symbol, prepared in symbol_data.items():
+        htf_data_swings, ltf_ohlc_data, ltf_ha_data_swings = expand_symbol_data(prepared)
+        trades, _ = run_backtest(symbol, htf_data_swings, ltf_ohlc_data, ltf_ha_data_swings,
+                                 strategy_name, strategy_params, "", starting_trade_id=1,
+                                 plot_trade_fn=_no_trade_chart)
+        all_trades.extend(trades)
+    all_trades.sort(key=lambda t: (t['exit_time'] is None, t['exit_time'] or t['entry_time'], t['entry_time']))
+    return summarize_r_multiples([t['pnl_R'] for t in all_trades]), all_trades
+
+# --- Worker side ---
+_worker_symbol_data = {}
+
+def _init_sweep_worker(symbol_data: dict, config_overrides: dict, log_level: str):
+    global _worker_symbol_data
+    for name, value in config_overrides.items():
+        setattr(config, name, value)
+    configure_logging(log_level)
+    _worker_symbol_data = symbol_data
+
+def _evaluate_sample(sample_id: int, strategy_name: str, strategy_params: dict, symbol_data: dict | None = None) -> tuple[int, dict | None]:
+    try:
+        metrics, _ = evaluate_params(strategy_name, strategy_params, symbol_data if symbol_data is not None else _worker_symbol_data)
+    except Exception:
+        logger.exception("Sweep sample %s failed", sample_id)
+        return sample_id, None
+    return sample_id, metrics
+
+def rank_results(results: pd.DataFrame) -> pd.DataFrame:
+    ranked = results.sort_values(RANK_COLUMNS, ascending=_RANK_ASCENDING, na_position='last', kind='stable', ignore_index=True)
+    ranked.insert(0, 'rank', np.arange(1, len(ranked) + 1))
+    return ranked
+
+def run_sweep(strategy_name: str, samples: list[dict], symbols: list, start_date: str, end_date: str,
+              workers: int = 1, results_csv: str | None = None, log_level: str = "WARNING") -> pd.DataFrame | None:
+    """
+    Runs every sample (dict of parameter overrides) on all symbols and returns the ranked result
+    table (one row per sample: rank, sample, the overrides, METRIC_COLUMNS). None if no symbol has data.
+    """
+    get_strategy_class(strategy_name) # Raises for unknown strategies before any data is fetched
+    if config.REVERSE_TRADES:
+        logger.warning("REVERSE_TRADES is on: samples are scored on reversed trades (SL and TP swapped).")
+    base_params = config.STRATEGY_SPECIFIC_PARAMS.get(strategy_name, {})
+    param_names = list(dict.fromkeys(name for sample in samples for name in sample))
+    unknown = [name for name in param_names if name not in base_params]
+    if unknown:
+        logger.warning("Sweep parameters not in config.STRATEGY_SPECIFIC_PARAMS['%s']: %s", strategy_name, ", ".join(unknown))
+
+    unique_samples = list({tuple(sorted(sample.items())): sample for sample in samples}.values())
+    if len(unique_samples) < len(samples):
+        logger.info("Dropped %d duplicate samples.", len(samples) - len(unique_samples))
+
+    symbol_data = {}
+    for symbol in symbols:
+        prepared = prepare_symbol_data(symbol, start_date, end_date)
+        if prepared is None:
+            logger.warning("No bars for %s; left out of the sweep.", symbol)
+            continue
+        symbol_data[symbol] = compact_symbol_data(prepared, config.COMPACT_TOLERANCE_PIPS * get_pip_size(symbol)) \
+            if config.COMPACT_PRECISION else prepared
+    if not symbol_data:
+        return None
+
+    rows = []
+    csv_file = None
+    writer = None
+    if results_csv:
+        os.makedirs(os.path.dirname(results_csv) or ".", exist_ok=True)
+        csv_file = open(results_csv, "w", newline="")
+        writer = csv.DictWriter(csv_file, fieldnames=["sample"] + param_names + METRIC_COLUMNS)
+        writer.writeheader()
+
+    def collect(sample_id: int, metrics: dict | None):
+        row = {"sample": sample_id, **unique_samples[sample_id], **(metrics or dict.fromkeys(METRIC_COLUMNS))}
+        rows.append(row)
+        if writer is not None:
+            writer.writerow(row)
+            csv_file.flush()
+        logger.info("Sample %d/%d done: %s", len(rows), len(unique_samples), metrics)
+
+    try:
+        if workers > 1:
+            config_overrides = {"DATA_SOURCE": config.DATA_SOURCE, "DATA_SOURCE_DIR": config.DATA_SOURCE_DIR}
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                                     initargs=(symbol_data, config_overrides, log_level)) as pool:
+                futures = [pool.submit(_evaluate_sample, sample_id, strategy_name, {**base_params, **sample})
+                           for sample_id, sample in enumerate(unique_samples)]
+                for future in as_completed(futures):
+                    collect(*future.result())
+        else:
+            for sample_id, sample in enumerate(unique_samples):
+                collect(*_evaluate_sample(sample_id, strategy_name, {**base_params, **sample}, symbol_data))
+    finally:
+        if csv_file is not None:
+            csv_file.close()
+
+    failed = sum(row["trades"] is None for row in rows)
+    if rows and failed == len(rows):
+        raise RuntimeError(f"All {failed} sweep samples failed; see the logged tracebacks.")
+    if failed:
+        logger.warning("%d of %d sweep samples failed and are ranked last.", failed, len(rows))
+
+    ranked = rank_results(pd.DataFrame(rows, columns=["sample"] + param_names + METRIC_COLUMNS))
+    if results_csv:
+        ranked.to_csv(results_csv, index=False)
+    return ranked
+
+def _parse_value(text: str):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    if text in ("True", "False"):
+        return text == "True"
+    return text
+
+def parse_param_spec(spec: str) -> tuple[str, list | tuple]:
+    """'NAME=v1,v2,v3' -> value list, 'NAME=low:high' -> (low, high) range."""
+    name, sep, values = spec.partition("=")
+    if not sep or not values:
+        raise argparse.ArgumentTypeError(f"Expected NAME=v1,v2,... or NAME=low:high, got '{spec}'")
+    if ":" in values:
+        low, high = (_parse_value(v) for v in values.split(":", 1))
+        return name, (low, high)
+    return name, [_parse_value(v) for v in values.split(",")]
+
+
+if __name__ == "__main__":
+    # e.g. python sweep.py --strategy HAAdaptiveMACD --param ADAPTIVE_MACD_FAST=8,10,12 --param TP_RR_RATIO=1.5,2.0,2.5 --workers 4
+    #      python sweep.py --sampler lhs --samples 50 --param ADAPTIVE_MACD_R2_PERIOD=10:40 --param TP_RR_RATIO=1.0:3.0
+    parser = argparse.ArgumentParser(description="Parameter sweep over a strategy's config params")
+    parser.add_argument("--strategy", type=str, default=config.ACTIVE_STRATEGY_NAME)
+    parser.add_argument("--param", type=parse_param_spec, action="append", required=True, help="NAME=v1,v2,... or NAME=low:high (random/lhs only)")
+    parser.add_argument("--sampler", type=str, default="grid", choices=["grid", "random", "lhs"])
+    parser.add_argument("--samples", type=int, default=20, help="Sample count for random/lhs")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--symbols", nargs='+', default=config.SYMBOLS)
+    parser.add_argument("--start", type=str, default=config.START_DATE_STR)
+    parser.add_argument("--end", type=str, default=config.END_DATE_STR)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--data-source", type=str, default=config.DATA_SOURCE, choices=["mt5", "file", "archive"])
+    parser.add_argument("--data-dir", type=str, default=config.DATA_SOURCE_DIR)
+    parser.add_argument("--out", type=str, default=None, help="Result CSV (default Sweep_Results/{strategy}_{timestamp}.csv)")
+    parser.add_argument("--top", type=int, default=10, help="Rows of the ranked table to print")
+    parser.add_argument("--log-level", type=str, default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args()
+
+    config.DATA_SOURCE = args.data_source
+    config.DATA_SOURCE_DIR = args.data_dir
+    configure_logging(args.log_level)
+
+    space = dict(args.param)
+    if args.sampler == "grid": samples = grid_samples(space)
+    elif args.sampler == "random": samples = random_samples(space, args.samples, args.seed)
+    else: samples = latin_hypercube_samples(space, args.samples, args.seed)
+
+    results_csv = args.out or os.path.join(SWEEP_RESULTS_DIR, f"{args.strategy}_{dt.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    if not initialize_data_source(): raise SystemExit("Could not initialize the data source.")
+    try:
+        print(f"Sweeping {len(samples)} parameter sets of {args.strategy} over {', '.join(args.symbols)} ({args.workers} worker(s)).")
+        ranked = run_sweep(args.strategy, samples, args.symbols, args.start, args.end,
+                           workers=args.workers, results_csv=results_csv, log_level=args.log_level)
+        if ranked is None:
+            print("No data for any symbol.")
+        else:
+            with pd.option_context("display.width", 200, "display.max_columns", None):
+                print(ranked.head(args.top).to_string(index=False))
+            print(f"Sweep results saved to: {results_csv}")
+    finally:
+        shutdown_data_source()
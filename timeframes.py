@@ -0,0 +1,35 @@
+# forex_backtester_cli/timeframes.py
+
+from enum import IntEnum
+
+class Timeframe(IntEnum):
+    """
+    Bar timeframes with the same integer values as the MetaTrader5 TIMEFRAME_* constants,
+    so members can be passed straight to the MT5 API but are usable without the package.
+    """
+    M1 = 1
+    M5 = 5
+    M15 = 15
+    M30 = 30
+    H1 = 16385
+    H4 = 16388
+    D1 = 16408
+    W1 = 32769
+    MN1 = 49153
+
+    @property
+    def minutes(self) -> int:
+        return _TIMEFRAME_MINUTES[self]
+
+    @classmethod
+    def from_string(cls, label: str) -> "Timeframe":
+        try:
+            return cls[label.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown timeframe string: {label}") from None
+
+_TIMEFRAME_MINUTES = {
+    Timeframe.M1: 1, Timeframe.M5: 5, Timeframe.M15: 15, Timeframe.M30: 30,
+    Timeframe.H1: 60, Timeframe.H4: 240, Timeframe.D1: 1440,
+    Timeframe.W1: 10080, Timeframe.MN1: 43200, # MN1 is nominal (30 days)
+}
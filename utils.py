@@ -1,7 +1,9 @@
 # forex_backtester_cli/utils.py
 import pandas as pd
 import numpy as np
+from indicator_cache import cached_indicator
 
+@cached_indicator
 def identify_swing_points_simple(df: pd.DataFrame, n_left: int, n_right: int, 
                                  col_high: str = 'high', col_low: str = 'low') -> pd.DataFrame:
     """
@@ -16,42 +18,44 @@ def identify_swing_points_simple(df: pd.DataFrame, n_left: int, n_right: int,
     if col_high not in df_out.columns or col_low not in df_out.columns:
         raise ValueError(f"Columns '{col_high}' or '{col_low}' not found in DataFrame.")
 
-    for i in range(n_left, len(df_out) - n_right):
-        # Check for Swing High
-        is_swing_high = True
-        current_high = df_out.loc[df_out.index[i], col_high]
-        for j in range(1, n_left + 1):
-            if df_out.loc[df_out.index[i-j], col_high] >= current_high:
-                is_swing_high = False
-                break
-        if not is_swing_high:
-            continue
-        for j in range(1, n_right + 1):
-            if df_out.loc[df_out.index[i+j], col_high] > current_high: # Strictly higher on the right
-                is_swing_high = False
-                break
-        if is_swing_high:
-            df_out.loc[df_out.index[i], 'swing_high'] = current_high
+    highs = df_out[col_high].to_numpy(dtype=np.float64)
+    lows = df_out[col_low].to_numpy(dtype=np.float64)
+    n = len(df_out)
+    first, stop = n_left, n - n_right # Bars with a full left and right neighbourhood
+    if stop <= first:
+        return df_out
 
-        # Check for Swing Low
-        is_swing_low = True
-        current_low = df_out.loc[df_out.index[i], col_low]
-        for j in range(1, n_left + 1):
-            if df_out.loc[df_out.index[i-j], col_low] <= current_low:
-                is_swing_low = False
-                break
-        if not is_swing_low:
-            continue
-        for j in range(1, n_right + 1):
-            if df_out.loc[df_out.index[i+j], col_low] < current_low: # Strictly lower on the right
-                is_swing_low = False
-                break
-        if is_swing_low:
-            df_out.loc[df_out.index[i], 'swing_low'] = current_low
+    cur_high = highs[first:stop]
+    cur_low = lows[first:stop]
+    left_high_ok = np.ones(stop - first, dtype=bool)
+    right_high_ok = np.ones(stop - first, dtype=bool)
+    left_low_ok = np.ones(stop - first, dtype=bool)
+    right_low_ok = np.ones(stop - first, dtype=bool)
+
+    # Compare every bar with its j-th neighbour on each side for the whole series at once.
+    # Written as ~(neighbour >= current) etc. so NaN comparisons behave like the scalar checks.
+    for j in range(1, n_left + 1):
+        left_high_ok &= ~(highs[first - j:stop - j] >= cur_high)
+        left_low_ok &= ~(lows[first - j:stop - j] <= cur_low)
+    for j in range(1, n_right + 1):
+        right_high_ok &= ~(highs[first + j:stop + j] > cur_high) # Strictly higher on the right
+        right_low_ok &= ~(lows[first + j:stop + j] < cur_low)    # Strictly lower on the right
+
+    is_swing_high = left_high_ok & right_high_ok
+    # A bar that fails the left-side high test is not evaluated as a swing low either
+    is_swing_low = left_high_ok & left_low_ok & right_low_ok
+
+    swing_high = np.full(n, np.nan)
+    swing_low = np.full(n, np.nan)
+    swing_high[first:stop][is_swing_high] = cur_high[is_swing_high]
+    swing_low[first:stop][is_swing_low] = cur_low[is_swing_low]
+    df_out['swing_high'] = swing_high
+    df_out['swing_low'] = swing_low
             
     return df_out
 
 
+@cached_indicator
 def identify_swing_points_zigzag(df: pd.DataFrame, zigzag_len: int,
                                  col_high: str = 'high', col_low: str = 'low') -> pd.DataFrame:
     """
@@ -75,120 +79,74 @@ def identify_swing_points_zigzag(df: pd.DataFrame, zigzag_len: int,
         raise ValueError("zigzag_len must be at least 2.")
 
     df_out = df.copy()
-    df_out['swing_high'] = np.nan
-    df_out['swing_low'] = np.nan
-
-    trend = 0 # 0: undetermined, 1: up, -1: down
-    last_pivot_idx = 0 
-    last_pivot_price = 0.0
-    
-    # Temporary lists to store potential pivots before confirmation
-    pivots_high_price = []
-    pivots_high_idx = []
-    pivots_low_price = []
-    pivots_low_idx = []
-
-    for i in range(len(df_out)):
-        current_high = df_out.loc[df_out.index[i], col_high]
-        current_low = df_out.loc[df_out.index[i], col_low]
-
-        # Determine rolling highest high and lowest low
-        # Ensure we don't go out of bounds at the start
-        lookback_period = df_out.iloc[max(0, i - zigzag_len + 1) : i + 1]
-        highest_in_len = lookback_period[col_high].max()
-        lowest_in_len = lookback_period[col_low].min()
-
-        new_trend = trend
-
-        if trend == 0: # Initial trend determination
-            if current_high == highest_in_len:
-                new_trend = 1 # Tentatively up
-                last_pivot_idx = i
-                last_pivot_price = current_low # If trend starts up, the last pivot was a low
-            elif current_low == lowest_in_len:
-                new_trend = -1 # Tentatively down
-                last_pivot_idx = i
-                last_pivot_price = current_high # If trend starts down, the last pivot was a high
-        
-        elif trend == 1: # Was uptrend
-            if current_low == lowest_in_len and i > last_pivot_idx: # Potential reversal down
-                # The previous high (highest since last_pivot_idx) is confirmed as a swing high
-                confirmed_sh_period = df_out.iloc[last_pivot_idx : i] # Don't include current bar i
-                if not confirmed_sh_period.empty:
-                    confirmed_sh_price = confirmed_sh_period[col_high].max()
-                    confirmed_sh_idx_offset = confirmed_sh_period[col_high].idxmax()
-                    # df_out.loc[confirmed_sh_idx_offset, 'swing_high'] = confirmed_sh_price
-                    pivots_high_price.append(confirmed_sh_price)
-                    pivots_high_idx.append(confirmed_sh_idx_offset)
-
-                new_trend = -1
-                last_pivot_idx = i # Current bar's index is start of new potential leg
-                last_pivot_price = current_high # The high of this bar is the reference for the new down leg
-        
-        elif trend == -1: # Was downtrend
-            if current_high == highest_in_len and i > last_pivot_idx: # Potential reversal up
-                # The previous low (lowest since last_pivot_idx) is confirmed as a swing low
-                confirmed_sl_period = df_out.iloc[last_pivot_idx : i] # Don't include current bar i
-                if not confirmed_sl_period.empty:
-                    confirmed_sl_price = confirmed_sl_period[col_low].min()
-                    confirmed_sl_idx_offset = confirmed_sl_period[col_low].idxmin()
-                    # df_out.loc[confirmed_sl_idx_offset, 'swing_low'] = confirmed_sl_price
-                    pivots_low_price.append(confirmed_sl_price)
-                    pivots_low_idx.append(confirmed_sl_idx_offset)
-                
-                new_trend = 1
-                last_pivot_idx = i # Current bar's index is start of new potential leg
-                last_pivot_price = current_low # The low of this bar is the reference for the new up leg
-        
-        trend = new_trend
-
-    # After iterating, populate the swing_high and swing_low columns
-    if pivots_high_idx:
-        df_out.loc[pivots_high_idx, 'swing_high'] = pivots_high_price
-    if pivots_low_idx:
-        df_out.loc[pivots_low_idx, 'swing_low'] = pivots_low_price
-        
-    # Post-processing: Remove consecutive swings of the same type
-    # e.g., if two swing highs are identified without an intervening swing low.
-    # This requires iterating through the identified pivots.
-    # For now, this basic version might produce some redundant swings if zigzag_len is small.
-    # A more robust ZigZag would ensure alternating pivots.
-
-    # A simple way to ensure alternating pivots:
-    all_pivots = []
-    for idx, price in zip(pivots_high_idx, pivots_high_price):
-        all_pivots.append({'time': idx, 'price': price, 'type': 'high'})
-    for idx, price in zip(pivots_low_idx, pivots_low_price):
-        all_pivots.append({'time': idx, 'price': price, 'type': 'low'})
-    
-    if not all_pivots:
-        return df_out
-
-    all_pivots_df = pd.DataFrame(all_pivots).set_index('time').sort_index()
-    
-    df_out['swing_high'] = np.nan # Reset
-    df_out['swing_low'] = np.nan  # Reset
-
+    n = len(df_out)
+    highs = df_out[col_high].to_numpy(dtype=np.float64)
+    lows = df_out[col_low].to_numpy(dtype=np.float64)
+
+    # Rolling highest high / lowest low over the last zigzag_len bars (shorter window at the start).
+    highest_in_len = df_out[col_high].rolling(zigzag_len, min_periods=1).max().to_numpy(dtype=np.float64)
+    lowest_in_len = df_out[col_low].rolling(zigzag_len, min_periods=1).min().to_numpy(dtype=np.float64)
+
+    # Bars where the trend may flip up (new highest high) or down (new lowest low).
+    up_candidates = np.flatnonzero(highs == highest_in_len)
+    down_candidates = np.flatnonzero(lows == lowest_in_len)
+
+    high_argmax = np.nanargmax if np.isnan(highs).any() else np.argmax
+    low_argmin = np.nanargmin if np.isnan(lows).any() else np.argmin
+
+    # Trend state machine. Instead of stepping bar by bar, jump straight to the next bar that
+    # reverses the current trend; the leg between two reversals yields the confirmed pivot.
+    pivot_positions = [] # Alternating high/low pivots, in time order
+    pivot_prices = []
+    pivot_is_high = []
+
+    first_up = up_candidates[0] if len(up_candidates) else n
+    first_down = down_candidates[0] if len(down_candidates) else n
+    if first_up <= first_down and first_up < n:
+        trend, last_pivot_idx = 1, int(first_up) # Initial trend determination: tentatively up
+    elif first_down < n:
+        trend, last_pivot_idx = -1, int(first_down) # Tentatively down
+    else:
+        trend, last_pivot_idx = 0, n
+
+    while trend != 0:
+        if trend == 1: # Was uptrend: wait for a new lowest low after the last pivot bar
+            k = np.searchsorted(down_candidates, last_pivot_idx, side='right')
+            if k == len(down_candidates): break
+            i = int(down_candidates[k])
+            # The previous high (highest since last_pivot_idx, current bar i excluded) is confirmed
+            pos = last_pivot_idx + int(high_argmax(highs[last_pivot_idx:i]))
+            pivot_positions.append(pos); pivot_prices.append(highs[pos]); pivot_is_high.append(True)
+            trend = -1
+        else: # Was downtrend: wait for a new highest high after the last pivot bar
+            k = np.searchsorted(up_candidates, last_pivot_idx, side='right')
+            if k == len(up_candidates): break
+            i = int(up_candidates[k])
+            pos = last_pivot_idx + int(low_argmin(lows[last_pivot_idx:i]))
+            pivot_positions.append(pos); pivot_prices.append(lows[pos]); pivot_is_high.append(False)
+            trend = 1
+        last_pivot_idx = i # Current bar's index is start of new potential leg
+
+    swing_high = np.full(n, np.nan)
+    swing_low = np.full(n, np.nan)
+
+    # Single alternation pass: keep pivots alternating high/low; for two consecutive pivots of the
+    # same type keep the more extreme one.
     last_pivot_type = None
-    for time_idx, row in all_pivots_df.iterrows():
-        current_pivot_type = row['type']
-        current_pivot_price = row['price']
-        
-        if last_pivot_type is None or current_pivot_type != last_pivot_type:
-            if current_pivot_type == 'high':
-                df_out.loc[time_idx, 'swing_high'] = current_pivot_price
-            else: # low
-                df_out.loc[time_idx, 'swing_low'] = current_pivot_price
-            last_pivot_type = current_pivot_type
-        else: # Same type as last, means we need to take the more extreme one
-            if current_pivot_type == 'high' and current_pivot_price > df_out.loc[df_out['swing_high'].last_valid_index(), 'swing_high']:
-                 df_out.loc[df_out['swing_high'].last_valid_index(), 'swing_high'] = np.nan # Remove previous less extreme
-                 df_out.loc[time_idx, 'swing_high'] = current_pivot_price
-            elif current_pivot_type == 'low' and current_pivot_price < df_out.loc[df_out['swing_low'].last_valid_index(), 'swing_low']:
-                 df_out.loc[df_out['swing_low'].last_valid_index(), 'swing_low'] = np.nan # Remove previous less extreme
-                 df_out.loc[time_idx, 'swing_low'] = current_pivot_price
-
-
+    last_kept_pos = {True: -1, False: -1}
+    for pos, price, is_high in zip(pivot_positions, pivot_prices, pivot_is_high):
+        target = swing_high if is_high else swing_low
+        if last_pivot_type is None or is_high != last_pivot_type:
+            target[pos] = price
+            last_kept_pos[is_high] = pos
+            last_pivot_type = is_high
+        elif (price > target[last_kept_pos[is_high]]) if is_high else (price < target[last_kept_pos[is_high]]):
+            target[last_kept_pos[is_high]] = np.nan # Remove previous less extreme
+            target[pos] = price
+            last_kept_pos[is_high] = pos
+
+    df_out['swing_high'] = swing_high
+    df_out['swing_low'] = swing_low
     return df_out
 
 
@@ -0,0 +1,244 @@
+# forex_backtester_cli/walk_forward.py
+
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime as dt
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+import config
+from backtester import get_pip_size
+from compact_frames import compact_symbol_data, expand_symbol_data
+from data_handler import initialize_data_source, shutdown_data_source
+from logging_setup import configure_logging
+from main import identify_swings, prepare_symbol_data
+from reporting import summarize_r_multiples
+from strategies import get_strategy_class
+from sweep import (METRIC_COLUMNS, evaluate_params, grid_samples, latin_hypercube_samples, parse_param_spec,
+                   random_samples, rank_results)
+
+logger = logging.getLogger(__name__)
+
+# Walk-forward optimisation: the date range is cut into rolling train/test windows (the train
+# window slides by one test length per step, or grows from the range start when anchored).
+# On each train window every parameter sample is backtested and the best one (sweep ranking:
+# expectancy, profit factor, max drawdown, among samples with at least min_trades trades) is
+# then run unchanged on the following test window. The test windows do not overlap, so their
+# trades stitch into one out-of-sample equity curve.
+#
+# Bars and Heikin Ashi are prepared once for the whole range and every window works on slices of
+# them (the LTF slice starts with the same HTF_TIMEDELTA * 10 margin prepare_symbol_data fetches),
+# so consecutive windows share their data instead of re-fetching it. Swings are recomputed on each
+# slice: a pivot is only confirmed by later bars, so swings sliced from the whole range would
+# carry pivots that bars after the window confirmed (the indicator cache keeps repeats cheap). A
+# train slice's LTF bars end at train_end, so trades still open there are closed at the boundary
+# and the optimiser never sees bars from the test window; only test slices keep the margin after
+# their end, letting their last trades run on. Windows run in parallel; the prepared data reaches
+# each worker once through the pool initializer (as CompactBars with COMPACT_PRECISION).
+
+WALK_FORWARD_RESULTS_DIR = "Walk_Forward_Results"
+
+def rolling_windows(start_date: str, end_date: str, train_months: int, test_months: int,
+                    anchored: bool = False) -> list[tuple]:
+    """[(train_start, train_end, test_start, test_end)] as half-open UTC ranges; end_date is inclusive."""
+    range_start = pd.Timestamp(start_date, tz='UTC')
+    range_end = pd.Timestamp(end_date, tz='UTC') + pd.Timedelta(days=1)
+    windows = []
+    step = 0
+    while True:
+        train_start = range_start if anchored else range_start + pd.DateOffset(months=step * test_months)
+        train_end = range_start + pd.DateOffset(months=step * test_months + train_months)
+        if train_end >= range_end:
+            break
+        windows.append((train_start, train_end, train_end, min(train_end + pd.DateOffset(months=test_months), range_end)))
+        step += 1
+    return windows
+
+def slice_symbol_data(symbol_data: tuple, start: pd.Timestamp, end: pd.Timestamp,
+                      run_past_end: bool = False) -> tuple | None:
+    """
+    prepare_symbol_data output cut to [start, end), with swings recomputed on the cut bars;
+    None if no HTF bars fall in the range. The LTF bars stop at end (open trades close there)
+    unless run_past_end keeps the margin after it.
+    """
+    htf_data_swings, ltf_ohlc_data, ltf_ha_data_swings = expand_symbol_data(symbol_data)
+    htf_slice = htf_data_swings[(htf_data_swings.index >= start) & (htf_data_swings.index < end)]
+    if htf_slice.empty:
+        return None
+    ltf_start = start - config.HTF_TIMEDELTA * 10
+    ltf_end = end + config.HTF_TIMEDELTA * 10 if run_past_end else end
+    ltf_rows = (ltf_ohlc_data.index >= ltf_start) & (ltf_ohlc_data.index < ltf_end)
+    ha_rows = (ltf_ha_data_swings.index >= ltf_start) & (ltf_ha_data_swings.index < ltf_end)
+    htf_slice, ha_slice = identify_swings(htf_slice, ltf_ha_data_swings[ha_rows])
+    return htf_slice, ltf_ohlc_data[ltf_rows], ha_slice
+
+def _slice_all(symbol_data: dict, start: pd.Timestamp, end: pd.Timestamp, run_past_end: bool = False) -> dict:
+    sliced = {symbol: slice_symbol_data(data, start, end, run_past_end) for symbol, data in symbol_data.items()}
+    return {symbol: data for symbol, data in sliced.items() if data is not None}
+
+def run_window(window_id: int, window: tuple, strategy_name: str, samples: list[dict], symbol_data: dict,
+               min_trades: int = 10) -> tuple[dict, list]:
+    """
+    Optimises on the window's train range and runs the chosen sample on its test range.
+    Returns (window log row, test trades).
+    """
+    train_start, train_end, test_start, test_end = window
+    base_params = config.STRATEGY_SPECIFIC_PARAMS.get(strategy_name, {})
+    train_data = _slice_all(symbol_data, train_start, train_end)
+    test_data = _slice_all(symbol_data, test_start, test_end, run_past_end=True)
+
+    train_rows = []
+    for sample_id, sample in enumerate(samples):
+        metrics, _ = evaluate_params(strategy_name, {**base_params, **sample}, train_data)
+        train_rows.append({"sample": sample_id, **metrics})
+    train_results = pd.DataFrame(train_rows, columns=["sample"] + METRIC_COLUMNS)
+    eligible = train_results[train_results['trades'] >= min_trades]
+    if eligible.empty:
+        logger.warning("Window %d: no sample reached %d train trades; ranking all samples.", window_id, min_trades)
+        eligible = train_results
+    best = rank_results(eligible).to_dict('records')[0]
+    chosen = samples[int(best['sample'])]
+
+    test_metrics, test_trades = evaluate_params(strategy_name, {**base_params, **chosen}, test_data)
+    for trade in test_trades:
+        trade['window'] = window_id
+
+    log_row = {"window": window_id, "train_start": train_start, "train_end": train_end,
+               "test_start": test_start, "test_end": test_end, **chosen}
+    log_row.update({f"train_{name}": best[name] for name in METRIC_COLUMNS})
+    log_row.update({f"test_{name}": test_metrics[name] for name in METRIC_COLUMNS})
+    logger.info("Window %d %s..%s chose %s: train expectancy %.2f R, test expectancy %.2f R",
+                window_id, test_start.date(), test_end.date(), chosen, best['expectancy_R'], test_metrics['expectancy_R'])
+    return log_row, test_trades
+
+# --- Worker side ---
+_worker_symbol_data = {}
+
+def _init_walk_forward_worker(symbol_data: dict, config_overrides: dict, log_level: str):
+    global _worker_symbol_data
+    for name, value in config_overrides.items():
+        setattr(config, name, value)
+    configure_logging(log_level)
+    _worker_symbol_data = symbol_data
+
+def _run_window_in_worker(window_id: int, window: tuple, strategy_name: str, samples: list[dict], min_trades: int) -> tuple[dict, list]:
+    return run_window(window_id, window, strategy_name, samples, _worker_symbol_data, min_trades)
+
+def run_walk_forward(strategy_name: str, samples: list[dict], symbols: list, start_date: str, end_date: str,
+                     train_months: int, test_months: int, anchored: bool = False, min_trades: int = 10,
+                     workers: int = 1, log_level: str = "WARNING") -> tuple[pd.DataFrame, pd.DataFrame] | None:
+    """
+    Returns (per-window parameter log, stitched out-of-sample trades with cumulative_R),
+    or None when there is no complete window or no data.
+    """
+    get_strategy_class(strategy_name)
+    if config.REVERSE_TRADES:
+        logger.warning("REVERSE_TRADES is on: windows are optimised and tested on reversed trades (SL and TP swapped).")
+    windows = rolling_windows(start_date, end_date, train_months, test_months, anchored)
+    if not windows:
+        logger.warning("%s..%s is too short for a %d-month train window plus a test window.", start_date, end_date, train_months)
+        return None
+
+    symbol_data = {}
+    for symbol in symbols:
+        prepared = prepare_symbol_data(symbol, start_date, end_date)
+        if prepared is None:
+            logger.warning("No bars for %s; left out of the walk-forward.", symbol)
+            continue
+        symbol_data[symbol] = compact_symbol_data(prepared, config.COMPACT_TOLERANCE_PIPS * get_pip_size(symbol)) \
+            if config.COMPACT_PRECISION else prepared
+    if not symbol_data:
+        return None
+
+    if workers > 1:
+        config_overrides = {"DATA_SOURCE": config.DATA_SOURCE, "DATA_SOURCE_DIR": config.DATA_SOURCE_DIR}
+        with ProcessPoolExecutor(max_workers=min(workers, len(windows)), initializer=_init_walk_forward_worker,
+                                 initargs=(symbol_data, config_overrides, log_level)) as pool:
+            futures = [pool.submit(_run_window_in_worker, window_id, window, strategy_name, samples, min_trades)
+                       for window_id, window in enumerate(windows)]
+            window_results = [future.result() for future in futures]
+    else:
+        window_results = [run_window(window_id, window, strategy_name, samples, symbol_data, min_trades)
+                          for window_id, window in enumerate(windows)]
+
+    window_log = pd.DataFrame([log_row for log_row, _ in window_results])
+    oos_columns = ["window", "symbol", "direction", "entry_time", "exit_time", "status", "pnl_R"]
+    oos_trades = pd.DataFrame([{col: trade.get(col) for col in oos_columns}
+                               for _, test_trades in window_results for trade in test_trades], columns=oos_columns)
+    oos_trades['pnl_R'] = pd.to_numeric(oos_trades['pnl_R'], errors='coerce').fillna(0)
+    oos_trades['cumulative_R'] = oos_trades['pnl_R'].cumsum()
+    return window_log, oos_trades
+
+def save_walk_forward_results(window_log: pd.DataFrame, oos_trades: pd.DataFrame, results_path: str):
+    os.makedirs(results_path, exist_ok=True)
+    window_log.to_csv(os.path.join(results_path, "window_parameters.csv"), index=False)
+    oos_trades.to_csv(os.path.join(results_path, "oos_trades.csv"), index=False)
+    if oos_trades.empty:
+        return
+    plt.figure(figsize=(12, 6))
+    plt.plot(oos_trades.index, oos_trades['cumulative_R'], label='Out-of-sample Equity Curve (R)')
+    for boundary in oos_trades.index[oos_trades['window'].diff().fillna(0) != 0]:
+        plt.axvline(boundary - 0.5, color='grey', linestyle=':', linewidth=0.8)
+    plt.title('Walk-Forward Out-of-Sample Cumulative R (dotted lines: window boundaries)')
+    plt.xlabel('Trade Number (test windows in order)')
+    plt.ylabel('Cumulative R')
+    plt.legend(); plt.grid(True)
+    try:
+        plt.savefig(os.path.join(results_path, "oos_equity_curve_R.png"))
+    except Exception as e: print(f"Error saving walk-forward equity curve plot: {e}")
+    plt.close()
+
+
+if __name__ == "__main__":
+    # e.g. python walk_forward.py --strategy ZLSMAWithFilters --train-months 3 --test-months 1 \
+    #          --param ZLSMA_LENGTH=24,32,40 --param TP_RR_RATIO=1.5,2.0,2.5 --workers 4
+    parser = argparse.ArgumentParser(description="Walk-forward optimisation over rolling train/test windows")
+    parser.add_argument("--strategy", type=str, default=config.ACTIVE_STRATEGY_NAME)
+    parser.add_argument("--param", type=parse_param_spec, action="append", required=True, help="NAME=v1,v2,... or NAME=low:high (random/lhs only)")
+    parser.add_argument("--sampler", type=str, default="grid", choices=["grid", "random", "lhs"])
+    parser.add_argument("--samples", type=int, default=20, help="Sample count for random/lhs (the same samples are tried in every window)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--train-months", type=int, default=3)
+    parser.add_argument("--test-months", type=int, default=1)
+    parser.add_argument("--anchored", action="store_true", help="Grow every train window from the range start instead of rolling it")
+    parser.add_argument("--min-trades", type=int, default=10, help="Samples with fewer train trades are only chosen if none has more")
+    parser.add_argument("--symbols", nargs='+', default=config.SYMBOLS)
+    parser.add_argument("--start", type=str, default=config.START_DATE_STR)
+    parser.add_argument("--end", type=str, default=config.END_DATE_STR)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--data-source", type=str, default=config.DATA_SOURCE, choices=["mt5", "file", "archive"])
+    parser.add_argument("--data-dir", type=str, default=config.DATA_SOURCE_DIR)
+    parser.add_argument("--log-level", type=str, default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args()
+
+    config.DATA_SOURCE = args.data_source
+    config.DATA_SOURCE_DIR = args.data_dir
+    configure_logging(args.log_level)
+
+    space = dict(args.param)
+    if args.sampler == "grid": samples = grid_samples(space)
+    elif args.sampler == "random": samples = random_samples(space, args.samples, args.seed)
+    else: samples = latin_hypercube_samples(space, args.samples, args.seed)
+
+    if not initialize_data_source(): raise SystemExit("Could not initialize the data source.")
+    try:
+        result = run_walk_forward(args.strategy, samples, args.symbols, args.start, args.end,
+                                  args.train_months, args.test_months, anchored=args.anchored,
+                                  min_trades=args.min_trades, workers=args.workers, log_level=args.log_level)
+        if result is None:
+            print("No walk-forward windows were run.")
+        else:
+            window_log, oos_trades = result
+            results_path = os.path.join(WALK_FORWARD_RESULTS_DIR, f"{args.strategy}_{dt.now().strftime('%Y%m%d_%H%M%S')}")
+            save_walk_forward_results(window_log, oos_trades, results_path)
+            with pd.option_context("display.width", 200, "display.max_columns", None):
+                print(window_log.to_string(index=False))
+            oos = summarize_r_multiples(oos_trades['pnl_R'])
+            print(f"Out-of-sample: {oos['trades']} trades, expectancy {oos['expectancy_R']:.2f} R, "
+                  f"profit factor {oos['profit_factor']:.2f}, net {oos['net_R']:.2f} R, max drawdown {oos['max_drawdown_R']:.2f} R")
+            print(f"Walk-forward results saved in: {results_path}")
+    finally:
+        shutdown_data_source()